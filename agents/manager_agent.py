@@ -1,37 +1,406 @@
-from typing import Dict, Any
-import yaml
+from typing import Dict, Any, AsyncIterator, List, Optional
+import asyncio
+import time
 from ..agents_prompts.manager_prompt import MANAGER_PROMPT
+from ..config_service import get_config
+from ..utils.admission import AdmissionController
+from ..utils.agent_stats import AgentStats
+from ..utils.dag_executor import DAGExecutor, Stage
+from ..utils.request_context import RequestContext
+from ..utils.semantic_cache import SemanticCache
+from ..utils.prompt_assembler import PromptAssembler, context_budget
+from ..utils.llm_client import LLMClient
+from ..utils.tracing import Span, tracer
+from .intent_agent import IntentAgent
+from .sentiment_agent import SentimentAgent
+from .rag_agent import RAGAgent
+from .billing_agent import BillingAgent
+from .technical_agent import TechnicalAgent
+from .other_issues_agent import OtherIssuesAgent
+from .safety_agent import SafetyAgent
+from .response_generator_agent import ResponseGeneratorAgent
 
 class ManagerAgent:
     """Orchestrates the flow between different agents"""
 
     def __init__(self):
         self.prompt = MANAGER_PROMPT
-        self.config = self._load_config()
-        self.state = {}
 
-    def _load_config(self):
+        self.intent_agent = IntentAgent()
+        self.sentiment_agent = SentimentAgent()
+        self.rag_agent = RAGAgent()
+        self.domain_agents = {
+            "billing": BillingAgent(),
+            "technical": TechnicalAgent(),
+            "other": OtherIssuesAgent()
+        }
+        self.safety_agent = SafetyAgent()
+        # One pooled client shared by every request
+        self.llm_client = LLMClient()
+        self.response_agent = ResponseGeneratorAgent(llm_client=self.llm_client)
+
+        self.prompt_assembler = PromptAssembler(
+            static_prompts=[agent.prompt for agent in self.domain_agents.values()],
+            encoding_name=get_config().prompt.encoding
+        )
+
+        # Global and per-stage concurrency limits (LLM, embedding, Chroma)
+        self.admission = AdmissionController(get_config().admission)
+
+        cache_config = get_config().cache
+        self.cache = SemanticCache(
+            similarity_threshold=cache_config.similarity_threshold,
+            max_entries=cache_config.max_entries,
+            ttl_seconds=cache_config.ttl_seconds
+        )
+
+        # Rolling per-stage and whole-pipeline activity for /agents/stats
+        activity_config = get_config().activity
+        self.activity = AgentStats(activity_config.window_seconds, activity_config.bucket_seconds)
+
+        # Embedding, intent and sentiment are independent; everything else
+        # starts as soon as the stages it reads from have finished. The
+        # cache lookup needs all three (the embedding plus its guards) and
+        # gates the expensive domain/response stages.
+        self.executor = DAGExecutor([
+            Stage("embed", self._limited("embedding", self._embed_stage)),
+            Stage("intent", self._limited("llm", self._intent_stage)),
+            Stage("sentiment", self._limited("llm", self._sentiment_stage)),
+            Stage("cache", self._cache_stage, depends_on=["embed", "intent", "sentiment"]),
+            Stage("rag", self._limited("chroma", self._rag_stage), depends_on=["embed"]),
+            Stage("domain", self._limited("llm", self._domain_stage), depends_on=["intent", "cache"]),
+            Stage("prompt", self._prompt_stage, depends_on=["domain", "rag"]),
+            Stage("response", self._limited("llm", self._response_stage), depends_on=["prompt", "sentiment"]),
+            Stage("safety", self._safety_stage, depends_on=["response"])
+        ], stats=self.activity)
+        # run_batch does retrieval and safety for a whole chunk at once, so
+        # only the per-query stages go through this executor.
+        self.batch_executor = DAGExecutor([
+            Stage("intent", self._limited("llm", self._intent_stage)),
+            Stage("sentiment", self._limited("llm", self._sentiment_stage)),
+            Stage("domain", self._limited("llm", self._domain_stage), depends_on=["intent"]),
+            Stage("prompt", self._prompt_stage, depends_on=["domain"]),
+            Stage("response", self._limited("llm", self._response_stage), depends_on=["prompt", "sentiment"])
+        ], stats=self.activity)
+        # Everything up to the prompt: the local stages, none of which calls the LLM provider
+        self.warmup_executor = DAGExecutor([
+            Stage("embed", self._embed_stage),
+            Stage("intent", self._intent_stage),
+            Stage("sentiment", self._sentiment_stage),
+            Stage("cache", self._cache_stage, depends_on=["embed", "intent", "sentiment"]),
+            Stage("rag", self._rag_stage, depends_on=["embed"]),
+            Stage("domain", self._domain_stage, depends_on=["intent", "cache"]),
+            Stage("prompt", self._prompt_stage, depends_on=["domain", "rag"])
+        ])
+
+    def _limited(self, stage: str, func):
+        """Wrap a stage so it runs under the admission limit for ``stage``"""
+        async def _run(ctx: RequestContext) -> Any:
+            async with self.admission.stage(stage):
+                return await func(ctx)
+        return _run
+
+    async def warmup(self) -> None:
+        """Exercise the local stages once so the first real request pays no cold-start cost.
+
+        The response stage is left out, so readiness does not depend on the
+        LLM provider being reachable (or on a valid API key).
+        """
+        await self.rag_agent.warmup()
+        ctx = RequestContext("How do I reset my password?")
+        ctx.use_cache = False
+        await self.warmup_executor.run(ctx)
+        await self.safety_agent.check(ctx.query)
+
+    async def run(self, query: str, context: Dict[str, Any] = None, use_cache: bool = True,
+                  request_id: Optional[str] = None) -> Dict[str, Any]:
+        # State lives on the per-request context, never on the agent, so
+        # one instance can serve concurrent requests.
+        ctx = RequestContext(query, context, request_id)
+        ctx.use_cache = use_cache
+        started = time.perf_counter()
         try:
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
+            with tracer.trace("pipeline.run", force=self._debug(ctx), request_id=ctx.request_id) as root:
+                ctx.timings = await self.executor.run(ctx)
         except Exception:
-            return {}
+            self.activity.record("manager", time.perf_counter() - started, error=True)
+            raise
+        self.activity.record("manager", time.perf_counter() - started)
+        self._store_in_cache(ctx)
 
-    async def run(self, query: str, context: Dict[str, Any] = None) -> Dict[str, Any]:
-        # Initialize state
-        self.state = {
-            "query": query,
-            "context": context or {},
-            "intent": None,
-            "sentiment": None,
-            "retrieved_docs": [],
-            "response": None
+        return {
+            "response": ctx.response,
+            "metadata": self._metadata(ctx, root)
         }
-        # Pipeline stub - call other agents (not implemented here)
+
+    async def run_stream(self, query: str, context: Dict[str, Any] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run the pipeline, yielding stage and token events as they happen"""
+        ctx = RequestContext(query, context)
+        ctx.event_queue = asyncio.Queue()
+
+        async def _on_stage_complete(stage: str, result: Any) -> None:
+            await ctx.event_queue.put({"event": "stage", "data": self._stage_summary(ctx, stage)})
+
+        root: Optional[Span] = None
+
+        async def _run() -> None:
+            nonlocal root
+            started = time.perf_counter()
+            # Traced inside the task so stage spans find the root in their context
+            try:
+                with tracer.trace("pipeline.run_stream", force=self._debug(ctx), request_id=ctx.request_id) as root:
+                    ctx.timings = await self.executor.run(ctx, on_stage_complete=_on_stage_complete)
+            except Exception:
+                self.activity.record("manager", time.perf_counter() - started, error=True)
+                raise
+            else:
+                self.activity.record("manager", time.perf_counter() - started)
+            finally:
+                await ctx.event_queue.put(None)
+
+        task = asyncio.ensure_future(_run())
+        try:
+            while True:
+                event = await ctx.event_queue.get()
+                if event is None:
+                    break
+                yield event
+            await task
+        finally:
+            if not task.done():
+                task.cancel()
+        self._store_in_cache(ctx)
+
+        yield {
+            "event": "done",
+            "data": {"response": ctx.response, "metadata": self._metadata(ctx, root)}
+        }
+
+    async def run_batch(self, queries: List[str], contexts: Optional[List[Dict[str, Any]]] = None,
+                        concurrency: Optional[int] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Run many queries, yielding one result per query in input order.
+
+        Queries are processed in chunks: each chunk gets one embedding call,
+        one Chroma query and one safety scan, while the per-query stages run
+        with at most ``concurrency`` pipelines in flight.
+        """
+        batch_config = get_config().batch
+        chunk_size = batch_config.chunk_size
+        semaphore = asyncio.Semaphore(concurrency or batch_config.max_concurrency)
+
+        async def _run_one(ctx: RequestContext) -> None:
+            async with semaphore:
+                ctx.timings = await self.batch_executor.run(ctx)
+
+        for start in range(0, len(queries), chunk_size):
+            chunk = queries[start:start + chunk_size]
+            ctxs = [
+                RequestContext(query, contexts[start + i] if contexts else None)
+                for i, query in enumerate(chunk)
+            ]
+
+            # A failure shared by the whole chunk becomes one error line per query
+            # rather than ending the stream for every chunk after it
+            try:
+                async with self.admission.stage("embedding"):
+                    query_vecs = await self.rag_agent.embed_batch(chunk)
+                async with self.admission.stage("chroma"):
+                    retrievals = await self.rag_agent.search_batch(chunk, query_vecs)
+            except Exception as e:
+                for i, ctx in enumerate(ctxs):
+                    yield {"index": start + i, "query": ctx.query, "error": f"Retrieval failed: {e}"}
+                continue
+            for ctx, retrieval in zip(ctxs, retrievals):
+                ctx.retrieved_docs = retrieval.get("documents", [])
+
+            outcomes = await asyncio.gather(*(_run_one(ctx) for ctx in ctxs), return_exceptions=True)
+            try:
+                safety_results = await self.safety_agent.check_batch([ctx.response or "" for ctx in ctxs])
+            except Exception as e:
+                for i, ctx in enumerate(ctxs):
+                    yield {"index": start + i, "query": ctx.query, "error": f"Safety check failed: {e}"}
+                continue
+
+            for i, (ctx, outcome, safety) in enumerate(zip(ctxs, outcomes, safety_results)):
+                if isinstance(outcome, Exception):
+                    yield {"index": start + i, "query": ctx.query, "error": str(outcome)}
+                    continue
+                self._apply_safety(ctx, safety)
+                yield {"index": start + i, "response": ctx.response, "metadata": ctx.to_dict()}
+
+    @staticmethod
+    def _debug(ctx: RequestContext) -> bool:
+        return bool(ctx.context.get("debug"))
+
+    def _metadata(self, ctx: RequestContext, root: Optional[Span]) -> Dict[str, Any]:
+        metadata = ctx.to_dict()
+        if root is not None and self._debug(ctx):
+            metadata["trace"] = root.to_tree()
+        return metadata
+
+    def _stage_summary(self, ctx: RequestContext, stage: str) -> Dict[str, Any]:
+        messages = {
+            "embed": "Query embedded",
+            "cache": "Answered from cache" if ctx.cache_hit else "No cached answer",
+            "intent": f"Intent detected: {ctx.intent}",
+            "sentiment": f"Sentiment: {ctx.sentiment}",
+            "rag": "Retrieval skipped" if ctx.cache_hit else f"Retrieved {len(ctx.retrieved_docs)} documents",
+            "domain": f"Routed to {ctx.domain} agent",
+            "prompt": "Prompt assembled",
+            "response": "Response generated",
+            "safety": "Safety check complete"
+        }
+        return {"stage": stage, "message": messages.get(stage, f"{stage} done")}
+
+    async def _embed_stage(self, ctx: RequestContext) -> List[float]:
+        ctx.query_embedding = await self.rag_agent.embed_query(ctx.query)
+        return ctx.query_embedding
+
+    async def _cache_stage(self, ctx: RequestContext) -> Optional[Dict[str, Any]]:
+        try:
+            return self._lookup_cache(ctx)
+        finally:
+            ctx.cache_checked.set()
+
+    def _lookup_cache(self, ctx: RequestContext) -> Optional[Dict[str, Any]]:
+        if not get_config().cache.enabled or not ctx.use_cache or not ctx.query_embedding:
+            ctx.use_cache = False
+            return None
+        # Never serve or store answers for queries that carry PII, nor for
+        # follow-ups whose answer depends on the conversation before them
+        if ctx.context.get("history") or self.safety_agent.detect_pii(ctx.query):
+            self.cache.record_bypass()
+            ctx.use_cache = False
+            return None
+
+        entry = self.cache.lookup(
+            ctx.query_embedding,
+            threshold=get_config().cache.similarity_threshold,
+            **self._cache_guards(ctx)
+        )
+        if entry is None:
+            return None
+        ctx.cache_hit = True
+        ctx.response = entry.response
+        return {"cached_query": entry.query}
+
+    def _store_in_cache(self, ctx: RequestContext) -> None:
+        if ctx.use_cache and not ctx.cache_hit and ctx.response and ctx.query_embedding:
+            self.cache.put(ctx.query_embedding, ctx.query, ctx.response, **self._cache_guards(ctx))
+
+    @staticmethod
+    def _cache_guards(ctx: RequestContext) -> Dict[str, Any]:
         return {
-            "response": "This is a stub response from the Manager Agent.",
-            "metadata": self.state
+            "intent": ctx.intent,
+            "sentiment": ctx.sentiment,
+            "model": ctx.context.get("model") or get_config().llm.primary_model,
+            "plan": ctx.context.get("user_plan")
         }
 
+    async def _intent_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        result = await self.intent_agent.classify(ctx.query)
+        ctx.intent = result.get("intent", "general")
+        ctx.intent_confidence = result.get("confidence")
+        return result
+
+    async def _sentiment_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        result = await self.sentiment_agent.analyze(ctx.query)
+        ctx.sentiment = result.get("sentiment", "neutral")
+        return result
+
+    async def _rag_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        # Search while the cache decides; a hit makes the documents unnecessary,
+        # so the response does not wait for Chroma
+        search = asyncio.ensure_future(self.rag_agent.retrieve(ctx.query, query_vec=ctx.query_embedding))
+        checked = asyncio.ensure_future(ctx.cache_checked.wait())
+        try:
+            await asyncio.wait({search, checked}, return_when=asyncio.FIRST_COMPLETED)
+            if ctx.cache_hit:
+                return {"documents": [], "count": 0, "query": ctx.query, "skipped": True}
+            result = await search
+        finally:
+            for task in (search, checked):
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    task.exception()  # a search that failed after a hit is not an error
+        ctx.retrieved_docs = result.get("documents", [])
+        return result
+
+    async def _domain_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        if ctx.cache_hit:
+            return {}
+        domain = self.get_domain(ctx.intent)
+        result = await self.domain_agents[domain].handle(ctx.query, ctx.context)
+        ctx.domain = domain
+        ctx.domain_response = result.get("response")
+        return result
+
+    async def _prompt_stage(self, ctx: RequestContext) -> Optional[Dict[str, int]]:
+        if ctx.cache_hit:
+            return None
+        config = get_config()
+        model = ctx.context.get("model") or config.llm.primary_model
+        assembled = self.prompt_assembler.assemble(
+            system_prompt=self.domain_agents[ctx.domain].prompt,
+            query=ctx.query,
+            documents=ctx.retrieved_docs,
+            history=ctx.context.get("history", []),
+            budget=context_budget(
+                model,
+                config.prompt.context_budgets,
+                config.prompt.default_context_budget,
+                config.llm.max_tokens
+            )
+        )
+        ctx.prompt = assembled.messages
+        ctx.prompt_stats = assembled.summary()
+        return ctx.prompt_stats
+
+    async def _response_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        if ctx.cache_hit:
+            if ctx.event_queue is not None:
+                await ctx.event_queue.put({"event": "token", "data": {"text": ctx.response}})
+            return {"response": ctx.response}
+        if ctx.event_queue is not None:
+            return await self._stream_response(ctx)
+        result = await self.response_agent.generate(ctx)
+        ctx.response = result.get("response")
+        return result
+
+    async def _stream_response(self, ctx: RequestContext) -> Dict[str, Any]:
+        # Tokens go out redacted as they are produced; the safety stage still
+        # checks the complete text afterwards.
+        raw_tokens = []
+
+        async def _collect() -> AsyncIterator[str]:
+            async for token in self.response_agent.generate_stream(ctx):
+                raw_tokens.append(token)
+                yield token
+
+        tokens = _collect()
+        if get_config().safety.pii_redaction:
+            tokens = self.safety_agent.redact_stream(tokens)
+        async for token in tokens:
+            await ctx.event_queue.put({"event": "token", "data": {"text": token}})
+
+        ctx.response = "".join(raw_tokens)
+        return {"response": ctx.response}
+
+    async def _safety_stage(self, ctx: RequestContext) -> Dict[str, Any]:
+        result = await self.safety_agent.check(ctx.response or "")
+        self._apply_safety(ctx, result)
+        return result
+
+    def _apply_safety(self, ctx: RequestContext, result: Dict[str, Any]) -> None:
+        if result.get("pii_detected") and get_config().safety.pii_redaction:
+            ctx.response = self.safety_agent.redact_pii(ctx.response)
+        ctx.safety = result
+
+    def get_domain(self, intent: str) -> str:
+        if intent in ("billing", "technical"):
+            return intent
+        return "other"
+
     def get_next_agent(self, current_state: Dict[str, Any]) -> str:
         return "intent_agent"
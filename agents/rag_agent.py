@@ -1,42 +1,94 @@
 from typing import Dict, Any, List
+import asyncio
 from ..agents_prompts.rag_prompt import RAG_PROMPT
-from ..utils.embedder import Embedder
+from ..utils.embedder import create_embedder
+from ..utils.embedding_cache import CachedEmbedder, EmbeddingCache
+from ..utils.embedding_service import EmbeddingService
 from ..utils.chroma_client import ChromaClient
-import yaml
+from ..config_service import get_config
+from ..utils.tracing import tracer
 
 class RAGAgent:
     """Handles document retrieval and context augmentation"""
 
     def __init__(self):
         self.prompt = RAG_PROMPT
-        self.config = self._load_config()
-        self.embedder = Embedder(self.config.get("embedding", {}).get("model_name", ""))
+        config = get_config()
+        self.embedder = create_embedder(config.embedding)
+        self.embedding_cache = None
+        if config.embedding.cache_enabled:
+            # Keyed by backend too: ONNX/int8 vectors differ slightly from PyTorch ones
+            self.embedding_cache = EmbeddingCache(
+                config.embedding.cache_directory, self.embedder.fingerprint, dtype=config.embedding.cache_dtype,
+                readonly=True
+            )
+            self.embedder = CachedEmbedder(self.embedder, self.embedding_cache,
+                                           memory_entries=max(1, config.embedding.query_cache_entries))
+        self.embedding_service = EmbeddingService(
+            self.embedder,
+            max_batch_size=config.embedding.batch_size,
+            max_wait_ms=config.embedding.max_batch_wait_ms,
+            max_concurrent_batches=config.embedding.max_concurrent_batches
+        )
         self.chroma = ChromaClient(
-            persist_directory=self.config.get("retrieval", {}).get("persist_directory", "db/chroma"),
-            collection_name=self.config.get("retrieval", {}).get("chroma_collection", "org_docs_v1")
+            persist_directory=config.retrieval.persist_directory,
+            collection_name=config.retrieval.chroma_collection
         )
 
-    def _load_config(self):
-        try:
-            with open("config.yaml", "r", encoding="utf-8") as f:
-                return yaml.safe_load(f)
-        except Exception:
-            return {}
+    async def warmup(self) -> None:
+        """Run a throwaway embedding and search to initialise model and index"""
+        await self.retrieve_batch(["warm-up query"])
+
+    async def embed_query(self, query: str) -> List[float]:
+        # Batched with whatever other queries are being embedded right now
+        with tracer.span("embedding.encode", texts=1):
+            query_embedding = await self.embedding_service.embed(query)
+        return query_embedding.tolist()
 
-    async def retrieve(self, query: str, top_k: int = None) -> Dict[str, Any]:
+    async def retrieve(self, query: str, top_k: int = None, query_vec: List[float] = None) -> Dict[str, Any]:
         if top_k is None:
-            top_k = self.config.get("retrieval", {}).get("top_k", 5)
+            top_k = get_config().retrieval.top_k
+
+        if query_vec is None:
+            query_vec = await self.embed_query(query)
+        # Chroma is synchronous; keep it off the event loop so other stages and requests keep running
+        loop = asyncio.get_running_loop()
+        with tracer.span("chroma.search", top_k=top_k):
+            results = await loop.run_in_executor(None, self.chroma.search, query_vec, top_k)
+        return self._filter_results(query, results)
+
+    async def retrieve_batch(self, queries: List[str], top_k: int = None) -> List[Dict[str, Any]]:
+        """Retrieve for many queries with one embedding call and one Chroma query"""
+        if not queries:
+            return []
+        return await self.search_batch(queries, await self.embed_batch(queries), top_k)
+
+    async def embed_batch(self, queries: List[str]) -> List[List[float]]:
+        """Embed many queries in one call"""
+        loop = asyncio.get_running_loop()
+        with tracer.span("embedding.encode", texts=len(queries)):
+            embeddings = await loop.run_in_executor(None, self.embedder.embed_texts, queries)
+        return [self._to_vector([embedding]) for embedding in embeddings]
 
-        query_embedding = self.embedder.embed_text(query)
+    async def search_batch(self, queries: List[str], query_vecs: List[List[float]],
+                           top_k: int = None) -> List[Dict[str, Any]]:
+        """One Chroma query for many already embedded queries"""
+        if top_k is None:
+            top_k = get_config().retrieval.top_k
+
+        loop = asyncio.get_running_loop()
+        with tracer.span("chroma.search", top_k=top_k, queries=len(queries)):
+            results = await loop.run_in_executor(None, self.chroma.search_batch, query_vecs, top_k)
+        return [self._filter_results(query, result) for query, result in zip(queries, results)]
+
+    def _to_vector(self, query_embedding) -> List[float]:
         # defensive handling
         if hasattr(query_embedding, "__len__") and len(query_embedding) > 0:
-            query_vec = query_embedding[0].tolist() if hasattr(query_embedding[0], "tolist") else list(query_embedding[0])
-        else:
-            query_vec = []
-
-        results = self.chroma.search(query_vec, top_k=top_k)
+            return query_embedding[0].tolist() if hasattr(query_embedding[0], "tolist") else list(query_embedding[0])
+        return []
 
-        threshold = self.config.get("retrieval", {}).get("score_threshold", 0.3)
+    def _filter_results(self, query: str, results: Dict[str, Any]) -> Dict[str, Any]:
+        threshold = get_config().retrieval.score_threshold
         filtered_docs = [
             doc for doc, dist in zip(results.get("documents", []), results.get("distances", []))
             if dist <= threshold
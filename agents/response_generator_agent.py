@@ -1,14 +1,40 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator, Optional
+import re
 from ..agents_prompts.response_generator_prompt import RESPONSE_GENERATOR_PROMPT
+from ..config_service import get_config
+from ..utils.llm_client import LLMClient
 
 class ResponseGeneratorAgent:
     """Generates and formats the final response"""
 
-    def __init__(self):
+    def __init__(self, llm_client: Optional[LLMClient] = None):
         self.prompt = RESPONSE_GENERATOR_PROMPT
+        self.llm_client = llm_client
+
+    def _model(self, context: Dict[str, Any]) -> Optional[str]:
+        """Model to call, or None when no LLM is usable (falls back to templates)"""
+        if self.llm_client is None or not context.get("prompt"):
+            return None
+        model = (context.get("context") or {}).get("model") or get_config().llm.primary_model
+        return model if self.llm_client.available(model) else None
 
     async def generate(self, context: Dict[str, Any]) -> Dict[str, Any]:
-        # Stub implementation
+        model = self._model(context)
+        if model is not None:
+            result = await self.llm_client.complete(context.get("prompt"), model=model)
+            return {
+                "response": result["content"],
+                "metadata": {
+                    "confidence": 0.9,
+                    "sources_used": len(context.get("retrieved_docs", [])),
+                    "response_type": "generated",
+                    "model_used": result["model"],
+                    "hedged": result.get("hedged", False),
+                    "llm_latency_ms": result["latency_ms"]
+                }
+            }
+
+        # Template response when no LLM provider is configured
         response = self.format_response(
             query=context.get("query", ""),
             intent=context.get("intent", "general"),
@@ -25,6 +51,23 @@ class ResponseGeneratorAgent:
             }
         }
 
+    async def generate_stream(self, context: Dict[str, Any]) -> AsyncIterator[str]:
+        """Yield the response piece by piece as it is produced"""
+        model = self._model(context)
+        if model is not None:
+            async for token in self.llm_client.stream(context.get("prompt"), model=model):
+                yield token
+            return
+
+        response = self.format_response(
+            query=context.get("query", ""),
+            intent=context.get("intent", "general"),
+            retrieved_docs=context.get("retrieved_docs", []),
+            sentiment=context.get("sentiment", "neutral")
+        )
+        for token in re.findall(r"\S+\s*", response):
+            yield token
+
     def format_response(self, query: str, intent: str, retrieved_docs: List[str],
                        sentiment: str) -> str:
         base_response = "Thank you for your query. "
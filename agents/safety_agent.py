@@ -1,5 +1,6 @@
-from typing import Dict, Any, List
+from typing import Dict, Any, List, AsyncIterator
 import re
+from bisect import bisect_right
 from ..agents_prompts.safety_prompt import SAFETY_PROMPT
 
 class SafetyAgent:
@@ -12,6 +13,10 @@ class SafetyAgent:
             "email": r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}",
             "phone": r"\d{3}[-.]?\d{3}[-.]?\d{4}"
         }
+        # one alternation with a named group per PII type, for batch scans
+        self._combined_pattern = re.compile(
+            "|".join(f"(?P<{pii_type}>{pattern})" for pii_type, pattern in self.pii_patterns.items())
+        )
 
     async def check(self, text: str) -> Dict[str, Any]:
         pii_found = self.detect_pii(text)
@@ -24,6 +29,33 @@ class SafetyAgent:
             "confidence": 0.95
         }
 
+    async def check_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        pii_batch = self.detect_pii_batch(texts)
+        return [
+            {
+                "is_safe": self.is_safe_content(text),
+                "pii_detected": len(pii_found) > 0,
+                "pii_types": pii_found,
+                "confidence": 0.95
+            }
+            for text, pii_found in zip(texts, pii_batch)
+        ]
+
+    def detect_pii_batch(self, texts: List[str]) -> List[List[str]]:
+        """Detect PII in many texts with a single regex pass over all of them"""
+        separator = "\n\n"
+        starts = []
+        offset = 0
+        for text in texts:
+            starts.append(offset)
+            offset += len(text) + len(separator)
+
+        found = [set() for _ in texts]
+        for match in self._combined_pattern.finditer(separator.join(texts)):
+            found[bisect_right(starts, match.start()) - 1].add(match.lastgroup)
+
+        return [[pii_type for pii_type in self.pii_patterns if pii_type in types] for types in found]
+
     def detect_pii(self, text: str) -> List[str]:
         found_pii = []
         for pii_type, pattern in self.pii_patterns.items():
@@ -38,3 +70,19 @@ class SafetyAgent:
         for pii_type, pattern in self.pii_patterns.items():
             text = re.sub(pattern, f"[{pii_type.upper()}_REDACTED]", text)
         return text
+
+    async def redact_stream(self, tokens: AsyncIterator[str]) -> AsyncIterator[str]:
+        """Redact PII from a token stream without waiting for the whole text.
+
+        Text is held back until a whitespace boundary so a pattern split
+        across tokens (e.g. an email address) is still caught.
+        """
+        pending = ""
+        async for token in tokens:
+            pending += token
+            boundary = max(pending.rfind(" "), pending.rfind("\n"))
+            if boundary >= 0:
+                yield self.redact_pii(pending[:boundary + 1])
+                pending = pending[boundary + 1:]
+        if pending:
+            yield self.redact_pii(pending)
@@ -1,18 +1,406 @@
-from fastapi import FastAPI
-from pydantic import BaseModel
-from typing import Dict, Any
+from fastapi import FastAPI, HTTPException, Depends, Request, Path
+from fastapi.responses import StreamingResponse, JSONResponse, PlainTextResponse
+from starlette.background import BackgroundTask
+from pydantic import BaseModel, Field
+from typing import Dict, Any, Optional, AsyncIterator, Callable, List
+from contextlib import asynccontextmanager
+import asyncio
+import json
+import time
+import uuid
+from ..agents.manager_agent import ManagerAgent
+from ..config_service import config_service, get_config
+from ..utils.single_flight import SingleFlight, coalesce_key
+from ..utils.conversation_store import ConversationStore, CONVERSATION_ID_MAX_LENGTH, CONVERSATION_ID_PATTERN
+from ..utils.event_store import EventStore, interaction_event
+from ..utils.metrics import registry
+from ..utils.request_context import public_context
+from ..utils.tracing import tracer
+from ..exception import AdmissionException
+from ..logger import flush_logging, logger
 
-app = FastAPI(title="IntelliSupport API")
+HTTP_REQUESTS = registry.counter(
+    "intellisupport_http_requests_total", "HTTP requests by route and status", labels=("method", "route", "status")
+)
+HTTP_DURATION = registry.histogram(
+    "intellisupport_http_request_duration_seconds", "HTTP request duration, including streamed bodies",
+    labels=("method", "route")
+)
+BREAKER_STATES = {"closed": 0, "half_open": 1, "open": 2}
+WARMUP_RETRY_INITIAL_SECONDS = 1.0
+WARMUP_RETRY_MAX_SECONDS = 60.0
+
+def _manager_metrics(manager: ManagerAgent):
+    """Scrape-time gauges and counters taken from the manager's own stats"""
+    cache = manager.cache.get_stats()
+    yield ("intellisupport_cache_lookups_total", "counter", "Semantic cache lookups by result",
+           [({"result": "hit"}, cache["hits"]), ({"result": "miss"}, cache["misses"])])
+    yield ("intellisupport_cache_entries", "gauge", "Entries in the semantic cache", [({}, cache["entries"])])
+
+    admission = manager.admission.get_stats()
+    limiters = {"global": admission["global"], **admission["stages"]}
+    yield ("intellisupport_admission_active", "gauge", "Requests holding a slot",
+           [({"limiter": name}, stats["active"]) for name, stats in limiters.items()])
+    yield ("intellisupport_admission_queue_depth", "gauge", "Requests waiting for a slot",
+           [({"limiter": name}, stats["queue_depth"]) for name, stats in limiters.items()])
+    yield ("intellisupport_admission_rejected_total", "counter", "Requests rejected by admission control",
+           [({"limiter": name, "reason": reason}, count)
+            for name, stats in limiters.items() for reason, count in stats["rejected"].items()])
+
+    yield ("intellisupport_circuit_breaker_state", "gauge", "Breaker state per model (0 closed, 1 half-open, 2 open)",
+           [({"model": model}, BREAKER_STATES.get(state["state"], 0))
+            for model, state in manager.llm_client.breaker_states().items()])
+
+async def _warm_up(app: FastAPI) -> None:
+    """Build the agents once and push a dummy query through the pipeline.
+
+    A failed attempt (e.g. Chroma or the model files not available yet) is
+    retried with exponential backoff; /ready reports the last error meanwhile.
+    """
+    started = time.perf_counter()
+    loop = asyncio.get_running_loop()
+    delay = WARMUP_RETRY_INITIAL_SECONDS
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            if app.state.conversations is None:
+                conversations_config = get_config().conversations
+                # Model loading, opening Chroma and indexing conversation logs are
+                # blocking; keep them off the loop
+                app.state.conversations = await loop.run_in_executor(
+                    None,
+                    lambda: ConversationStore(
+                        conversations_config.directory,
+                        num_shards=conversations_config.num_shards,
+                        max_turns_per_conversation=conversations_config.max_turns_per_conversation,
+                        index_cache_entries=conversations_config.index_cache_entries
+                    )
+                )
+            manager = await loop.run_in_executor(None, ManagerAgent)
+            try:
+                await manager.warmup()
+            except Exception:
+                await manager.llm_client.aclose()
+                raise
+            app.state.manager = manager
+            registry.register_collector("manager", lambda: _manager_metrics(manager))
+            app.state.readiness = {
+                "ready": True,
+                "warmup_ms": round((time.perf_counter() - started) * 1000, 2),
+                "attempts": attempt
+            }
+            logger.info(f"Agents warmed up in {app.state.readiness['warmup_ms']} ms")
+            return
+        except Exception as e:
+            app.state.readiness = {"ready": False, "error": str(e), "attempts": attempt, "retry_in_seconds": delay}
+            logger.error(f"Warm-up attempt {attempt} failed, retrying in {delay:g}s: {e}")
+        await asyncio.sleep(delay)
+        delay = min(delay * 2, WARMUP_RETRY_MAX_SECONDS)
+
+async def _compact_conversations(app: FastAPI) -> None:
+    """Periodically trim conversation logs down to their retained turns"""
+    loop = asyncio.get_running_loop()
+    while True:
+        config = get_config().conversations
+        await asyncio.sleep(config.compaction_interval_seconds)
+        store = app.state.conversations
+        if store is None:
+            continue
+        try:
+            reclaimed = await loop.run_in_executor(None, store.compact, config.compaction_garbage_ratio)
+            if reclaimed:
+                logger.info(f"Compacted conversation shards, reclaimed {sum(reclaimed.values())} bytes")
+        except Exception as e:
+            logger.error(f"Conversation compaction failed: {e}")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.manager = None
+    app.state.conversations = None
+    app.state.events = EventStore.from_config()
+    app.state.readiness = {"ready": False, "status": "warming_up"}
+    config_service.start_watching()
+    # Warm up in the background so /health answers while models load
+    warmup_task = asyncio.create_task(_warm_up(app))
+    compaction_task = asyncio.create_task(_compact_conversations(app))
+    yield
+    warmup_task.cancel()
+    compaction_task.cancel()
+    if app.state.conversations is not None:
+        app.state.conversations.close()
+    if app.state.events is not None:
+        app.state.events.close()
+    if app.state.manager is not None:
+        await app.state.manager.llm_client.aclose()
+    tracer.close()
+    config_service.stop_watching()
+    flush_logging()
+
+class MetricsMiddleware:
+    """Counts requests and times them until the last body chunk is sent"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+
+        async def _send(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, _send)
+        finally:
+            # The router stores the matched route on the scope; label by its
+            # template so path parameters don't explode the label set
+            route = getattr(scope.get("route"), "path", "unmatched")
+            HTTP_REQUESTS.labels(method=scope["method"], route=route, status=status).inc()
+            HTTP_DURATION.labels(method=scope["method"], route=route).observe(time.perf_counter() - started)
+
+app = FastAPI(title="IntelliSupport API", lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
+
+@app.exception_handler(AdmissionException)
+async def admission_exception_handler(request: Request, exc: AdmissionException):
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
+# Identical concurrent questions share one pipeline run
+coalescer = SingleFlight()
+
+def get_manager(request: Request) -> ManagerAgent:
+    manager = request.app.state.manager
+    if manager is None:
+        raise HTTPException(status_code=503, detail="Service is warming up", headers={"Retry-After": "5"})
+    return manager
 
 class QueryRequest(BaseModel):
     query: str
     context: Dict[str, Any] = None
 
+class BatchQueryRequest(BaseModel):
+    queries: List[str]
+    contexts: Optional[List[Dict[str, Any]]] = None
+    concurrency: Optional[int] = Field(default=None, ge=1)
+
+class ChatRequest(BaseModel):
+    message: str
+    context: Dict[str, Any] = None
+    model: Optional[str] = None
+    conversation_id: Optional[str] = Field(default=None, max_length=CONVERSATION_ID_MAX_LENGTH,
+                                           pattern=CONVERSATION_ID_PATTERN)
+    session_id: Optional[str] = None
+
+def get_conversations(request: Request) -> ConversationStore:
+    store = request.app.state.conversations
+    if store is None:
+        raise HTTPException(status_code=503, detail="Service is warming up", headers={"Retry-After": "5"})
+    return store
+
+async def _chat_context(req: ChatRequest, conversation_id: str, store: ConversationStore) -> Dict[str, Any]:
+    context = dict(req.context or {})
+    if req.model:
+        context["model"] = req.model
+    context["session_id"] = req.session_id
+    context["history"] = await asyncio.get_running_loop().run_in_executor(
+        None,
+        store.get_history,
+        conversation_id,
+        get_config().conversations.history_turns
+    )
+    return context
+
+async def _record_turns(store: ConversationStore, conversation_id: str, message: str,
+                        response: Optional[str], metadata: Dict[str, Any]) -> None:
+    def _append() -> None:
+        store.append(conversation_id, "user", message)
+        store.append(conversation_id, "assistant", response or "", {
+            "intent": metadata.get("intent"),
+            "sentiment": metadata.get("sentiment")
+        })
+    await asyncio.get_running_loop().run_in_executor(None, _append)
+
+def _emit_event(app: FastAPI, endpoint: str, metadata: Dict[str, Any],
+                conversation_id: Optional[str] = None) -> None:
+    """Queue an analytics event; the write happens on the event store's thread"""
+    events = app.state.events
+    if events is not None:
+        events.emit(interaction_event(metadata, endpoint, conversation_id))
+
+async def _admitted_run(manager: ManagerAgent, query: str, context: Optional[Dict[str, Any]],
+                        request_id: str) -> Dict[str, Any]:
+    # Inside the coalesced call, so only the request that runs the pipeline holds a slot
+    async with manager.admission.admit():
+        return await manager.run(query, context, request_id=request_id)
+
+async def _coalesced_run(manager: ManagerAgent, query: str, context: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Run the pipeline, or share an identical in-flight run, under this caller's own identifiers"""
+    request_id = uuid.uuid4().hex
+    result = await coalescer.do(
+        coalesce_key(query, context),
+        lambda: _admitted_run(manager, query, context, request_id)
+    )
+    # A shared run carries the leader's request id and context (e.g. its session_id)
+    result["metadata"]["request_id"] = request_id
+    result["metadata"]["context"] = public_context(context or {})
+    return result
+
+async def _acquire_global(manager: ManagerAgent) -> Callable[[], None]:
+    """Take a global slot for a streamed response and return its (idempotent) release.
+
+    Admitting before the response starts keeps 429/503 possible. The release
+    has to run from the body generator's finally and again as a background
+    task: the generator's finally never runs if the client disconnects
+    before the body is first pulled.
+    """
+    limiter = manager.admission.global_limiter
+    await limiter.acquire()
+    released = False
+
+    def release() -> None:
+        nonlocal released
+        if not released:
+            released = True
+            limiter.release()
+    return release
+
+def _sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
 @app.get("/health")
-async def health():
-    return {"status": "ok"}
+async def health(request: Request):
+    manager = request.app.state.manager
+    if manager is None:
+        return {"status": "ok"}
+    # Liveness stays 200; an open breaker only marks the service degraded
+    models = manager.llm_client.breaker_states()
+    degraded = any(state["state"] != "closed" for state in models.values())
+    return {"status": "degraded" if degraded else "ok", "models": models}
+
+@app.get("/metrics")
+async def metrics():
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/ready")
+async def ready(request: Request):
+    readiness = request.app.state.readiness
+    return JSONResponse(readiness, status_code=200 if readiness.get("ready") else 503)
+
+@app.get("/cache/stats")
+async def cache_stats(manager: ManagerAgent = Depends(get_manager)):
+    return manager.cache.get_stats()
+
+@app.delete("/cache")
+async def cache_invalidate(intent: Optional[str] = None, manager: ManagerAgent = Depends(get_manager)):
+    if intent is None:
+        removed = len(manager.cache)
+        manager.cache.clear()
+    else:
+        removed = manager.cache.invalidate_intent(intent)
+    return {"removed": removed, "intent": intent}
+
+@app.get("/admission/stats")
+async def admission_stats(manager: ManagerAgent = Depends(get_manager)):
+    return manager.admission.get_stats()
+
+@app.get("/llm/stats")
+async def llm_stats(manager: ManagerAgent = Depends(get_manager)):
+    return manager.llm_client.get_stats()
+
+@app.get("/embedding/stats")
+async def embedding_stats(manager: ManagerAgent = Depends(get_manager)):
+    rag_agent = manager.rag_agent
+    return {
+        **rag_agent.embedding_service.get_stats(),
+        "cache": rag_agent.embedder.get_stats() if rag_agent.embedding_cache is not None else None
+    }
+
+@app.get("/agents/stats")
+async def agent_stats(manager: ManagerAgent = Depends(get_manager)):
+    return manager.activity.snapshot()
+
+@app.get("/coalescing/stats")
+async def coalescing_stats():
+    return coalescer.get_stats()
 
 @app.post("/query")
-async def query_endpoint(req: QueryRequest):
-    # This endpoint would call ManagerAgent in real implementation
-    return {"response": "This is a stub response from the API", "query": req.query}
+async def query_endpoint(req: QueryRequest, request: Request, manager: ManagerAgent = Depends(get_manager)):
+    result = await _coalesced_run(manager, req.query, req.context)
+    _emit_event(request.app, "query", result["metadata"])
+    return {"response": result["response"], "query": req.query, "metadata": result["metadata"]}
+
+@app.post("/query/batch")
+async def query_batch_endpoint(req: BatchQueryRequest, manager: ManagerAgent = Depends(get_manager)):
+    if req.contexts is not None and len(req.contexts) != len(req.queries):
+        raise HTTPException(status_code=422, detail="contexts must have one entry per query")
+    # One global slot per batch; the per-stage limiters bound the work inside it
+    release = await _acquire_global(manager)
+
+    async def ndjson_stream() -> AsyncIterator[str]:
+        try:
+            async for result in manager.run_batch(req.queries, req.contexts, req.concurrency):
+                yield json.dumps(result, default=str) + "\n"
+        finally:
+            release()
+
+    return StreamingResponse(ndjson_stream(), media_type="application/x-ndjson", background=BackgroundTask(release))
+
+@app.post("/api/chat")
+async def chat_endpoint(req: ChatRequest, request: Request, manager: ManagerAgent = Depends(get_manager),
+                        store: ConversationStore = Depends(get_conversations)):
+    conversation_id = req.conversation_id or uuid.uuid4().hex
+    context = await _chat_context(req, conversation_id, store)
+    result = await _coalesced_run(manager, req.message, context)
+    await _record_turns(store, conversation_id, req.message, result["response"], result["metadata"])
+    _emit_event(request.app, "chat", result["metadata"], conversation_id)
+    return {**result, "conversation_id": conversation_id}
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(req: ChatRequest, request: Request, manager: ManagerAgent = Depends(get_manager),
+                               store: ConversationStore = Depends(get_conversations)):
+    conversation_id = req.conversation_id or uuid.uuid4().hex
+    context = await _chat_context(req, conversation_id, store)
+    release = await _acquire_global(manager)
+
+    async def event_stream() -> AsyncIterator[str]:
+        try:
+            yield _sse("start", {"conversation_id": conversation_id})
+            async for event in manager.run_stream(req.message, context):
+                data = event["data"]
+                if event["event"] == "done":
+                    await _record_turns(store, conversation_id, req.message, data["response"], data["metadata"])
+                    _emit_event(request.app, "chat_stream", data["metadata"], conversation_id)
+                    data = {**data, "conversation_id": conversation_id}
+                yield _sse(event["event"], data)
+        except Exception as e:
+            logger.error(f"Streaming chat failed: {e}")
+            yield _sse("error", {"message": str(e)})
+        finally:
+            release()
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        background=BackgroundTask(release)
+    )
+
+@app.get("/api/conversations/{conversation_id}")
+async def conversation_history(conversation_id: str = Path(max_length=CONVERSATION_ID_MAX_LENGTH,
+                                                             pattern=CONVERSATION_ID_PATTERN),
+                               limit: int = 50,
+                               store: ConversationStore = Depends(get_conversations)):
+    turns = await asyncio.get_running_loop().run_in_executor(None, store.get_history, conversation_id, limit)
+    return {"conversation_id": conversation_id, "turns": turns}
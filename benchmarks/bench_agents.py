@@ -0,0 +1,81 @@
+"""Per-agent micro-benchmarks: each agent method in isolation"""
+
+import itertools
+from typing import List
+
+import numpy as np
+
+from ..agents.billing_agent import BillingAgent
+from ..agents.intent_agent import IntentAgent
+from ..agents.rag_agent import RAGAgent
+from ..agents.safety_agent import SafetyAgent
+from ..agents.sentiment_agent import SentimentAgent
+from ..agents.technical_agent import TechnicalAgent
+from ..config_service import get_config
+from ..utils.prompt_assembler import PromptAssembler
+from ..utils.semantic_cache import SemanticCache
+from .environment import synthetic_documents, synthetic_queries
+from .harness import BenchmarkResult, measure
+
+PII_TEXT = (
+    "Hi, this is Jane. You can reach me at jane.doe@example.com or 555-123-4567. "
+    "My colleague (john@example.org, 555.987.6543) had the same billing problem last month. "
+) * 4
+CLEAN_TEXT = "Thank you for reaching out. Your refund will be processed within five business days. " * 4
+
+
+async def run(iterations: int = 500) -> List[BenchmarkResult]:
+    """Requires benchmark_environment() to be active for the RAG benchmarks"""
+    results = []
+    queries = synthetic_queries(256)
+    next_query = itertools.cycle(queries).__next__
+
+    safety = SafetyAgent()
+    results.append(await measure("safety.redact_pii", lambda: safety.redact_pii(PII_TEXT), iterations))
+    results.append(await measure("safety.detect_pii.clean", lambda: safety.detect_pii(CLEAN_TEXT), iterations))
+    results.append(await measure("safety.check", lambda: safety.check(PII_TEXT), iterations))
+    batch = [PII_TEXT, CLEAN_TEXT] * 32
+    results.append(await measure("safety.detect_pii_batch.64", lambda: safety.detect_pii_batch(batch),
+                                 max(10, iterations // 10)))
+
+    intent = IntentAgent()
+    results.append(await measure("intent.classify", lambda: intent.classify(next_query()), iterations))
+    sentiment = SentimentAgent()
+    results.append(await measure("sentiment.analyze", lambda: sentiment.analyze(next_query()), iterations))
+    billing = BillingAgent()
+    results.append(await measure("billing.handle", lambda: billing.handle(next_query(), {"user_plan": "Pro"}),
+                                 iterations))
+    technical = TechnicalAgent()
+    results.append(await measure("technical.handle", lambda: technical.handle(next_query(), {}), iterations))
+
+    rag = RAGAgent()
+    await rag.warmup()
+    results.append(await measure("rag.embed_query", lambda: rag.embed_query(next_query()), iterations))
+    results.append(await measure("rag.embed_query.concurrent.32", lambda: rag.embed_query(next_query()), iterations,
+                                 concurrency=32))
+    results.append(await measure("rag.retrieve", lambda: rag.retrieve(next_query()), iterations))
+    results.append(await measure("rag.retrieve_batch.16", lambda: rag.retrieve_batch(queries[:16]),
+                                 max(10, iterations // 10)))
+
+    config = get_config()
+    assembler = PromptAssembler(encoding_name=config.prompt.encoding)
+    documents = synthetic_documents(20)
+    history = [{"role": "user" if i % 2 == 0 else "assistant", "content": q} for i, q in enumerate(queries[:20])]
+    results.append(await measure(
+        "prompt.assemble",
+        lambda: assembler.assemble(billing.prompt, next_query(), documents, history, budget=2048),
+        iterations
+    ))
+
+    cache = SemanticCache(max_entries=config.cache.max_entries)
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((config.cache.max_entries, 384)).astype(np.float32)
+    for i, vector in enumerate(vectors):
+        cache.put(vector, f"query {i}", "cached answer", intent="billing", sentiment="neutral")
+    probes = itertools.cycle(vectors[:256] + rng.normal(0, 0.05, (256, 384)).astype(np.float32)).__next__
+    results.append(await measure(
+        f"semantic_cache.lookup.{config.cache.max_entries}",
+        lambda: cache.lookup(probes(), intent="billing", sentiment="neutral"),
+        iterations
+    ))
+    return results
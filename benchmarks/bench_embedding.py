@@ -0,0 +1,118 @@
+"""Latency, throughput and memory of the embedding backends
+
+    python -m intellisupport.benchmarks.bench_embedding
+    python -m intellisupport.benchmarks.bench_embedding --backend onnx --output results/embedding.json
+
+Each backend is measured in its own subprocess so load time and resident
+memory are not polluted by the other one's model and libraries.
+"""
+
+import argparse
+import asyncio
+import json
+import resource
+import subprocess
+import sys
+import time
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict
+
+from ..config_service import get_config
+from .environment import synthetic_documents, synthetic_queries
+from .harness import environment_info, measure
+
+DEFAULT_OUTPUT = Path(__file__).parent / "results" / "embedding.json"
+VARIANTS = {
+    "sentence-transformers": {"backend": "sentence-transformers"},
+    "onnx": {"backend": "onnx", "onnx_quantized": False},
+    "onnx-int8": {"backend": "onnx", "onnx_quantized": True}
+}
+
+
+def _rss_mb() -> float:
+    # ru_maxrss is KB on Linux and bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+async def _bench(variant: str, iterations: int, batch_size: int) -> Dict[str, Any]:
+    from ..utils.embedder import create_embedder
+
+    baseline_rss = _rss_mb()
+    started = time.perf_counter()
+    embedder = create_embedder(replace(get_config().embedding, **VARIANTS[variant]))
+    load_seconds = time.perf_counter() - started
+
+    queries = synthetic_queries(iterations)
+    documents = synthetic_documents(batch_size * 4)
+    position = 0
+
+    def single() -> None:
+        nonlocal position
+        embedder.embed_text(queries[position % len(queries)])
+        position += 1
+
+    def batch() -> None:
+        nonlocal position
+        start = (position * batch_size) % len(documents)
+        embedder.embed_texts(documents[start:start + batch_size])
+        position += 1
+
+    single_result = await measure(f"embedding.{variant}.single", single, iterations=iterations, memory_iterations=0)
+    batch_result = await measure(f"embedding.{variant}.batch.{batch_size}", batch,
+                                 iterations=max(1, iterations // 10), memory_iterations=0)
+    return {
+        "variant": variant,
+        "load_seconds": round(load_seconds, 3),
+        "single": single_result.as_dict(),
+        "batch": batch_result.as_dict(),
+        "texts_per_second": round(batch_result.throughput_per_second * batch_size, 1),
+        "rss_before_load_mb": baseline_rss,
+        "peak_rss_mb": _rss_mb()
+    }
+
+
+def _run_child(variant: str, args: argparse.Namespace) -> Dict[str, Any]:
+    completed = subprocess.run(
+        [sys.executable, "-m", __spec__.name, "--child", variant,
+         "--iterations", str(args.iterations), "--batch-size", str(args.batch_size)],
+        capture_output=True, text=True
+    )
+    if completed.returncode != 0:
+        return {"variant": variant, "error": completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the embedding backends")
+    parser.add_argument("--backend", choices=sorted(VARIANTS), action="append",
+                        help="variant to measure (repeatable); default is all of them")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--child", choices=sorted(VARIANTS), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        print(json.dumps(asyncio.run(_bench(args.child, args.iterations, args.batch_size))))
+        return 0
+
+    results = [_run_child(variant, args) for variant in args.backend or VARIANTS]
+
+    print(f"{'variant':<24} {'load s':>8} {'p50 ms':>9} {'p95 ms':>9} {'texts/s':>9} {'RSS MB':>8}")
+    for r in results:
+        if "error" in r:
+            print(f"{r['variant']:<24} failed: {' '.join(r['error'])}")
+            continue
+        print(f"{r['variant']:<24} {r['load_seconds']:>8.2f} {r['single']['p50_ms']:>9.2f} "
+              f"{r['single']['p95_ms']:>9.2f} {r['texts_per_second']:>9.1f} {r['peak_rss_mb']:>8.1f}")
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({"environment": environment_info(), "results": results}, indent=2),
+                           encoding="utf-8")
+    return 1 if any("error" in r for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
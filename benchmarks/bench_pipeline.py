@@ -0,0 +1,91 @@
+"""End-to-end pipeline and HTTP throughput benchmarks"""
+
+import itertools
+import uuid
+from pathlib import Path
+from typing import List
+
+import httpx
+
+from ..agents.manager_agent import ManagerAgent
+from ..backend.main import app
+from ..config_service import get_config
+from ..utils.conversation_store import ConversationStore
+from ..utils.event_store import EventStore
+from .environment import synthetic_queries
+from .harness import BenchmarkResult, measure
+
+
+async def run_pipeline(manager: ManagerAgent, iterations: int = 200, concurrency: int = 16) -> List[BenchmarkResult]:
+    """ManagerAgent end to end against the fake LLM and the synthetic corpus"""
+    results = []
+    next_query = itertools.cycle(synthetic_queries(1024, seed=1)).__next__
+
+    results.append(await measure(
+        "pipeline.run", lambda: manager.run(next_query(), use_cache=False), iterations
+    ))
+    results.append(await measure(
+        f"pipeline.run.concurrent.{concurrency}", lambda: manager.run(next_query(), use_cache=False),
+        iterations, concurrency=concurrency
+    ))
+    results.append(await measure(
+        "pipeline.run.cache_hit", lambda: manager.run("I was charged twice on my last invoice"), iterations
+    ))
+
+    async def stream_one() -> None:
+        async for _ in manager.run_stream(next_query()):
+            pass
+
+    results.append(await measure("pipeline.run_stream", stream_one, iterations))
+
+    batch = synthetic_queries(64, seed=2)
+
+    async def batch_of_64() -> None:
+        async for _ in manager.run_batch(batch):
+            pass
+
+    results.append(await measure("pipeline.run_batch.64", batch_of_64, max(5, iterations // 20)))
+    return results
+
+
+async def run_http(manager: ManagerAgent, scratch: Path, iterations: int = 500,
+                   concurrency: int = 32) -> List[BenchmarkResult]:
+    """Request throughput of backend/main.py, in-process over ASGI"""
+    config = get_config().conversations
+    conversations = ConversationStore(str(scratch / "http-conversations"), num_shards=config.num_shards)
+    # ASGITransport does not run the lifespan, so install the warmed-up state directly
+    app.state.manager = manager
+    app.state.conversations = conversations
+    app.state.events = EventStore.from_config()
+    app.state.readiness = {"ready": True}
+
+    results = []
+    next_query = itertools.cycle(synthetic_queries(2048, seed=3)).__next__
+    # Each worker keeps talking in its own conversation, so history loading is exercised
+    next_conversation = itertools.cycle([uuid.uuid4().hex for _ in range(concurrency)]).__next__
+
+    try:
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://bench",
+                                     timeout=60) as client:
+            results.append(await measure(
+                "http.health", lambda: client.get("/health"), iterations, concurrency=concurrency
+            ))
+
+            async def query() -> None:
+                response = await client.post("/query", json={"query": next_query(), "context": {}})
+                response.raise_for_status()
+
+            results.append(await measure("http.query", query, iterations, concurrency=concurrency))
+
+            async def chat() -> None:
+                response = await client.post(
+                    "/api/chat", json={"message": next_query(), "conversation_id": next_conversation()}
+                )
+                response.raise_for_status()
+
+            results.append(await measure("http.chat", chat, iterations, concurrency=concurrency))
+    finally:
+        conversations.close()
+        if app.state.events is not None:
+            app.state.events.close()
+    return results
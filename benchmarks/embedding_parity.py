@@ -0,0 +1,94 @@
+"""Check that the ONNX embedding backend agrees with the PyTorch one
+
+    python -m intellisupport.benchmarks.embedding_parity
+    python -m intellisupport.benchmarks.embedding_parity --no-quantized --min-cosine 0.999
+
+Embeds a fixed corpus (the benchmark documents and queries) with both
+backends and compares the vectors row by row, plus the top-k neighbours each
+query retrieves. Exits 1 when agreement is below the thresholds.
+"""
+
+import argparse
+import json
+import sys
+from dataclasses import replace
+from pathlib import Path
+from typing import Any, Dict
+
+import numpy as np
+
+from ..config_service import EmbeddingConfig, get_config
+from ..utils.embedder import Embedder, OnnxEmbedder
+from .environment import synthetic_documents, synthetic_queries
+
+MIN_COSINE = 0.98
+MEAN_COSINE = 0.99
+MIN_OVERLAP = 0.9
+
+
+def compare(reference: np.ndarray, candidate: np.ndarray, queries: int, top_k: int = 5) -> Dict[str, Any]:
+    cosines = np.sum(reference * candidate, axis=1)
+    documents = len(reference) - queries
+
+    # Neighbour overlap: the queries searched against the documents, per backend
+    overlaps = []
+    for vectors in (reference, candidate):
+        scores = vectors[documents:] @ vectors[:documents].T
+        overlaps.append(np.argsort(-scores, axis=1)[:, :top_k])
+    overlap = np.mean([len(set(a) & set(b)) / top_k for a, b in zip(*overlaps)])
+
+    return {
+        "texts": len(reference),
+        "min_cosine": round(float(cosines.min()), 5),
+        "p01_cosine": round(float(np.percentile(cosines, 1)), 5),
+        "mean_cosine": round(float(cosines.mean()), 5),
+        f"top{top_k}_overlap": round(float(overlap), 4)
+    }
+
+
+def onnx_model_path(config: EmbeddingConfig) -> Path:
+    """The exported model file ``OnnxEmbedder`` loads for ``config``"""
+    return Path(config.onnx_directory) / ("model.int8.onnx" if config.onnx_quantized else "model.onnx")
+
+
+def parity_report(config: EmbeddingConfig, documents: int = 500, queries: int = 100) -> Dict[str, Any]:
+    """Embed the benchmark corpus with both backends and compare the results"""
+    texts = synthetic_documents(documents) + synthetic_queries(queries)
+
+    reference = Embedder(config.model_name, batch_size=config.batch_size).embed_texts(texts)
+    candidate = OnnxEmbedder(
+        config.onnx_directory,
+        model_name=config.model_name,
+        batch_size=config.batch_size,
+        quantized=config.onnx_quantized,
+        max_seq_length=config.max_seq_length
+    ).embed_texts(texts)
+
+    report = compare(reference, candidate, queries)
+    report["quantized"] = config.onnx_quantized
+    return report
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compare ONNX and PyTorch embeddings")
+    parser.add_argument("--documents", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--no-quantized", action="store_true", help="compare the float32 export instead of int8")
+    parser.add_argument("--min-cosine", type=float, default=MIN_COSINE)
+    parser.add_argument("--mean-cosine", type=float, default=MEAN_COSINE)
+    parser.add_argument("--min-overlap", type=float, default=MIN_OVERLAP)
+    args = parser.parse_args()
+
+    config = replace(get_config().embedding, onnx_quantized=not args.no_quantized)
+    report = parity_report(config, args.documents, args.queries)
+    print(json.dumps(report, indent=2))
+
+    passed = (report["min_cosine"] >= args.min_cosine and report["mean_cosine"] >= args.mean_cosine
+              and report["top5_overlap"] >= args.min_overlap)
+    if not passed:
+        print("ONNX embeddings diverge from the PyTorch backend beyond the thresholds")
+    return 0 if passed else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,130 @@
+"""Self-contained benchmark environment: synthetic corpus and a local fake LLM"""
+
+import random
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+from ..config_service import config_service
+from ..utils.chroma_client import ChromaClient
+from ..utils.embedder import Embedder, create_embedder
+from .fake_llm_server import FakeLLMSettings, create_app
+
+CORPUS_COLLECTION = "bench_corpus"
+
+_TOPICS = {
+    "billing": ["invoice", "refund", "subscription", "payment method", "plan upgrade", "billing cycle"],
+    "technical": ["login error", "API timeout", "password reset", "sync failure", "webhook", "mobile app crash"],
+    "general": ["account settings", "data export", "team invites", "notifications", "privacy", "support hours"]
+}
+_TEMPLATES = [
+    "How to handle a {topic} issue: open the dashboard, go to {area} and follow the steps for {topic}.",
+    "Troubleshooting {topic}: most problems with {topic} are solved by checking {area} and retrying.",
+    "FAQ: What happens to my {area} when I change my {topic}? Changes apply from the next cycle.",
+    "Policy on {topic}: customers on the Pro plan can manage {topic} themselves under {area}."
+]
+_AREAS = ["Settings", "Billing", "Security", "Integrations", "Profile", "Admin console"]
+
+SAMPLE_QUERIES = [
+    "I was charged twice on my last invoice",
+    "How do I get a refund for my subscription?",
+    "The API keeps timing out when I sync",
+    "I can't log in after resetting my password",
+    "How do I export all of my account data?",
+    "My mobile app crashes on startup",
+    "Can I change my payment method mid cycle?",
+    "Where do I configure webhooks?"
+]
+
+
+def synthetic_documents(count: int, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    docs = []
+    for i in range(count):
+        category = rng.choice(list(_TOPICS))
+        template = rng.choice(_TEMPLATES)
+        text = template.format(topic=rng.choice(_TOPICS[category]), area=rng.choice(_AREAS))
+        docs.append(f"[{category} #{i}] {text}")
+    return docs
+
+
+def synthetic_queries(count: int, seed: int = 0) -> List[str]:
+    """Distinct variants of the sample queries, so nothing is coalesced or cached by accident"""
+    rng = random.Random(seed)
+    return [f"{rng.choice(SAMPLE_QUERIES)} (ticket {i})" for i in range(count)]
+
+
+def build_corpus(directory: str, size: int, embedder: Embedder, batch_size: int = 512) -> ChromaClient:
+    """Fill a fresh collection with ``size`` synthetic documents"""
+    client = ChromaClient(persist_directory=directory, collection_name=CORPUS_COLLECTION)
+    docs = synthetic_documents(size)
+    for start in range(0, size, batch_size):
+        batch = docs[start:start + batch_size]
+        client.collection.add(
+            ids=[f"doc-{start + i}" for i in range(len(batch))],
+            documents=batch,
+            embeddings=embedder.embed_texts(batch).tolist(),
+            metadatas=[{"source": "synthetic"} for _ in batch]
+        )
+    return client
+
+
+class FakeLLMThread:
+    """Runs the fake LLM server on a free local port in a background thread"""
+
+    def __init__(self, settings: Optional[FakeLLMSettings] = None, seed: int = 0):
+        import uvicorn
+        self.app = create_app(settings, seed=seed)
+        self.server = uvicorn.Server(uvicorn.Config(self.app, host="127.0.0.1", port=0, log_level="warning"))
+        self.thread = threading.Thread(target=self.server.run, name="fake-llm", daemon=True)
+
+    @property
+    def base_url(self) -> str:
+        port = self.server.servers[0].sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}/v1"
+
+    def __enter__(self) -> "FakeLLMThread":
+        self.thread.start()
+        deadline = time.monotonic() + 10
+        while not self.server.started:
+            if time.monotonic() > deadline or not self.thread.is_alive():
+                raise RuntimeError("Fake LLM server did not start")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.server.should_exit = True
+        self.thread.join(timeout=5)
+
+
+@contextmanager
+def benchmark_environment(corpus_size: int = 2000,
+                          llm_settings: Optional[FakeLLMSettings] = None) -> Iterator[Path]:
+    """Point retrieval, the LLM and conversation storage at throwaway local stand-ins.
+
+    Yields the scratch directory; config.yaml on disk is never modified.
+    """
+    with tempfile.TemporaryDirectory(prefix="intellisupport-bench-") as tmp, FakeLLMThread(llm_settings) as llm:
+        scratch = Path(tmp)
+        overrides = {
+            "llm": {
+                "primary_model": "fake/primary",
+                "fallback_model": "fake/fallback",
+                "providers": {"fake": {"base_url": llm.base_url}}
+            },
+            "retrieval": {
+                "persist_directory": str(scratch / "chroma"),
+                "chroma_collection": CORPUS_COLLECTION
+            },
+            "conversations": {"directory": str(scratch / "conversations")},
+            "events": {"directory": str(scratch / "events")},
+            "embedding": {"cache_directory": str(scratch / "embedding_cache")}
+        }
+        with config_service.override(overrides) as config:
+            # Same backend as the RAG agent, so corpus and query vectors match
+            embedder = create_embedder(config.embedding)
+            build_corpus(config.retrieval.persist_directory, corpus_size, embedder)
+            yield scratch
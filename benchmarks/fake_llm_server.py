@@ -0,0 +1,329 @@
+"""Local stand-in for an OpenAI-compatible chat-completions API
+
+Used to load-test and benchmark the backend offline: latency, streaming
+rate, error injection and rate limiting are all configurable, and a fixed
+seed makes runs repeatable.
+
+Run it::
+
+    python -m intellisupport.benchmarks.fake_llm_server --port 9000 \
+        --latency lognormal:0.4,0.5 --tokens-per-second 60 --error-rate 0.02 --rate-limit-rps 50
+
+and point the backend at it (the ``fake`` provider in config.yaml)::
+
+    llm:
+      primary_model: "fake/primary"
+      fallback_model: "fake/fallback"
+
+Per-model behaviour can be overridden, e.g. ``--model primary=latency=fixed:2.0,error_rate=0.5``
+to make the primary slow and flaky while the fallback stays healthy.
+Settings can also be changed while the server runs with ``PUT /admin/settings``.
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import random
+import time
+import uuid
+from dataclasses import asdict, dataclass, field, fields, replace
+from functools import lru_cache
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+FILLER = (
+    "thanks for reaching out we can help with that please check your account settings and "
+    "let us know if the issue persists our team is happy to assist with billing technical and "
+    "general questions at any time"
+).split()
+
+
+@lru_cache(maxsize=64)
+def parse_latency(spec: str) -> Callable[[random.Random], float]:
+    """Build a sampler (seconds) from ``kind:params``.
+
+    Supported: ``fixed:s``, ``uniform:low,high``, ``normal:mean,std``,
+    ``lognormal:median,sigma`` and ``exponential:mean``.
+    """
+    kind, _, params = spec.partition(":")
+    values = [float(v) for v in params.split(",") if v]
+    try:
+        if kind == "fixed":
+            (seconds,) = values
+            return lambda rng: seconds
+        if kind == "uniform":
+            low, high = values
+            return lambda rng: rng.uniform(low, high)
+        if kind == "normal":
+            mean, std = values
+            return lambda rng: max(0.0, rng.gauss(mean, std))
+        if kind == "lognormal":
+            median, sigma = values
+            return lambda rng: rng.lognormvariate(math.log(median), sigma)
+        if kind == "exponential":
+            (mean,) = values
+            return lambda rng: rng.expovariate(1 / mean)
+    except ValueError:
+        raise ValueError(f"Wrong number of parameters for latency '{spec}'") from None
+    raise ValueError(f"Unknown latency distribution '{kind}'")
+
+
+@dataclass
+class FakeLLMSettings:
+    latency: str = "fixed:0.2"              # time to first token
+    tokens_per_second: float = 50.0         # streaming rate; 0 streams everything at once
+    completion_tokens: int = 60             # words per generated answer
+    error_rate: float = 0.0                 # share of requests answered with error_status
+    error_status: int = 500
+    stream_abort_rate: float = 0.0          # share of streams cut off halfway
+    rate_limit_rps: float = 0.0             # token bucket; 0 disables
+    rate_limit_burst: int = 0               # bucket size; defaults to rate_limit_rps
+    max_concurrency: int = 0                # 429 above this many in flight; 0 disables
+    retry_after_seconds: int = 1
+    models: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+
+    def for_model(self, model: str) -> "FakeLLMSettings":
+        overrides = {k: v for k, v in self.models.get(model, {}).items() if k != "models"}
+        return replace(self, **overrides) if overrides else self
+
+
+class _TokenBucket:
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = max(1, burst or int(math.ceil(rate)))
+        self.tokens = float(self.capacity)
+        self.updated = time.monotonic()
+
+    def take(self) -> bool:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+
+class FakeLLM:
+    """Request handling and counters behind the HTTP routes"""
+
+    def __init__(self, settings: FakeLLMSettings, seed: Optional[int] = 0):
+        self.settings = settings
+        self.rng = random.Random(seed)
+        self._buckets: Dict[str, _TokenBucket] = {}
+        self.in_flight = 0
+        self.stats = {"requests": 0, "completed": 0, "streamed": 0, "errors_injected": 0,
+                      "streams_aborted": 0, "rate_limited": 0, "max_in_flight": 0}
+
+    def _rate_limited(self, model: str, settings: FakeLLMSettings) -> bool:
+        if settings.max_concurrency and self.in_flight >= settings.max_concurrency:
+            return True
+        if not settings.rate_limit_rps:
+            return False
+        bucket = self._buckets.get(model)
+        if bucket is None or bucket.rate != settings.rate_limit_rps:
+            bucket = self._buckets[model] = _TokenBucket(settings.rate_limit_rps, settings.rate_limit_burst)
+        return not bucket.take()
+
+    def _answer(self, messages: List[Dict[str, Any]], length: int) -> List[str]:
+        """Deterministic-length answer that echoes part of the question"""
+        question = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+        words = question.split()[:8] + [self.rng.choice(FILLER) for _ in range(length)]
+        return [word + " " for word in words[:length]]
+
+    async def handle(self, body: Dict[str, Any]):
+        model = body.get("model", "fake")
+        settings = self.settings.for_model(model)
+        self.stats["requests"] += 1
+
+        if self._rate_limited(model, settings):
+            self.stats["rate_limited"] += 1
+            return JSONResponse(
+                {"error": {"message": "Rate limit exceeded", "type": "rate_limit_error"}},
+                status_code=429,
+                headers={"Retry-After": str(settings.retry_after_seconds)}
+            )
+
+        self.in_flight += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self.in_flight)
+        try:
+            await asyncio.sleep(parse_latency(settings.latency)(self.rng))
+            if self.rng.random() < settings.error_rate:
+                self.stats["errors_injected"] += 1
+                return JSONResponse(
+                    {"error": {"message": "Injected failure", "type": "server_error"}},
+                    status_code=settings.error_status
+                )
+
+            length = settings.completion_tokens
+            if body.get("max_tokens"):
+                length = min(length, body["max_tokens"])
+            tokens = self._answer(body.get("messages", []), length)
+            prompt_tokens = sum(len(str(m.get("content", "")).split()) for m in body.get("messages", []))
+            if body.get("stream"):
+                abort_at = len(tokens) // 2 if self.rng.random() < settings.stream_abort_rate else None
+                self.in_flight += 1  # held until the stream finishes
+                return StreamingResponse(
+                    self._stream(model, tokens, settings.tokens_per_second, abort_at),
+                    media_type="text/event-stream"
+                )
+
+            self.stats["completed"] += 1
+            return JSONResponse({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": "".join(tokens).strip()},
+                    "finish_reason": "stop"
+                }],
+                "usage": {
+                    "prompt_tokens": prompt_tokens,
+                    "completion_tokens": len(tokens),
+                    "total_tokens": prompt_tokens + len(tokens)
+                }
+            })
+        finally:
+            self.in_flight -= 1
+
+    async def _stream(self, model: str, tokens: List[str], tokens_per_second: float,
+                      abort_at: Optional[int]) -> AsyncIterator[str]:
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        interval = 1 / tokens_per_second if tokens_per_second > 0 else 0
+
+        def chunk(delta: Dict[str, str], finish_reason: Optional[str] = None) -> str:
+            payload = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}]
+            }
+            return f"data: {json.dumps(payload)}\n\n"
+
+        try:
+            yield chunk({"role": "assistant"})
+            for i, token in enumerate(tokens):
+                if abort_at is not None and i == abort_at:
+                    self.stats["streams_aborted"] += 1
+                    raise ConnectionAbortedError("Injected stream abort")
+                if i and interval:
+                    await asyncio.sleep(interval)
+                yield chunk({"content": token})
+            yield chunk({}, finish_reason="stop")
+            yield "data: [DONE]\n\n"
+            self.stats["streamed"] += 1
+        finally:
+            self.in_flight -= 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, "in_flight": self.in_flight}
+
+
+def create_app(settings: Optional[FakeLLMSettings] = None, seed: Optional[int] = 0) -> FastAPI:
+    fake = FakeLLM(settings or FakeLLMSettings(), seed=seed)
+    app = FastAPI(title="Fake LLM")
+    app.state.fake = fake
+
+    @app.post("/v1/chat/completions")
+    @app.post("/chat/completions")
+    async def chat_completions(request: Request):
+        return await fake.handle(await request.json())
+
+    @app.get("/v1/models")
+    async def list_models():
+        names = sorted(fake.settings.models) or ["fake"]
+        return {"object": "list", "data": [{"id": name, "object": "model", "owned_by": "fake"} for name in names]}
+
+    @app.get("/stats")
+    async def stats():
+        return fake.get_stats()
+
+    @app.get("/admin/settings")
+    async def get_settings():
+        return asdict(fake.settings)
+
+    @app.put("/admin/settings")
+    async def update_settings(request: Request):
+        changes = await request.json()
+        known = {f.name for f in fields(FakeLLMSettings)}
+        unknown = set(changes) - known
+        if unknown:
+            return JSONResponse({"detail": f"Unknown settings: {sorted(unknown)}"}, status_code=400)
+        if "latency" in changes:
+            parse_latency(changes["latency"])
+        fake.settings = replace(fake.settings, **changes)
+        return asdict(fake.settings)
+
+    return app
+
+
+def _parse_model_override(spec: str) -> Dict[str, Dict[str, Any]]:
+    """``name=key=value,key=value`` -> {name: {key: value}}"""
+    name, _, assignments = spec.partition("=")
+    types = {f.name: f.type for f in fields(FakeLLMSettings)}
+    overrides: Dict[str, Any] = {}
+    # Latency specs contain commas themselves, so split on ",<known key>="
+    parts: List[str] = []
+    for piece in assignments.split(","):
+        if "=" in piece and piece.split("=", 1)[0] in types:
+            parts.append(piece)
+        elif parts:
+            parts[-1] += "," + piece
+    for part in parts:
+        key, value = part.split("=", 1)
+        caster = types[key] if types[key] in (int, float) else str
+        overrides[key] = caster(value)
+    return {name: overrides}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fake OpenAI-compatible LLM server for offline load tests")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--latency", default="fixed:0.2", help="e.g. fixed:0.2, uniform:0.1,0.5, lognormal:0.3,0.6")
+    parser.add_argument("--tokens-per-second", type=float, default=50.0)
+    parser.add_argument("--completion-tokens", type=int, default=60)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=500)
+    parser.add_argument("--stream-abort-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-rps", type=float, default=0.0)
+    parser.add_argument("--rate-limit-burst", type=int, default=0)
+    parser.add_argument("--max-concurrency", type=int, default=0)
+    parser.add_argument("--model", action="append", default=[],
+                        help="per-model overrides, e.g. primary=latency=fixed:2,error_rate=0.3")
+    args = parser.parse_args()
+
+    parse_latency(args.latency)
+    models: Dict[str, Dict[str, Any]] = {}
+    for spec in args.model:
+        models.update(_parse_model_override(spec))
+    for overrides in models.values():
+        if "latency" in overrides:
+            parse_latency(overrides["latency"])
+
+    settings = FakeLLMSettings(
+        latency=args.latency,
+        tokens_per_second=args.tokens_per_second,
+        completion_tokens=args.completion_tokens,
+        error_rate=args.error_rate,
+        error_status=args.error_status,
+        stream_abort_rate=args.stream_abort_rate,
+        rate_limit_rps=args.rate_limit_rps,
+        rate_limit_burst=args.rate_limit_burst,
+        max_concurrency=args.max_concurrency,
+        models=models
+    )
+
+    import uvicorn
+    uvicorn.run(create_app(settings, seed=args.seed), host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,161 @@
+"""Timing, memory measurement and baseline comparison for the benchmarks"""
+
+import asyncio
+import inspect
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Union
+
+# metric -> True when a larger value is worse
+REGRESSION_METRICS = {
+    "p50_ms": True,
+    "p95_ms": True,
+    "throughput_per_second": False,
+    "peak_memory_kb": True
+}
+
+
+@dataclass
+class BenchmarkResult:
+    name: str
+    iterations: int
+    concurrency: int
+    errors: int
+    total_seconds: float
+    mean_ms: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+    max_ms: float
+    throughput_per_second: float
+    peak_memory_kb: float
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _percentile(ordered: List[float], p: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+async def _call(func: Callable[[], Union[Any, Awaitable[Any]]]) -> None:
+    result = func()
+    if inspect.isawaitable(result):
+        await result
+
+
+async def _run(func, iterations: int, concurrency: int) -> List[float]:
+    """Run ``func`` ``iterations`` times across ``concurrency`` workers; returns latencies"""
+    latencies: List[float] = []
+    remaining = iterations
+
+    async def worker() -> None:
+        nonlocal remaining
+        while remaining > 0:
+            remaining -= 1
+            started = time.perf_counter()
+            await _call(func)
+            latencies.append(time.perf_counter() - started)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return latencies
+
+
+async def measure(name: str, func: Callable[[], Union[Any, Awaitable[Any]]], iterations: int = 100,
+                  warmup: int = 5, concurrency: int = 1, memory_iterations: int = 20) -> BenchmarkResult:
+    """Time ``func`` (sync or async, no arguments) and record its peak memory.
+
+    Memory is traced in a separate, shorter pass so tracemalloc's overhead
+    does not distort the latency numbers.
+    """
+    for _ in range(warmup):
+        try:
+            await _call(func)
+        except Exception:
+            pass  # failures are counted in the timed pass; one bad warm-up call must not end the run
+
+    errors = 0
+
+    async def guarded() -> None:
+        nonlocal errors
+        try:
+            await _call(func)
+        except Exception:
+            errors += 1
+
+    started = time.perf_counter()
+    latencies = await _run(guarded, iterations, concurrency)
+    total = time.perf_counter() - started
+    timed_errors = errors
+
+    peak_kb = 0.0
+    if memory_iterations:
+        tracemalloc.start()
+        try:
+            await _run(guarded, min(memory_iterations, iterations), concurrency)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        peak_kb = peak / 1024
+
+    ordered = sorted(latencies)
+    return BenchmarkResult(
+        name=name,
+        iterations=iterations,
+        concurrency=concurrency,
+        errors=timed_errors,
+        total_seconds=round(total, 4),
+        mean_ms=round(sum(ordered) / len(ordered) * 1000, 4) if ordered else 0.0,
+        p50_ms=round(_percentile(ordered, 0.5) * 1000, 4),
+        p95_ms=round(_percentile(ordered, 0.95) * 1000, 4),
+        p99_ms=round(_percentile(ordered, 0.99) * 1000, 4),
+        max_ms=round(ordered[-1] * 1000, 4) if ordered else 0.0,
+        throughput_per_second=round(iterations / total, 2) if total > 0 else 0.0,
+        peak_memory_kb=round(peak_kb, 1)
+    )
+
+
+def compare_to_baseline(results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float = 0.2,
+                        memory_tolerance: float = 0.3, min_latency_delta_ms: float = 0.05) -> List[Dict[str, Any]]:
+    """Metrics that got worse than the baseline by more than the tolerance
+
+    Latency changes smaller than ``min_latency_delta_ms`` are treated as
+    noise, whatever their relative size.
+    """
+    previous = {result["name"]: result for result in baseline.get("results", [])}
+    regressions = []
+    for result in results:
+        base = previous.get(result["name"])
+        if base is None:
+            continue
+        for metric, larger_is_worse in REGRESSION_METRICS.items():
+            old, new = base.get(metric), result.get(metric)
+            if not old or new is None:
+                continue
+            if metric.endswith("_ms") and abs(new - old) < min_latency_delta_ms:
+                continue
+            change = (new - old) / old
+            allowed = memory_tolerance if metric == "peak_memory_kb" else tolerance
+            if (change > allowed) if larger_is_worse else (change < -allowed):
+                regressions.append({
+                    "name": result["name"],
+                    "metric": metric,
+                    "baseline": old,
+                    "current": new,
+                    "change": round(change, 4)
+                })
+    return regressions
+
+
+def environment_info() -> Dict[str, Any]:
+    return {
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "processor": platform.processor()
+    }
@@ -0,0 +1,109 @@
+"""Run the benchmark suite and compare it against a stored baseline
+
+    python -m intellisupport.benchmarks.run                      # everything
+    python -m intellisupport.benchmarks.run --suite agents       # one suite
+    python -m intellisupport.benchmarks.run --save-baseline      # accept current numbers
+
+Everything runs offline: retrieval uses a synthetic Chroma corpus in a temp
+directory and the LLM is the in-repo fake server. Results are written as
+JSON; the exit code is 1 when any metric regressed beyond the tolerance.
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, List
+
+from .fake_llm_server import FakeLLMSettings
+from .harness import BenchmarkResult, compare_to_baseline, environment_info
+
+BENCHMARK_DIR = Path(__file__).parent
+DEFAULT_OUTPUT = BENCHMARK_DIR / "results" / "latest.json"
+DEFAULT_BASELINE = BENCHMARK_DIR / "baseline.json"
+SUITES = ("agents", "pipeline", "http")
+
+
+async def _run_suites(args: argparse.Namespace) -> List[BenchmarkResult]:
+    # Imported here so --help works without the ML dependencies installed
+    from . import bench_agents, bench_pipeline
+    from ..agents.manager_agent import ManagerAgent
+    from .environment import benchmark_environment
+
+    llm_settings = FakeLLMSettings(latency=args.llm_latency, tokens_per_second=args.tokens_per_second)
+    results: List[BenchmarkResult] = []
+    with benchmark_environment(args.corpus_size, llm_settings) as scratch:
+        if "agents" in args.suite:
+            results += await bench_agents.run(args.iterations)
+        if "pipeline" in args.suite or "http" in args.suite:
+            manager = ManagerAgent()
+            await manager.warmup()
+            try:
+                if "pipeline" in args.suite:
+                    results += await bench_pipeline.run_pipeline(manager, max(1, args.iterations // 2))
+                if "http" in args.suite:
+                    results += await bench_pipeline.run_http(manager, scratch, args.iterations)
+            finally:
+                await manager.llm_client.aclose()
+    return results
+
+
+def _print_table(results: List[Dict[str, Any]], regressions: List[Dict[str, Any]]) -> None:
+    regressed = {r["name"] for r in regressions}
+    print(f"{'benchmark':<40} {'p50 ms':>10} {'p95 ms':>10} {'ops/s':>10} {'peak KB':>10} {'errors':>7}")
+    for r in results:
+        flag = "  <-- regression" if r["name"] in regressed else ""
+        print(f"{r['name']:<40} {r['p50_ms']:>10.3f} {r['p95_ms']:>10.3f} {r['throughput_per_second']:>10.1f} "
+              f"{r['peak_memory_kb']:>10.1f} {r['errors']:>7}{flag}")
+    for r in regressions:
+        print(f"REGRESSION {r['name']} {r['metric']}: {r['baseline']} -> {r['current']} ({r['change']:+.1%})")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="IntelliSupport benchmark suite")
+    parser.add_argument("--suite", nargs="+", choices=SUITES, default=list(SUITES))
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--corpus-size", type=int, default=2000)
+    parser.add_argument("--llm-latency", default="fixed:0.02", help="fake LLM time to first token")
+    parser.add_argument("--tokens-per-second", type=float, default=0.0, help="fake LLM streaming rate; 0 = instant")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT)
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the new baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative latency/throughput change")
+    parser.add_argument("--memory-tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    results = [result.as_dict() for result in asyncio.run(_run_suites(args))]
+
+    regressions: List[Dict[str, Any]] = []
+    if args.baseline.exists() and not args.save_baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+        regressions = compare_to_baseline(results, baseline, args.tolerance, args.memory_tolerance)
+
+    report = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "environment": environment_info(),
+        "parameters": {
+            "suites": args.suite,
+            "iterations": args.iterations,
+            "corpus_size": args.corpus_size,
+            "llm_latency": args.llm_latency,
+            "tokens_per_second": args.tokens_per_second
+        },
+        "results": results,
+        "regressions": regressions
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    if args.save_baseline:
+        args.baseline.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    _print_table(results, regressions)
+    print(f"\nResults written to {args.output}" + (f", baseline saved to {args.baseline}" if args.save_baseline else ""))
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,352 @@
+"""Cached, hot-reloadable access to config.yaml
+
+config.yaml is parsed once into an immutable ``ConfigSnapshot``. Readers call
+``get_config()`` and get the current snapshot back without touching the disk;
+a watcher thread polls the file's mtime and swaps in a freshly parsed snapshot
+when it changes (e.g. after the Settings page saves).
+"""
+
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Dict, Iterator, Mapping, Optional, Tuple
+
+import yaml
+
+CONFIG_PATH = Path(__file__).parent / "config.yaml"
+
+
+@dataclass(frozen=True)
+class LLMConfig:
+    primary_model: str = "groq/llama-3.1-70b-versatile"
+    fallback_model: str = "google/gemini-1.5-flash"
+    max_tokens: int = 1024
+    timeout_seconds: float = 20
+    temperature: float = 0.7
+    top_p: float = 0.9
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    hedge_enabled: bool = True
+    hedge_percentile: float = 0.95
+    hedge_min_samples: int = 20
+    hedge_min_delay_ms: float = 250
+    hedge_budget_ratio: float = 0.1
+    hedge_budget_burst: float = 10
+    latency_window: int = 200
+    providers: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+
+
+@dataclass(frozen=True)
+class CircuitBreakerConfig:
+    enabled: bool = True
+    window: int = 50
+    min_calls: int = 10
+    failure_rate_threshold: float = 0.5
+    slow_call_seconds: float = 10.0
+    slow_call_rate_threshold: float = 0.8
+    open_seconds: float = 30.0
+    half_open_probes: int = 2
+
+
+@dataclass(frozen=True)
+class EmbeddingConfig:
+    model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
+    batch_size: int = 16
+    backend: str = "sentence-transformers"
+    onnx_directory: str = "models/all-MiniLM-L6-v2-onnx"
+    onnx_quantized: bool = True
+    max_seq_length: int = 256
+    num_threads: int = 0
+    max_batch_wait_ms: float = 2.0
+    max_concurrent_batches: int = 1
+    cache_enabled: bool = True
+    cache_directory: str = "data/embedding_cache"
+    cache_dtype: str = "float16"
+    query_cache_entries: int = 10000
+
+
+@dataclass(frozen=True)
+class RetrievalConfig:
+    chroma_collection: str = "org_docs_v1"
+    persist_directory: str = "db/chroma"
+    top_k: int = 5
+    score_threshold: float = 0.3
+
+
+@dataclass(frozen=True)
+class IngestionConfig:
+    source_directory: str = "data/docs"
+    manifest_path: str = ""
+    chunk_size: int = 1000
+    chunk_overlap: int = 150
+    workers: int = 0
+    embed_batch_size: int = 128
+    flush_size: int = 2048
+    dedup_enabled: bool = True
+    dedup_threshold: float = 0.85
+    minhash_permutations: int = 128
+    lsh_bands: int = 16
+    shingle_size: int = 5
+
+
+@dataclass(frozen=True)
+class PromptConfig:
+    encoding: str = "cl100k_base"
+    default_context_budget: int = 8192
+    context_budgets: Mapping[str, int] = field(default_factory=lambda: MappingProxyType({}))
+
+
+@dataclass(frozen=True)
+class BatchConfig:
+    chunk_size: int = 64
+    max_concurrency: int = 8
+
+
+@dataclass(frozen=True)
+class CacheConfig:
+    enabled: bool = True
+    similarity_threshold: float = 0.92
+    max_entries: int = 5000
+    ttl_seconds: float = 3600
+
+
+@dataclass(frozen=True)
+class AdmissionConfig:
+    max_concurrent_requests: int = 64
+    max_queue: int = 256
+    queue_timeout_seconds: float = 2.0
+    stages: Mapping[str, Mapping[str, Any]] = field(default_factory=lambda: MappingProxyType({}))
+
+
+@dataclass(frozen=True)
+class ConversationsConfig:
+    directory: str = "data/conversations"
+    num_shards: int = 16
+    history_turns: int = 10
+    max_turns_per_conversation: int = 200
+    index_cache_entries: int = 10000
+    compaction_interval_seconds: float = 600
+    compaction_garbage_ratio: float = 0.5
+
+
+@dataclass(frozen=True)
+class EventsConfig:
+    enabled: bool = True
+    directory: str = "data/events"
+    batch_size: int = 1000
+    flush_interval_seconds: float = 5.0
+    max_queue: int = 50000
+
+
+@dataclass(frozen=True)
+class SafetyConfig:
+    confidence_threshold: float = 0.6
+    pii_redaction: bool = True
+    content_filtering: bool = True
+    escalation_keywords: Tuple[str, ...] = ("urgent", "complaint", "angry", "lawsuit")
+
+
+@dataclass(frozen=True)
+class ActivityConfig:
+    window_seconds: float = 300
+    bucket_seconds: float = 10
+
+
+@dataclass(frozen=True)
+class TracingConfig:
+    enabled: bool = False
+    sample_rate: float = 1.0
+    export_path: str = ""
+
+
+@dataclass(frozen=True)
+class LoggingConfig:
+    file_path: str = "logs/app.log"
+    log_level: str = "INFO"
+    format: str = "text"
+    async_mode: bool = True
+    queue_size: int = 10000
+    max_bytes: int = 10 * 1024 * 1024
+    backup_count: int = 5
+    rotate_when: str = ""
+    sample_rates: Mapping[str, float] = field(default_factory=lambda: MappingProxyType({}))
+
+
+def _freeze(value: Any) -> Any:
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _section(cls, data: Optional[Mapping[str, Any]]):
+    """Build a section dataclass from a mapping, ignoring unknown keys"""
+    data = data or {}
+    names = {f.name for f in fields(cls)}
+    return cls(**{k: _freeze(v) for k, v in data.items() if k in names})
+
+
+def _thaw(value: Any) -> Any:
+    if isinstance(value, Mapping):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """One parsed, read-only version of config.yaml"""
+
+    llm: LLMConfig
+    circuit_breaker: CircuitBreakerConfig
+    embedding: EmbeddingConfig
+    retrieval: RetrievalConfig
+    ingestion: IngestionConfig
+    prompt: PromptConfig
+    batch: BatchConfig
+    cache: CacheConfig
+    admission: AdmissionConfig
+    conversations: ConversationsConfig
+    events: EventsConfig
+    safety: SafetyConfig
+    activity: ActivityConfig
+    tracing: TracingConfig
+    logging: LoggingConfig
+    raw: Mapping[str, Any]
+    version: int = 0
+
+    @classmethod
+    def from_dict(cls, data: Optional[Dict[str, Any]], version: int = 0) -> "ConfigSnapshot":
+        data = data or {}
+        return cls(
+            llm=_section(LLMConfig, data.get("llm")),
+            circuit_breaker=_section(CircuitBreakerConfig, data.get("circuit_breaker")),
+            embedding=_section(EmbeddingConfig, data.get("embedding")),
+            retrieval=_section(RetrievalConfig, data.get("retrieval")),
+            ingestion=_section(IngestionConfig, data.get("ingestion")),
+            prompt=_section(PromptConfig, data.get("prompt")),
+            batch=_section(BatchConfig, data.get("batch")),
+            cache=_section(CacheConfig, data.get("cache")),
+            admission=_section(AdmissionConfig, data.get("admission")),
+            conversations=_section(ConversationsConfig, data.get("conversations")),
+            events=_section(EventsConfig, data.get("events")),
+            safety=_section(SafetyConfig, data.get("safety")),
+            activity=_section(ActivityConfig, data.get("activity")),
+            tracing=_section(TracingConfig, data.get("tracing")),
+            logging=_section(LoggingConfig, data.get("logging")),
+            raw=_freeze(data),
+            version=version
+        )
+
+    def section(self, name: str) -> Mapping[str, Any]:
+        """Read-only view of a section that has no typed dataclass"""
+        return self.raw.get(name) or MappingProxyType({})
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Mutable deep copy of the parsed document"""
+        return _thaw(self.raw)
+
+
+class ConfigService:
+    """Owns the current snapshot and reloads it when the file changes"""
+
+    def __init__(self, path: Path = CONFIG_PATH, poll_interval: float = 1.0):
+        self.path = Path(path)
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._mtime: Optional[float] = None
+        self._snapshot = ConfigSnapshot.from_dict({})
+        self._stop = threading.Event()
+        self._watcher: Optional[threading.Thread] = None
+        self.reload()
+
+    @property
+    def current(self) -> ConfigSnapshot:
+        # Swapping the reference is atomic, so readers never see a partial update
+        return self._snapshot
+
+    def reload(self, force: bool = False) -> bool:
+        """Re-parse the file if its mtime changed; returns True on swap"""
+        with self._lock:
+            try:
+                mtime = os.stat(self.path).st_mtime
+            except OSError:
+                return False
+            if not force and mtime == self._mtime:
+                return False
+
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = yaml.safe_load(f) or {}
+                snapshot = ConfigSnapshot.from_dict(data, version=self._snapshot.version + 1)
+            except Exception:
+                # Keep serving the last good snapshot if the file is invalid
+                return False
+
+            self._mtime = mtime
+            self._snapshot = snapshot
+            return True
+
+    def save(self, data: Dict[str, Any]) -> ConfigSnapshot:
+        """Write config atomically and swap in the new snapshot"""
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".config-", suffix=".yaml")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                yaml.safe_dump(data, f, default_flow_style=False, sort_keys=False)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.reload(force=True)
+        return self._snapshot
+
+    @contextmanager
+    def override(self, sections: Dict[str, Dict[str, Any]]) -> Iterator[ConfigSnapshot]:
+        """Temporarily serve the current config with ``sections`` merged in.
+
+        Nothing is written to disk; meant for benchmarks and scripts that
+        need to point the pipeline somewhere else.
+        """
+        with self._lock:
+            previous = self._snapshot
+            data = previous.as_dict()
+            for name, values in sections.items():
+                data[name] = {**(data.get(name) or {}), **values}
+            self._snapshot = ConfigSnapshot.from_dict(data, version=previous.version + 1)
+        try:
+            yield self._snapshot
+        finally:
+            with self._lock:
+                self._snapshot = previous
+
+    def start_watching(self) -> None:
+        if self._watcher is not None and self._watcher.is_alive():
+            return
+        self._stop.clear()
+        self._watcher = threading.Thread(target=self._watch, name="config-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watching(self) -> None:
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=self.poll_interval * 2)
+            self._watcher = None
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            self.reload()
+
+
+config_service = ConfigService()
+
+
+def get_config() -> ConfigSnapshot:
+    """Current config snapshot; never touches the disk"""
+    return config_service.current
@@ -23,3 +23,27 @@ class LLMException(IntelliSupportException):
 class ConfigException(IntelliSupportException):
     """Exception raised for configuration errors"""
     pass
+
+class ConversationStoreException(IntelliSupportException):
+    """Exception raised for conversation store errors"""
+    pass
+
+class IngestionException(IntelliSupportException):
+    """Exception raised for document ingestion errors"""
+    pass
+
+class AdmissionException(IntelliSupportException):
+    """Exception raised when a request cannot be admitted"""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class QueueFullException(AdmissionException):
+    """Exception raised when a wait queue is already full"""
+    status_code = 429
+
+class QueueTimeoutException(AdmissionException):
+    """Exception raised when a request waited too long in a queue"""
+    status_code = 503
@@ -109,37 +109,58 @@ class ChatInterface:
         with st.chat_message("user", avatar="👤"):
             st.write(user_input)
         
-        # Get AI response
+        # Stream AI response
         with st.chat_message("assistant", avatar="🤖"):
-            with st.spinner("Thinking..."):
-                try:
-                    response = APIClient.send_message(user_input)
-                    
-                    # Add assistant message
-                    assistant_message = {
-                        "role": "assistant",
-                        "content": response.get("response", "I'm sorry, I couldn't process your request."),
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
-                        "metadata": response.get("metadata", {})
-                    }
-                    st.session_state.messages.append(assistant_message)
-                    
-                    # Display response
-                    st.write(assistant_message["content"])
+            status = st.empty()
+            placeholder = st.empty()
+            status.caption("Thinking...")
+            
+            try:
+                content = ""
+                metadata = {}
+                
+                for event in APIClient.stream_message(user_input):
+                    data = event.get("data", {})
                     
-                    # Show debug info if enabled
-                    if st.session_state.get("show_debug", False) and assistant_message.get("metadata"):
-                        with st.expander("Debug Info", expanded=False):
-                            st.json(assistant_message["metadata"])
+                    if event.get("event") == "stage":
+                        status.caption(f"⏳ {data.get('message', data.get('stage', ''))}")
+                    elif event.get("event") == "token":
+                        content += data.get("text", "")
+                        placeholder.markdown(content + "▌")
+                    elif event.get("event") == "done":
+                        content = data.get("response") or content
+                        metadata = data.get("metadata", {})
+                    elif event.get("event") == "error":
+                        raise RuntimeError(data.get("message", "Streaming failed"))
+                
+                status.empty()
                 
-                except Exception as e:
-                    error_message = {
-                        "role": "system",
-                        "content": f"Error: {str(e)}",
-                        "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                    }
-                    st.session_state.messages.append(error_message)
-                    st.error(f"Error: {str(e)}")
+                # Add assistant message
+                assistant_message = {
+                    "role": "assistant",
+                    "content": content or "I'm sorry, I couldn't process your request.",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                    "metadata": metadata
+                }
+                st.session_state.messages.append(assistant_message)
+                
+                # Display final response
+                placeholder.markdown(assistant_message["content"])
+                
+                # Show debug info if enabled
+                if st.session_state.get("show_debug", False) and assistant_message.get("metadata"):
+                    with st.expander("Debug Info", expanded=False):
+                        st.json(assistant_message["metadata"])
+            
+            except Exception as e:
+                status.empty()
+                error_message = {
+                    "role": "system",
+                    "content": f"Error: {str(e)}",
+                    "timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                }
+                st.session_state.messages.append(error_message)
+                st.error(f"Error: {str(e)}")
     
     @staticmethod
     def _render_debug_info():
@@ -6,6 +6,23 @@ import streamlit as st
 import plotly.express as px
 import pandas as pd
 from datetime import datetime, timedelta
+from utils.api_client import APIClient
+
+_BREAKER_STATUS = {
+    "closed": "🟢 Available",
+    "half_open": "🟡 Recovering",
+    "open": "🔴 Unavailable"
+}
+
+@st.cache_data(ttl=10, show_spinner=False)
+def _fetch_health():
+    """Backend health, cached briefly so reruns don't hit the API every time"""
+    return APIClient.get_health()
+
+@st.cache_data(ttl=5, show_spinner=False)
+def _fetch_agent_stats():
+    """Rolling per-agent activity from the backend"""
+    return APIClient.get_agent_stats()
 
 class Sidebar:
     @staticmethod
@@ -54,37 +71,53 @@ class Sidebar:
             st.metric("Active", "✅" if total_messages > 0 else "⏸️")
         
         # Agent activity
-        if st.session_state.get("agent_activity"):
+        stats = _fetch_agent_stats()
+        agents = (stats or {}).get("agents") or {}
+        if agents:
             st.sidebar.header("🤖 Agent Activity")
+            st.sidebar.caption(f"Last {int(stats.get('window_seconds', 0))}s")
             
-            # Create sample activity data
-            activity_data = pd.DataFrame({
-                "Agent": ["Manager", "Intent", "Sentiment", "RAG", "Safety"],
-                "Calls": [10, 8, 6, 12, 4],
-                "Avg Time (ms)": [120, 80, 60, 200, 40]
-            })
+            activity_data = pd.DataFrame([
+                {
+                    "Agent": name.title(),
+                    "Calls": agent["calls"],
+                    "Errors": agent["errors"],
+                    "p50 (ms)": agent["p50_ms"],
+                    "p95 (ms)": agent["p95_ms"]
+                }
+                for name, agent in agents.items()
+            ]).sort_values("p95 (ms)", ascending=False)
             
-            # Agent usage chart
+            # Agent usage chart, coloured by tail latency so the bottleneck stands out
             fig = px.bar(
                 activity_data, 
                 x="Agent", 
                 y="Calls",
                 title="Agent Usage",
-                color="Calls",
+                color="p95 (ms)",
                 color_continuous_scale="viridis"
             )
             fig.update_layout(height=300, showlegend=False)
             st.sidebar.plotly_chart(fig, use_container_width=True)
+            st.sidebar.dataframe(activity_data, hide_index=True, use_container_width=True)
         
         # System status
         st.sidebar.header("🟢 System Status")
         
-        status_items = [
-            ("Backend API", "🟢 Online"),
-            ("ChromaDB", "🟢 Connected"),
-            ("LLM Service", "🟢 Available"),
-            ("Safety Check", "🟢 Active")
-        ]
+        health = _fetch_health()
+        if health is None:
+            status_items = [
+                ("Backend API", "🔴 Offline"),
+                ("LLM Service", "⚪ Unknown")
+            ]
+        else:
+            status_items = [("Backend API", "🟢 Online")]
+            models = health.get("models")
+            if not models:
+                status_items.append(("LLM Service", "🟡 Warming up"))
+            for model, breaker in (models or {}).items():
+                status_items.append((model, _BREAKER_STATUS.get(breaker.get("state"), "⚪ Unknown")))
+            status_items.append(("Safety Check", "🟢 Active"))
         
         for service, status in status_items:
             st.sidebar.text(f"{service}: {status}")
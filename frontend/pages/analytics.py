@@ -6,8 +6,15 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
-from datetime import datetime, timedelta
-import random
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+# Make the shared config service importable when this page is opened directly
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from utils.event_reader import latency_percentile, load_recent_page, load_rollups
+from utils.downsample import downsample_series
 
 st.set_page_config(
     page_title="Analytics - IntelliSupport",
@@ -15,26 +22,32 @@ st.set_page_config(
     layout="wide"
 )
 
-def generate_sample_data():
-    """Generate sample analytics data"""
-    
-    # Generate date range
-    dates = [datetime.now() - timedelta(days=x) for x in range(30, 0, -1)]
-    
-    # Sample conversation data
-    conversations_data = []
-    for date in dates:
-        for _ in range(random.randint(5, 20)):
-            conversations_data.append({
-                "date": date,
-                "intent": random.choice(["billing", "technical", "general", "complaint", "feedback"]),
-                "sentiment": random.choice(["positive", "neutral", "negative"]),
-                "resolution_time": random.randint(30, 600),  # seconds
-                "satisfaction": random.randint(1, 5),
-                "agent_confidence": random.uniform(0.6, 1.0)
-            })
-    
-    return pd.DataFrame(conversations_data)
+STAGES = ["embed", "intent", "sentiment", "cache", "rag", "domain", "prompt", "response", "safety"]
+RECENT_COLUMNS = ["timestamp", "intent", "sentiment", "intent_confidence", "model", "cache_hit", "total_ms"]
+INTENTS = ["billing", "technical", "general", "complaint", "feedback"]
+RANGES = {"Last 24 hours": 1, "Last 7 days": 7, "Last 30 days": 30, "Last 90 days": 90, "Last 365 days": 365}
+# Hourly buckets up to this many days, daily buckets beyond
+HOURLY_MAX_DAYS = 30
+# Roughly the plot width in pixels on the wide layout; more points than this are not visible
+CHART_POINTS = 1200
+PAGE_SIZE = 50
+
+def _date_range(days: int):
+    end = datetime.now(timezone.utc).date()
+    return end - timedelta(days=days), end
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_interactions(days: int, intents: tuple):
+    """Rollup rows for the selected range, cached briefly across reruns"""
+    start, end = _date_range(days)
+    granularity = "hour" if days <= HOURLY_MAX_DAYS else "day"
+    return load_rollups(start, end, granularity, intents=list(intents) or None)
+
+@st.cache_data(ttl=30, show_spinner=False)
+def load_recent(days: int, intents: tuple, page: int):
+    """One page of the newest interactions"""
+    start, end = _date_range(days)
+    return load_recent_page(start, end, page, PAGE_SIZE, RECENT_COLUMNS, intents=list(intents) or None)
 
 def main():
     """Main analytics page"""
@@ -42,26 +55,33 @@ def main():
     st.title("📊 IntelliSupport Analytics")
     st.markdown("Real-time insights into customer support interactions")
     
-    # Generate sample data
-    df = generate_sample_data()
+    # Filters
+    range_label = st.sidebar.selectbox("Time Range", list(RANGES), index=2)
+    selected_intents = tuple(st.sidebar.multiselect("Intents", INTENTS))
+    days = RANGES[range_label]
+    
+    df = load_interactions(days, selected_intents)
+    if df.empty:
+        st.info("No interactions recorded for this range yet. Events appear here a few seconds after the backend answers a query.")
+        return
     
     # Key metrics
+    total_conversations = int(df["count"].sum())
     col1, col2, col3, col4 = st.columns(4)
     
     with col1:
-        total_conversations = len(df)
-        st.metric("Total Conversations", total_conversations)
+        st.metric("Total Interactions", total_conversations)
     
     with col2:
-        avg_satisfaction = df["satisfaction"].mean()
-        st.metric("Avg Satisfaction", f"{avg_satisfaction:.1f}/5")
+        avg_confidence = df["confidence_sum"].sum() / max(1, df["confidence_count"].sum())
+        st.metric("Avg Intent Confidence", f"{avg_confidence:.2f}")
     
     with col3:
-        avg_resolution_time = df["resolution_time"].mean()
-        st.metric("Avg Resolution Time", f"{avg_resolution_time:.0f}s")
+        p95_latency = latency_percentile(df["total_ms_bins"].tolist(), 0.95)
+        st.metric("p95 Latency", f"{p95_latency:.0f} ms")
     
     with col4:
-        positive_sentiment = (df["sentiment"] == "positive").sum() / len(df) * 100
+        positive_sentiment = df.loc[df["sentiment"] == "positive", "count"].sum() / total_conversations * 100
         st.metric("Positive Sentiment", f"{positive_sentiment:.1f}%")
     
     st.divider()
@@ -71,7 +91,7 @@ def main():
     
     with col1:
         st.subheader("Intent Distribution")
-        intent_counts = df["intent"].value_counts()
+        intent_counts = df.groupby("intent")["count"].sum()
         fig = px.pie(
             values=intent_counts.values,
             names=intent_counts.index,
@@ -81,7 +101,7 @@ def main():
     
     with col2:
         st.subheader("Sentiment Analysis")
-        sentiment_counts = df["sentiment"].value_counts()
+        sentiment_counts = df.groupby("sentiment")["count"].sum()
         colors = {"positive": "#22c55e", "neutral": "#6b7280", "negative": "#ef4444"}
         fig = px.bar(
             x=sentiment_counts.index,
@@ -92,25 +112,39 @@ def main():
         )
         st.plotly_chart(fig, use_container_width=True)
     
-    # Time series
+    # Time series; empty buckets are real zeros, then thinned to what the chart can show
     st.subheader("Conversations Over Time")
-    daily_counts = df.groupby(df["date"].dt.date).size().reset_index()
-    daily_counts.columns = ["date", "conversations"]
+    hourly = days <= HOURLY_MAX_DAYS
+    volume = df.groupby("bucket")["count"].sum()
+    volume = volume.reindex(
+        pd.date_range(volume.index.min(), volume.index.max(), freq="h" if hourly else "D"), fill_value=0
+    )
+    volume = downsample_series(volume, CHART_POINTS)
     
     fig = px.line(
-        daily_counts,
-        x="date",
-        y="conversations",
-        title="Daily Conversation Volume"
+        x=volume.index,
+        y=volume.values,
+        labels={"x": "time", "y": "conversations"},
+        title="Hourly Conversation Volume" if hourly else "Daily Conversation Volume"
     )
     st.plotly_chart(fig, use_container_width=True)
     
-    # Detailed data
+    # Where the time goes
+    st.subheader("Pipeline Latency")
+    stage_means = [df[f"{stage}_ms_sum"].sum() / total_conversations for stage in STAGES]
+    
+    fig = go.Figure([go.Bar(name="mean", x=STAGES, y=stage_means)])
+    fig.update_layout(title="Mean Stage Latency (ms)")
+    st.plotly_chart(fig, use_container_width=True)
+    
+    # Detailed data, one page at a time
     st.subheader("Recent Conversations")
     
-    # Display sample of recent data
-    recent_data = df.head(100).copy()
-    recent_data["date"] = recent_data["date"].dt.strftime("%Y-%m-%d %H:%M")
+    pages = max(1, -(-total_conversations // PAGE_SIZE))
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, value=1, step=1)
+    recent_data = load_recent(days, selected_intents, int(page) - 1).copy()
+    if not recent_data.empty:
+        recent_data["timestamp"] = recent_data["timestamp"].dt.strftime("%Y-%m-%d %H:%M")
     
     st.dataframe(
         recent_data,
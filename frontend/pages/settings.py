@@ -4,8 +4,13 @@ Settings page for IntelliSupport
 
 import streamlit as st
 import yaml
+import sys
 from pathlib import Path
-import os
+
+# Make the shared config service importable when this page is opened directly
+sys.path.append(str(Path(__file__).parent.parent.parent))
+
+from config_service import config_service
 
 st.set_page_config(
     page_title="Settings - IntelliSupport",
@@ -15,17 +20,14 @@ st.set_page_config(
 
 def load_config():
     """Load current configuration"""
-    config_path = Path(__file__).parent.parent.parent / "config.yaml"
-    if config_path.exists():
-        with open(config_path, "r") as f:
-            return yaml.safe_load(f)
-    return {}
+    config_service.reload()
+    return config_service.current.as_dict()
 
 def save_config(config):
-    """Save configuration to file"""
-    config_path = Path(__file__).parent.parent.parent / "config.yaml"
-    with open(config_path, "w") as f:
-        yaml.dump(config, f, default_flow_style=False)
+    """Save configuration atomically, keeping sections this page does not edit"""
+    merged = config_service.current.as_dict()
+    merged.update(config)
+    config_service.save(merged)
 
 def main():
     """Main settings page"""
@@ -3,8 +3,9 @@ API client for communicating with the backend
 """
 
 import requests
+import json
 import streamlit as st
-from typing import Dict, Any
+from typing import Dict, Any, Iterator, Optional
 from utils.config import get_api_config
 
 class APIClient:
@@ -22,7 +23,7 @@ class APIClient:
             # Prepare request data
             data = {
                 "message": message,
-                "context": context or {},
+                "context": APIClient._request_context(context),
                 "model": st.session_state.get("selected_model", "groq/llama-3.1-70b-versatile"),
                 "conversation_id": st.session_state.get("conversation_id"),
                 "session_id": st.session_state.get("session_id", "default")
@@ -66,16 +67,76 @@ class APIClient:
                 "metadata": {"error_type": "unexpected", "error_message": str(e)}
             }
     
+    @staticmethod
+    def stream_message(message: str, context: Dict[str, Any] = None) -> Iterator[Dict[str, Any]]:
+        """Send message to the streaming endpoint and yield events as they arrive"""
+        
+        config = get_api_config()
+        base_url = config.get("base_url", "http://localhost:8000")
+        timeout = config.get("timeout", 30)
+        
+        data = {
+            "message": message,
+            "context": APIClient._request_context(context),
+            "model": st.session_state.get("selected_model", "groq/llama-3.1-70b-versatile"),
+            "conversation_id": st.session_state.get("conversation_id"),
+            "session_id": st.session_state.get("session_id", "default")
+        }
+        
+        try:
+            with requests.post(
+                f"{base_url}/api/chat/stream",
+                json=data,
+                timeout=timeout,
+                stream=True,
+                headers={"Content-Type": "application/json", "Accept": "text/event-stream"}
+            ) as response:
+                if response.status_code != 200:
+                    yield {
+                        "event": "error",
+                        "data": {"message": f"API Error: {response.status_code} - {response.text}"}
+                    }
+                    return
+                
+                event_name, data_lines = "message", []
+                for line in response.iter_lines(decode_unicode=True):
+                    if line:
+                        if line.startswith("event:"):
+                            event_name = line[len("event:"):].strip()
+                        elif line.startswith("data:"):
+                            data_lines.append(line[len("data:"):].strip())
+                        continue
+                    
+                    # A blank line terminates one SSE event
+                    if data_lines:
+                        event = {"event": event_name, "data": json.loads("\n".join(data_lines))}
+                        if event["event"] == "done" and event["data"].get("conversation_id"):
+                            st.session_state.conversation_id = event["data"]["conversation_id"]
+                        yield event
+                    event_name, data_lines = "message", []
+        
+        except requests.exceptions.ConnectionError:
+            mock = APIClient._get_mock_response(message)
+            yield {"event": "token", "data": {"text": mock["response"]}}
+            yield {"event": "done", "data": mock}
+        except requests.exceptions.Timeout:
+            yield {"event": "error", "data": {"message": "Request timed out. Please try again."}}
+    
+    @staticmethod
+    def _request_context(context: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Request context; asks the backend for a span tree while debug info is shown"""
+        
+        context = dict(context or {})
+        if st.session_state.get("show_debug", False):
+            context["debug"] = True
+        return context
+    
     @staticmethod
     def _get_mock_response(message: str) -> Dict[str, Any]:
         """Generate a mock response when backend is not available"""
         
-        import time
         import random
         
-        # Simulate processing time
-        time.sleep(random.uniform(0.5, 1.5))
-        
         mock_responses = {
             "billing": "For billing inquiries, our current plans are: Basic ($99/month), Pro ($199/month), and Enterprise (custom pricing). How can I help you with your billing needs?",
             "technical": "I'd be happy to help with technical issues. Can you please describe the specific problem you're experiencing? Include any error messages if available.",
@@ -99,16 +160,14 @@ class APIClient:
             response_text = response_text.format(message=message)
         
         return {
-            "response": f"🔄 **Demo Mode Active** (Backend not connected)
-
-{response_text}",
+            "response": f"🔄 **Demo Mode Active** (Backend not connected)\n\n{response_text}",
             "metadata": {
                 "mock": True,
                 "response_type": response_type,
                 "intent": response_type,
                 "confidence": random.uniform(0.7, 0.95),
                 "model_used": "mock",
-                "processing_time": random.uniform(0.5, 1.5)
+                "processing_time": 0.0
             }
         }
     
@@ -124,3 +183,31 @@ class APIClient:
             return response.status_code == 200
         except:
             return False
+    
+    @staticmethod
+    def get_health() -> Optional[Dict[str, Any]]:
+        """Fetch backend health, including per-model circuit breaker state"""
+        
+        config = get_api_config()
+        base_url = config.get("base_url", "http://localhost:8000")
+        
+        try:
+            response = requests.get(f"{base_url}/health", timeout=2)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
+    
+    @staticmethod
+    def get_agent_stats() -> Optional[Dict[str, Any]]:
+        """Fetch rolling per-agent call counts, errors and latency percentiles"""
+        
+        config = get_api_config()
+        base_url = config.get("base_url", "http://localhost:8000")
+        
+        try:
+            response = requests.get(f"{base_url}/agents/stats", timeout=2)
+            response.raise_for_status()
+            return response.json()
+        except (requests.exceptions.RequestException, ValueError):
+            return None
@@ -2,39 +2,31 @@
 Configuration management utilities
 """
 
-import streamlit as st
-import yaml
-import os
-from pathlib import Path
+from config_service import config_service
 
-@st.cache_data
 def load_config():
-    """Load configuration from config.yaml"""
+    """Load configuration from the shared config snapshot"""
     
-    config_path = Path(__file__).parent.parent.parent / "config.yaml"
+    # A stat call; the YAML is only re-parsed when the file has changed
+    config_service.reload()
+    config = config_service.current.as_dict()
     
-    if config_path.exists():
-        with open(config_path, "r") as f:
-            return yaml.safe_load(f)
-    else:
-        # Default configuration
-        return {
-            "llm": {
-                "primary_model": "groq/llama-3.1-70b-versatile",
-                "fallback_model": "google/gemini-1.5-flash",
-                "max_tokens": 1024,
-                "timeout_seconds": 20
-            },
-            "api": {
-                "base_url": "http://localhost:8000",
-                "timeout": 30
-            },
-            "ui": {
-                "theme": "light",
-                "auto_scroll": True,
-                "show_debug": False
-            }
+    # Frontend-only sections are not part of config.yaml by default
+    defaults = {
+        "api": {
+            "base_url": "http://localhost:8000",
+            "timeout": 30
+        },
+        "ui": {
+            "theme": "light",
+            "auto_scroll": True,
+            "show_debug": False
         }
+    }
+    for section, values in defaults.items():
+        config.setdefault(section, values)
+    
+    return config
 
 def get_api_config():
     """Get API configuration"""
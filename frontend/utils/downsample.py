@@ -0,0 +1,44 @@
+"""
+Downsampling of time series before they are sent to the browser
+"""
+
+import numpy as np
+import pandas as pd
+
+def lttb(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of ``threshold`` points that preserve the visual shape.
+
+    The first and last points are always kept; every bucket in between
+    contributes the point forming the largest triangle with the previously
+    kept point and the average of the next bucket.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    xf = np.asarray(x, dtype=np.float64)
+    yf = np.asarray(y, dtype=np.float64)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(int)
+    keep = np.empty(threshold, dtype=np.int64)
+    keep[0], keep[-1] = 0, n - 1
+
+    previous = 0
+    for i in range(threshold - 2):
+        start, stop = edges[i], edges[i + 1]
+        next_stop = edges[i + 2] if i + 2 < len(edges) else n
+        next_x = xf[stop:next_stop].mean()
+        next_y = yf[stop:next_stop].mean()
+        areas = np.abs(
+            (xf[previous] - next_x) * (yf[start:stop] - yf[previous])
+            - (xf[previous] - xf[start:stop]) * (next_y - yf[previous])
+        )
+        previous = start + int(areas.argmax())
+        keep[i + 1] = previous
+
+    return keep
+
+def downsample_series(series: pd.Series, threshold: int) -> pd.Series:
+    """LTTB over a datetime-indexed series"""
+    if len(series) <= threshold:
+        return series
+    return series.iloc[lttb(series.index.asi8, series.to_numpy(), threshold)]
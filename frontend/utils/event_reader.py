@@ -0,0 +1,132 @@
+"""
+Read interaction events written by the backend's event store
+"""
+
+from datetime import date, datetime, time, timezone
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+
+from config_service import config_service
+
+# Must match the backend writer's partition layout: <directory>/date=YYYY-MM-DD/
+PARTITIONING = ds.partitioning(pa.schema([("date", pa.string())]), flavor="hive")
+# Rollups written next to the events (utils/event_rollups.py in the backend)
+ROLLUP_DIR = "_rollups"
+# Upper edges of the rollup latency histogram bins, as in utils/agent_stats.py
+LATENCY_BOUNDS_MS = np.array([0.1 * 1.25 ** i for i in range(60)])
+
+def events_directory() -> Path:
+    """Directory the backend writes events to, from the shared config"""
+    return Path(config_service.current.events.directory)
+
+def _time_range(start: date, end: date):
+    start_ts = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    end_ts = datetime.combine(end, time.max, tzinfo=timezone.utc)
+    scalar_type = pa.timestamp("ms", tz="UTC")
+    return pa.scalar(start_ts, type=scalar_type), pa.scalar(end_ts, type=scalar_type)
+
+def load_events(start: date, end: date, columns: Sequence[str],
+                intents: Optional[List[str]] = None, directory: Optional[Path] = None) -> pd.DataFrame:
+    """Load the given columns for events between ``start`` and ``end`` (inclusive).
+
+    The date filter prunes whole partitions before any file is opened, the
+    timestamp and intent filters are checked against row-group statistics,
+    and only the requested columns are decoded.
+    """
+    directory = directory or events_directory()
+    if not directory.exists():
+        return pd.DataFrame(columns=list(columns))
+
+    dataset = ds.dataset(directory, format="parquet", partitioning=PARTITIONING)
+    if not dataset.files:
+        # No schema to filter against before the first flush (e.g. only _rollups/ exists)
+        return pd.DataFrame(columns=list(columns))
+
+    start_ts, end_ts = _time_range(start, end)
+    predicate = (
+        (ds.field("date") >= start.isoformat())
+        & (ds.field("date") <= end.isoformat())
+        & (ds.field("timestamp") >= start_ts)
+        & (ds.field("timestamp") <= end_ts)
+    )
+    if intents:
+        predicate = predicate & ds.field("intent").isin(intents)
+
+    table = dataset.to_table(columns=list(columns), filter=predicate)
+    return table.to_pandas()
+
+def load_rollups(start: date, end: date, granularity: str = "day", intents: Optional[List[str]] = None,
+                 directory: Optional[Path] = None) -> pd.DataFrame:
+    """Pre-aggregated (bucket, intent, sentiment) rows; ``granularity`` is "hour" or "day".
+
+    The size of the result depends on the range and granularity only, not
+    on how many events fall into it.
+    """
+    directory = (directory or events_directory()) / ROLLUP_DIR
+    start_ts, end_ts = _time_range(start, end)
+    predicate = (ds.field("bucket") >= start_ts) & (ds.field("bucket") <= end_ts)
+    if intents:
+        predicate = predicate & ds.field("intent").isin(intents)
+
+    if granularity == "hour":
+        path = directory / "hourly"
+        if not path.exists():
+            return pd.DataFrame()
+        dataset = ds.dataset(path, format="parquet", partitioning=PARTITIONING)
+        predicate = predicate & (ds.field("date") >= start.isoformat()) & (ds.field("date") <= end.isoformat())
+    else:
+        path = directory / "daily" / "rollup.parquet"
+        if not path.exists():
+            return pd.DataFrame()
+        dataset = ds.dataset(path, format="parquet")
+
+    table = dataset.to_table(filter=predicate)
+    if "date" in table.column_names:
+        table = table.drop_columns(["date"])
+    return table.to_pandas()
+
+def latency_percentile(bins: Sequence[Sequence[int]], p: float) -> float:
+    """Percentile (upper bin edge, ms) from summed rollup latency histograms"""
+    counts = np.sum(np.stack([np.asarray(b) for b in bins]), axis=0) if len(bins) else np.zeros(0)
+    total = counts.sum()
+    if not total:
+        return 0.0
+    index = int(np.searchsorted(np.cumsum(counts), p * total))
+    return float(LATENCY_BOUNDS_MS[min(index, len(LATENCY_BOUNDS_MS) - 1)])
+
+def load_recent_page(start: date, end: date, page: int, page_size: int, columns: Sequence[str],
+                     intents: Optional[List[str]] = None, directory: Optional[Path] = None) -> pd.DataFrame:
+    """One page of the newest events, reading only the day partitions it spans.
+
+    Daily rollup counts tell us which days hold rows ``page * page_size``
+    onwards, so deep pages do not scan the newer history in front of them.
+    """
+    directory = directory or events_directory()
+    daily = load_rollups(start, end, "day", intents, directory)
+    if daily.empty:
+        return pd.DataFrame(columns=list(columns))
+
+    per_day = daily.groupby(daily["bucket"].dt.date)["count"].sum().sort_index(ascending=False)
+    offset = page * page_size
+    skipped = taken = 0
+    days = []
+    for day, count in per_day.items():
+        if not days and skipped + count <= offset:
+            skipped += count
+            continue
+        days.append(day)
+        taken += count
+        if skipped + taken >= offset + page_size:
+            break
+
+    if not days:
+        return pd.DataFrame(columns=list(columns))
+    events = load_events(min(days), max(days), columns, intents, directory)
+    events = events.sort_values("timestamp", ascending=False)
+    start_row = offset - skipped
+    return events.iloc[start_row:start_row + page_size]
@@ -1,29 +1,164 @@
-"""Logging configuration for IntelliSupport"""
+"""Logging configuration for IntelliSupport
 
+In async mode (the default) a log call only formats the message and puts the
+record on a bounded queue; a QueueListener thread does the console and file
+I/O. When the queue is full records are dropped rather than blocking, so a
+slow disk can never stall the event loop. ``flush_logging()`` drains the
+queue (the backend calls it on shutdown) and ``shutdown_logging()`` also
+closes the files; it runs at interpreter exit.
+"""
+
+import atexit
+import copy
+import json
 import logging
+import logging.handlers
 import os
+import queue
+import random
+import time
+from typing import Any, Dict, Mapping, Optional
+
+from .config_service import LoggingConfig, get_config
+from .utils.metrics import registry
+
+# Attributes every LogRecord has; anything else was passed via ``extra``
+_RECORD_ATTRIBUTES = frozenset(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line, including any ``extra`` fields"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry: Dict[str, Any] = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRIBUTES and not key.startswith("_"):
+                entry[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exception"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a fraction of DEBUG records, per logger name prefix"""
+
+    def __init__(self, sample_rates: Mapping[str, float]):
+        super().__init__()
+        # Longest prefix first so "intellisupport.llm" wins over "intellisupport"
+        self.sample_rates = sorted(sample_rates.items(), key=lambda item: len(item[0]), reverse=True)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG:
+            return True
+        for prefix, rate in self.sample_rates:
+            if record.name == prefix or record.name.startswith(prefix + "."):
+                return random.random() < rate
+        return True
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that drops records instead of blocking when the queue is full"""
 
-def setup_logger(name: str = "intellisupport", log_file: str = "logs/app.log", level: str = "INFO"):
-    os.makedirs(os.path.dirname(log_file), exist_ok=True)
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Merge args now (they may be mutated later) but leave formatting to the listener
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _file_handler(config: LoggingConfig) -> logging.Handler:
+    if config.rotate_when:
+        return logging.handlers.TimedRotatingFileHandler(
+            config.file_path, when=config.rotate_when, backupCount=config.backup_count, encoding="utf-8", delay=True
+        )
+    return logging.handlers.RotatingFileHandler(
+        config.file_path, maxBytes=config.max_bytes, backupCount=config.backup_count, encoding="utf-8", delay=True
+    )
+
+
+def setup_logger(name: str = "intellisupport", config: Optional[LoggingConfig] = None) -> logging.Logger:
+    global _listener
+    config = config or get_config().logging
+    os.makedirs(os.path.dirname(config.file_path) or ".", exist_ok=True)
+    level = getattr(logging, config.log_level.upper(), logging.INFO)
 
     logger = logging.getLogger(name)
-    logger.setLevel(getattr(logging, level.upper(), logging.INFO))
+    logger.setLevel(level)
 
     if not logger.handlers:
-        console_handler = logging.StreamHandler()
-        console_handler.setLevel(getattr(logging, level.upper(), logging.INFO))
-
-        file_handler = logging.FileHandler(log_file)
-        file_handler.setLevel(getattr(logging, level.upper(), logging.INFO))
+        if config.format == "json":
+            formatter = JSONFormatter()
+        else:
+            formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+                                          datefmt='%Y-%m-%d %H:%M:%S')
+        sampling = SamplingFilter(config.sample_rates)
 
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-                                      datefmt='%Y-%m-%d %H:%M:%S')
-        console_handler.setFormatter(formatter)
-        file_handler.setFormatter(formatter)
+        handlers = [logging.StreamHandler(), _file_handler(config)]
+        for handler in handlers:
+            handler.setLevel(level)
+            handler.setFormatter(formatter)
 
-        logger.addHandler(console_handler)
-        logger.addHandler(file_handler)
+        if config.async_mode:
+            queue_handler = DroppingQueueHandler(queue.Queue(maxsize=config.queue_size))
+            queue_handler.addFilter(sampling)
+            _listener = logging.handlers.QueueListener(queue_handler.queue, *handlers, respect_handler_level=True)
+            _listener.start()
+            logger.addHandler(queue_handler)
+            registry.register_collector("logging", lambda: [(
+                "intellisupport_log_records_dropped_total", "counter", "Log records dropped because the queue was full",
+                [({}, queue_handler.dropped)]
+            )])
+        else:
+            for handler in handlers:
+                handler.addFilter(sampling)
+                logger.addHandler(handler)
 
     return logger
 
+
+def flush_logging() -> None:
+    """Block until every queued record has been written; logging keeps working afterwards"""
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.flush()
+        _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Write out everything still queued and close the log files"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+
+atexit.register(shutdown_logging)
+
 logger = setup_logger()
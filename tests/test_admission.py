@@ -0,0 +1,51 @@
+"""Bounded, deadline-limited stage queues"""
+
+import asyncio
+
+import pytest
+
+from intellisupport.exception import QueueFullException, QueueTimeoutException
+from intellisupport.utils.admission import StageLimiter
+
+
+@pytest.mark.asyncio
+async def test_free_slot_is_taken_without_queueing():
+    limiter = StageLimiter("llm", limit=2, max_queue=0, queue_timeout=0.1)
+
+    async with limiter.slot():
+        async with limiter.slot():
+            assert limiter.active == 2
+
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_queue_deadline_rejects_waiter():
+    limiter = StageLimiter("llm", limit=1, max_queue=4, queue_timeout=0.05)
+    await limiter.acquire()
+
+    with pytest.raises(QueueTimeoutException) as excinfo:
+        await limiter.acquire()
+
+    assert excinfo.value.retry_after == 1
+    assert limiter.rejected["queue_timeout"] == 1
+    assert limiter.waiting == 0
+    limiter.release()
+    assert limiter.active == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    limiter = StageLimiter("llm", limit=1, max_queue=1, queue_timeout=1.0)
+    await limiter.acquire()
+    waiter = asyncio.ensure_future(limiter.acquire())
+    await asyncio.sleep(0)
+
+    with pytest.raises(QueueFullException):
+        await limiter.acquire()
+
+    limiter.release()
+    await waiter
+    assert limiter.active == 1
+    assert limiter.rejected == {"queue_full": 1, "queue_timeout": 0}
+    limiter.release()
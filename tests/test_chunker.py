@@ -0,0 +1,52 @@
+"""Paragraph-packed chunking and content hashes"""
+
+import pytest
+
+from intellisupport.exception import IngestionException
+from intellisupport.utils.chunker import chunk_text, content_hash
+
+TEXT = "\n\n".join(f"Paragraph {i}. " + " ".join(f"word{j}" for j in range(i * 7 % 40 + 5)) for i in range(30))
+
+
+def test_chunks_respect_size():
+    chunks = chunk_text(TEXT, chunk_size=300, overlap=50)
+
+    assert len(chunks) > 1
+    assert all(len(chunk.text) <= 300 for chunk in chunks)
+    assert all(chunk.content_hash == content_hash(chunk.text) for chunk in chunks)
+
+
+def test_chunks_overlap():
+    chunks = chunk_text(TEXT, chunk_size=300, overlap=50)
+
+    carried = [chunk for previous, chunk in zip(chunks, chunks[1:])
+               if chunk.text.split("\n\n")[0] in previous.text[-50:]]
+    assert carried
+
+
+def test_long_paragraph_windows_overlap():
+    chunks = chunk_text(" ".join(f"w{i}" for i in range(500)), chunk_size=200, overlap=40)
+
+    assert len(chunks) > 1
+    for previous, chunk in zip(chunks, chunks[1:]):
+        assert chunk.text.split(" ")[0] in previous.text.split(" ")
+
+
+def test_hashes_are_stable_across_runs_and_local_edits():
+    before = chunk_text(TEXT, chunk_size=300, overlap=50)
+
+    assert [chunk.content_hash for chunk in chunk_text(TEXT, chunk_size=300, overlap=50)] == \
+        [chunk.content_hash for chunk in before]
+
+    after = chunk_text(TEXT.replace("Paragraph 15.", "Paragraph fifteen."), chunk_size=300, overlap=50)
+    changed = {chunk.content_hash for chunk in after} - {chunk.content_hash for chunk in before}
+    assert 0 < len(changed) <= 2
+
+
+def test_whitespace_does_not_change_hashes():
+    assert chunk_text("a  b\r\n\r\n\r\nc") == chunk_text("a b\n\nc")
+
+
+def test_overlap_must_be_smaller_than_chunk():
+    with pytest.raises(IngestionException):
+        chunk_text(TEXT, chunk_size=100, overlap=100)
@@ -0,0 +1,79 @@
+"""Circuit breaker state transitions"""
+
+from intellisupport.utils.circuit_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker
+
+
+def _breaker(**kwargs):
+    settings = {"window": 10, "min_calls": 4, "failure_rate_threshold": 0.5, "slow_call_seconds": 1.0,
+                "slow_call_rate_threshold": 0.8, "open_seconds": 60, "half_open_probes": 2}
+    return CircuitBreaker("model", **{**settings, **kwargs})
+
+
+def test_opens_on_failure_rate():
+    breaker = _breaker()
+    for _ in range(2):
+        breaker.record_success(0.1)
+    breaker.record_failure()
+    assert breaker.state == CLOSED
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert not breaker.allow_request()
+    assert breaker.get_state()["rejected"] == 1
+
+
+def test_opens_on_slow_calls():
+    breaker = _breaker()
+    for _ in range(4):
+        breaker.record_success(2.0)
+
+    assert breaker.state == OPEN
+
+
+def test_needs_min_calls():
+    breaker = _breaker()
+    for _ in range(3):
+        breaker.record_failure()
+
+    assert breaker.state == CLOSED
+
+
+def test_half_open_closes_after_successful_probes():
+    breaker = _breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record_failure()
+
+    assert breaker.allow_request()
+    assert breaker.state == HALF_OPEN
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+    breaker.record_success(0.1)
+    breaker.record_success(0.1)
+
+    assert breaker.state == CLOSED
+    assert breaker.get_state()["calls"] == 0
+
+
+def test_half_open_failure_reopens():
+    breaker = _breaker(open_seconds=0)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.allow_request()
+
+    breaker.record_failure()
+
+    assert breaker.state == OPEN
+    assert breaker.stats["opened"] == 2
+
+
+def test_release_frees_probe():
+    breaker = _breaker(open_seconds=0, half_open_probes=1)
+    for _ in range(4):
+        breaker.record_failure()
+    assert breaker.allow_request()
+    assert not breaker.allow_request()
+
+    breaker.release()
+
+    assert breaker.allow_request()
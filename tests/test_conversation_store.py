@@ -0,0 +1,105 @@
+"""Append-only conversation store: history, compaction and recovery"""
+
+import pytest
+
+from intellisupport.exception import ConversationStoreException
+from intellisupport.utils.conversation_store import ConversationStore
+
+
+def _contents(store, conversation_id, limit=10):
+    return [turn["content"] for turn in store.get_history(conversation_id, limit)]
+
+
+def test_history_round_trip(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=2)
+    store.append("c1", "user", "hello")
+    store.append("c1", "assistant", "hi there", {"intent": "greeting"})
+    store.append("c2", "user", "other")
+
+    turns = store.get_history("c1")
+
+    assert [(turn["role"], turn["content"]) for turn in turns] == [("user", "hello"), ("assistant", "hi there")]
+    assert turns[1]["metadata"] == {"intent": "greeting"}
+    assert store.get_history("missing") == []
+    assert store.get_stats()["conversations"] == 2
+    store.close()
+
+
+def test_history_limit_returns_newest_turns(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=1)
+    for i in range(5):
+        store.append("c1", "user", f"m{i}")
+
+    assert _contents(store, "c1", limit=2) == ["m3", "m4"]
+    store.close()
+
+
+def test_compaction_keeps_last_turns(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=1, max_turns_per_conversation=3)
+    for i in range(10):
+        store.append("c1", "user", f"m{i}")
+    store.append("c2", "user", "only")
+    size = store.get_stats()["bytes"]
+
+    reclaimed = store.compact(min_garbage_ratio=0.1)
+
+    assert sum(reclaimed.values()) > 0
+    assert store.get_stats()["bytes"] == size - sum(reclaimed.values())
+    assert _contents(store, "c1") == ["m7", "m8", "m9"]
+    assert _contents(store, "c2") == ["only"]
+    store.append("c1", "user", "after")
+    assert _contents(store, "c1") == ["m7", "m8", "m9", "after"]
+    store.close()
+
+
+def test_reopen_restores_index(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=2, index_cache_entries=2)
+    for i in range(20):
+        store.append(f"c{i}", "user", f"m{i}")
+    store.append("c3", "assistant", "reply")
+    stats = store.get_stats()
+    store.close()
+
+    store = ConversationStore(str(tmp_path), num_shards=2)
+
+    assert store.get_stats() == stats
+    assert _contents(store, "c3") == ["m3", "reply"]
+    store.close()
+
+
+def test_reopen_drops_torn_tail(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=1)
+    store.append("c1", "user", "kept")
+    shard = store.shards[0]
+    store.close()
+    with open(shard.path, "ab") as f:
+        f.write(b"\x05\x00\x00")
+
+    store = ConversationStore(str(tmp_path), num_shards=1)
+
+    assert _contents(store, "c1") == ["kept"]
+    assert store.shards[0].size == shard.path.stat().st_size
+    store.close()
+
+
+def test_reopen_rebuilds_missing_index(tmp_path):
+    store = ConversationStore(str(tmp_path), num_shards=1)
+    store.append("c1", "user", "a")
+    store.append("c1", "user", "b")
+    index_path = store.shards[0].index_path
+    store.close()
+    index_path.unlink()
+
+    store = ConversationStore(str(tmp_path), num_shards=1)
+
+    assert _contents(store, "c1") == ["a", "b"]
+    store.close()
+
+
+@pytest.mark.parametrize("conversation_id", ["x" * 70000, "a/b", ""])
+def test_invalid_conversation_id_is_rejected(tmp_path, conversation_id):
+    store = ConversationStore(str(tmp_path), num_shards=1)
+
+    with pytest.raises(ConversationStoreException):
+        store.append(conversation_id, "user", "hello")
+    store.close()
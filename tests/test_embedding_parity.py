@@ -0,0 +1,43 @@
+"""ONNX embedding backend parity with the PyTorch one
+
+Run from the directory that contains the checkout, like the other commands::
+
+    python -m pytest intellisupport/tests
+
+The comparison against the real models is skipped until the ONNX export
+exists (python -m intellisupport.utils.onnx_export).
+"""
+
+from dataclasses import replace
+
+import numpy as np
+import pytest
+
+from intellisupport.benchmarks.embedding_parity import (MEAN_COSINE, MIN_COSINE, MIN_OVERLAP, compare,
+                                                        onnx_model_path, parity_report)
+from intellisupport.config_service import get_config
+
+
+def test_compare_identical_vectors():
+    vectors = np.random.default_rng(0).standard_normal((30, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    report = compare(vectors, vectors.copy(), queries=10)
+
+    assert report["min_cosine"] == pytest.approx(1.0)
+    assert report["top5_overlap"] == 1.0
+
+
+@pytest.mark.parametrize("quantized", [True, False], ids=["int8", "float32"])
+def test_onnx_matches_pytorch(quantized):
+    config = replace(get_config().embedding, onnx_quantized=quantized)
+    if not onnx_model_path(config).exists():
+        pytest.skip(f"no ONNX export at {onnx_model_path(config)}")
+    pytest.importorskip("sentence_transformers")
+    pytest.importorskip("onnxruntime")
+
+    report = parity_report(config, documents=200, queries=40)
+
+    assert report["min_cosine"] >= MIN_COSINE
+    assert report["mean_cosine"] >= MEAN_COSINE
+    assert report["top5_overlap"] >= MIN_OVERLAP
@@ -0,0 +1,111 @@
+"""Incremental ingestion against an in-memory collection"""
+
+import numpy as np
+import pytest
+
+from intellisupport.config_service import ConfigSnapshot
+from intellisupport.utils.ingest import Ingestor
+
+
+class FakeCollection:
+    """The slice of ChromaClient the ingestor writes through"""
+
+    def __init__(self):
+        self.docs = {}
+
+    def upsert(self, ids, documents, embeddings, metadatas):
+        for chunk_id, document, metadata in zip(ids, documents, metadatas):
+            self.docs[chunk_id] = (document, metadata)
+
+    def update_metadata(self, ids, metadatas):
+        for chunk_id, metadata in zip(ids, metadatas):
+            self.docs[chunk_id] = (self.docs[chunk_id][0], {**self.docs[chunk_id][1], **metadata})
+
+    def delete(self, ids):
+        for chunk_id in ids:
+            self.docs.pop(chunk_id, None)
+
+    def sources(self):
+        return {metadata["source"] for _, metadata in self.docs.values()}
+
+
+class FakeEmbedder:
+    def __init__(self):
+        self.texts = []
+
+    def embed_texts(self, texts):
+        self.texts.extend(texts)
+        return np.ones((len(texts), 3), dtype=np.float32)
+
+
+def _document(name, paragraphs=12):
+    return "\n\n".join(f"{name} paragraph {i}. " + " ".join(f"{name}{i}w{j}" for j in range(30))
+                       for i in range(paragraphs))
+
+
+@pytest.fixture
+def workspace(tmp_path):
+    source = tmp_path / "docs"
+    source.mkdir()
+    for name in ("alpha", "beta", "gamma"):
+        (source / f"{name}.md").write_text(_document(name), encoding="utf-8")
+    config = ConfigSnapshot.from_dict({"ingestion": {
+        "chunk_size": 400, "chunk_overlap": 50, "manifest_path": str(tmp_path / "manifest.json")
+    }})
+    return source, config, FakeCollection()
+
+
+def _ingest(config, collection, source, embedder=None):
+    return Ingestor(config, client=collection, embedder=embedder or FakeEmbedder()).run(str(source), workers=1)
+
+
+def test_initial_run_indexes_every_file(workspace):
+    source, config, collection = workspace
+
+    report = _ingest(config, collection, source)
+
+    assert report.files_updated == 3
+    assert report.chunks_added == len(collection.docs) > 3
+    assert collection.sources() == {"alpha.md", "beta.md", "gamma.md"}
+
+
+def test_unchanged_files_are_skipped(workspace):
+    source, config, collection = workspace
+    _ingest(config, collection, source)
+    embedder = FakeEmbedder()
+
+    report = _ingest(config, collection, source, embedder)
+
+    assert report.files_unchanged == 3
+    assert report.chunks_added == 0
+    assert embedder.texts == []
+
+
+def test_edit_only_embeds_changed_chunks(workspace):
+    source, config, collection = workspace
+    _ingest(config, collection, source)
+    before = set(collection.docs)
+    path = source / "beta.md"
+    path.write_text(path.read_text(encoding="utf-8").replace("beta paragraph 6.", "beta paragraph six."),
+                    encoding="utf-8")
+    embedder = FakeEmbedder()
+
+    report = _ingest(config, collection, source, embedder)
+
+    assert report.files_updated == 1 and report.files_unchanged == 2
+    assert 0 < len(embedder.texts) <= 2
+    assert any("beta paragraph six." in text for text in embedder.texts)
+    assert len(set(collection.docs) - before) == report.chunks_added
+    assert len(before - set(collection.docs)) == report.chunks_removed
+    assert not any("beta paragraph 6." in document for document, _ in collection.docs.values())
+
+
+def test_deleted_file_is_removed(workspace):
+    source, config, collection = workspace
+    _ingest(config, collection, source)
+    (source / "gamma.md").unlink()
+
+    report = _ingest(config, collection, source)
+
+    assert report.files_removed == 1
+    assert collection.sources() == {"alpha.md", "beta.md"}
@@ -0,0 +1,55 @@
+"""Token-budgeted prompt assembly"""
+
+from intellisupport.utils.prompt_assembler import PromptAssembler
+
+SYSTEM = "You are a helpful support agent."
+
+
+def _sent_tokens(assembler, assembled):
+    return sum(assembler._message_tokens(message["content"]) for message in assembled.messages)
+
+
+def test_prompt_tokens_match_the_messages():
+    assembler = PromptAssembler()
+    documents = [f"Document {i}: " + "reset your password from the account page. " * 20 for i in range(5)]
+    history = [{"role": "user", "content": f"earlier question {i}"} for i in range(4)]
+
+    assembled = assembler.assemble(SYSTEM, "How do I reset my password?", documents, history, budget=400)
+
+    assert assembled.prompt_tokens == _sent_tokens(assembler, assembled)
+    assert assembled.prompt_tokens <= 400
+    assert assembled.documents_dropped > 0
+
+
+def test_everything_fits_under_a_large_budget():
+    assembler = PromptAssembler()
+    history = [{"role": "user", "content": "hi"}, {"role": "assistant", "content": "hello"}]
+
+    assembled = assembler.assemble(SYSTEM, "question", ["a short document"], history, budget=8192)
+
+    assert assembled.documents_used == 1 and assembled.history_used == 2
+    assert assembled.tokens_saved == 0
+    assert assembled.prompt_tokens == _sent_tokens(assembler, assembled)
+
+
+def test_history_keeps_newest_turns():
+    assembler = PromptAssembler()
+    history = [{"role": "user", "content": f"turn {i} " + "words " * 30} for i in range(10)]
+
+    assembled = assembler.assemble(SYSTEM, "question", history=history, budget=150)
+
+    kept = [message["content"] for message in assembled.messages[1:-1]]
+    assert kept == [turn["content"] for turn in history[-len(kept):]]
+    assert assembled.history_dropped == 10 - len(kept) > 0
+
+
+def test_oversized_query_is_truncated_to_the_budget():
+    assembler = PromptAssembler()
+    query = "please help me with my account " * 500
+
+    assembled = assembler.assemble(SYSTEM, query, ["doc"], [{"role": "user", "content": "old"}], budget=200)
+
+    assert assembled.query_tokens_dropped > 0
+    assert query.startswith(assembled.messages[-1]["content"].strip())
+    assert assembled.prompt_tokens <= 200
+    assert assembled.documents_used == 0 and assembled.history_used == 0
@@ -0,0 +1,90 @@
+"""Semantic response cache: guards, TTL and eviction"""
+
+import time
+
+import numpy as np
+
+from intellisupport.utils.semantic_cache import SemanticCache
+
+
+def _vector(*values):
+    return np.array(values, dtype=np.float32)
+
+
+def test_hit_requires_matching_guards():
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=8)
+    cache.put(_vector(1, 0, 0), "reset password", "answer", intent="account", sentiment="neutral")
+
+    assert cache.lookup(_vector(1, 0, 0), intent="account", sentiment="neutral").response == "answer"
+    assert cache.lookup(_vector(1, 0, 0), intent="billing", sentiment="neutral") is None
+    assert cache.lookup(_vector(1, 0, 0)) is None
+    assert cache.stats["guard_rejections"] == 2
+
+
+def test_guard_mismatch_does_not_hide_eligible_entry():
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=8)
+    cache.put(_vector(0.95, 0.31, 0), "slightly different", "eligible", intent="account")
+    cache.put(_vector(1, 0, 0), "exact", "other plan", intent="account", plan="pro")
+
+    entry = cache.lookup(_vector(1, 0, 0), intent="account")
+
+    assert entry is not None and entry.response == "eligible"
+
+
+def test_below_threshold_is_a_miss():
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=8)
+    cache.put(_vector(1, 0, 0), "q", "a")
+
+    assert cache.lookup(_vector(0, 1, 0)) is None
+    assert cache.stats["misses"] == 1
+
+
+def test_expired_entry_is_removed(monkeypatch):
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=8, ttl_seconds=10)
+    cache.put(_vector(1, 0, 0), "q", "a")
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    assert cache.lookup(_vector(1, 0, 0)) is None
+    assert cache.stats["expired"] == 1
+    assert len(cache) == 0
+
+
+def test_expired_best_match_does_not_hide_live_entry(monkeypatch):
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=8, ttl_seconds=10)
+    now = time.monotonic()
+    monkeypatch.setattr(time, "monotonic", lambda: now)
+    cache.put(_vector(1, 0, 0), "old", "stale")
+    monkeypatch.setattr(time, "monotonic", lambda: now + 8)
+    cache.put(_vector(0.95, 0.31, 0), "newer", "live")
+    monkeypatch.setattr(time, "monotonic", lambda: now + 11)
+
+    entry = cache.lookup(_vector(1, 0, 0))
+
+    assert entry is not None and entry.response == "live"
+    assert cache.stats["expired"] == 1
+
+
+def test_guard_codes_are_released_with_their_entries():
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=2)
+    for i in range(10):
+        cache.put(_vector(1, i, 0), f"q{i}", "a", intent=f"intent-{i}", model="m")
+
+    assert set(cache._guard_codes["intent"]) == {"intent-8", "intent-9"}
+    assert cache._guard_codes["model"] == {"m": cache._guard_codes["model"]["m"]}
+    cache.invalidate_intent("intent-9")
+    assert set(cache._guard_codes["intent"]) == {"intent-8"}
+    assert cache.lookup(_vector(1, 8, 0), intent="intent-8", model="m").query == "q8"
+
+
+def test_lru_eviction():
+    cache = SemanticCache(similarity_threshold=0.9, max_entries=2)
+    cache.put(_vector(1, 0, 0), "first", "a")
+    cache.put(_vector(0, 1, 0), "second", "b")
+    cache.lookup(_vector(1, 0, 0))
+
+    cache.put(_vector(0, 0, 1), "third", "c")
+
+    assert cache.stats["evictions"] == 1
+    assert cache.lookup(_vector(0, 1, 0)) is None
+    assert cache.lookup(_vector(1, 0, 0)).response == "a"
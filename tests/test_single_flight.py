@@ -0,0 +1,69 @@
+"""Coalescing of identical in-flight calls"""
+
+import asyncio
+
+import pytest
+
+from intellisupport.utils.single_flight import SingleFlight, coalesce_key
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    release = asyncio.Event()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await release.wait()
+        return {"response": "answer", "metadata": {}}
+
+    waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(5)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters)
+
+    assert calls == 1
+    assert flight.get_stats()["collapsed"] == 4
+    assert flight.inflight == 0
+    # Each caller gets its own copy
+    results[0]["metadata"]["request_id"] = "mine"
+    assert all(result == {"response": "answer", "metadata": {}} for result in results[1:])
+
+
+@pytest.mark.asyncio
+async def test_exception_reaches_every_waiter():
+    flight = SingleFlight()
+    release = asyncio.Event()
+
+    async def work():
+        await release.wait()
+        raise ValueError("boom")
+
+    waiters = [asyncio.ensure_future(flight.do("key", work)) for _ in range(3)]
+    await asyncio.sleep(0)
+    release.set()
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert all(isinstance(result, ValueError) for result in results)
+    assert flight.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_finished_key_runs_again():
+    flight = SingleFlight()
+
+    async def work():
+        return 1
+
+    await flight.do("key", work)
+    await flight.do("key", work)
+
+    assert flight.stats == {"executions": 2, "collapsed": 0}
+
+
+def test_coalesce_key_normalises_query_and_keeps_guards():
+    assert coalesce_key("  Reset   PASSWORD ") == coalesce_key("reset password")
+    assert coalesce_key("q", {"model": "a"}) != coalesce_key("q", {"model": "b"})
+    assert coalesce_key("q", {"session_id": "s1"}) == coalesce_key("q", {"session_id": "s2"})
@@ -0,0 +1,119 @@
+"""Admission control and bounded per-stage concurrency"""
+
+import asyncio
+import math
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+from ..exception import QueueFullException, QueueTimeoutException
+from .metrics import Histogram
+
+
+class StageLimiter:
+    """At most ``limit`` holders at once, with a bounded, deadline-limited queue"""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.limit = limit
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._semaphore = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.rejected = {"queue_full": 0, "queue_timeout": 0}
+        self.wait_time = Histogram()
+
+    @property
+    def retry_after(self) -> int:
+        return max(1, math.ceil(self.queue_timeout))
+
+    async def acquire(self) -> None:
+        if not self._semaphore.locked():
+            # Free slot: take it without queueing (this does not suspend)
+            await self._semaphore.acquire()
+            self.wait_time.observe(0.0)
+            self.active += 1
+            return
+
+        if self.waiting >= self.max_queue:
+            self.rejected["queue_full"] += 1
+            raise QueueFullException(f"{self.name} queue is full", retry_after=self.retry_after)
+
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected["queue_timeout"] += 1
+            raise QueueTimeoutException(
+                f"Timed out after {self.queue_timeout}s waiting for {self.name}",
+                retry_after=self.retry_after
+            ) from None
+        finally:
+            self.waiting -= 1
+            self.wait_time.observe(time.perf_counter() - started)
+        self.active += 1
+
+    def release(self) -> None:
+        self.active -= 1
+        self._semaphore.release()
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[None]:
+        await self.acquire()
+        try:
+            yield
+        finally:
+            self.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "limit": self.limit,
+            "active": self.active,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "queue_timeout_seconds": self.queue_timeout,
+            "rejected": dict(self.rejected),
+            "wait_seconds": self.wait_time.snapshot()
+        }
+
+
+class AdmissionController:
+    """A global request limiter plus one limiter per expensive stage"""
+
+    def __init__(self, config):
+        self.global_limiter = StageLimiter(
+            "global",
+            config.max_concurrent_requests,
+            config.max_queue,
+            config.queue_timeout_seconds
+        )
+        self.stages: Dict[str, StageLimiter] = {
+            name: StageLimiter(
+                name,
+                settings.get("limit", 8),
+                settings.get("max_queue", 128),
+                settings.get("queue_timeout_seconds", config.queue_timeout_seconds)
+            )
+            for name, settings in (config.stages or {}).items()
+        }
+
+    def admit(self):
+        """Context manager holding one global request slot"""
+        return self.global_limiter.slot()
+
+    @asynccontextmanager
+    async def stage(self, name: str) -> AsyncIterator[None]:
+        limiter: Optional[StageLimiter] = self.stages.get(name)
+        if limiter is None:
+            yield
+            return
+        async with limiter.slot():
+            yield
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "global": self.global_limiter.get_stats(),
+            "stages": {name: limiter.get_stats() for name, limiter in self.stages.items()}
+        }
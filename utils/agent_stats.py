@@ -0,0 +1,115 @@
+"""Rolling-window call counts, errors and latency percentiles per agent"""
+
+import bisect
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# Log-spaced latency bins from 0.1 ms to ~60 s; a percentile is reported as
+# the upper edge of its bin, so the error is bounded by the 25% bin growth
+LATENCY_BOUNDS_MS = tuple(0.1 * 1.25 ** i for i in range(60))
+
+
+class _Bucket:
+    """Everything recorded for one agent during one time slice"""
+
+    __slots__ = ("slot", "calls", "errors", "total_ms", "max_ms", "bins")
+
+    def __init__(self):
+        self.slot = -1
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bins = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+    def reset(self, slot: int) -> None:
+        self.slot = slot
+        self.calls = 0
+        self.errors = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.bins = [0] * (len(LATENCY_BOUNDS_MS) + 1)
+
+
+class _AgentWindow:
+    """Ring of time-sliced buckets; memory is fixed regardless of traffic"""
+
+    def __init__(self, num_buckets: int):
+        self.buckets = [_Bucket() for _ in range(num_buckets)]
+
+    def record(self, slot: int, latency_ms: float, error: bool) -> None:
+        bucket = self.buckets[slot % len(self.buckets)]
+        if bucket.slot != slot:
+            bucket.reset(slot)
+        bucket.calls += 1
+        bucket.errors += int(error)
+        bucket.total_ms += latency_ms
+        bucket.max_ms = max(bucket.max_ms, latency_ms)
+        bucket.bins[bisect.bisect_left(LATENCY_BOUNDS_MS, latency_ms)] += 1
+
+    def live(self, oldest_slot: int) -> List[_Bucket]:
+        return [bucket for bucket in self.buckets if bucket.slot >= oldest_slot and bucket.calls]
+
+
+def _percentile(bins: List[int], total: int, p: float, max_ms: float) -> float:
+    rank = p * total
+    running = 0
+    for i, count in enumerate(bins):
+        running += count
+        if running >= rank and count:
+            return min(LATENCY_BOUNDS_MS[i], max_ms) if i < len(LATENCY_BOUNDS_MS) else max_ms
+    return max_ms
+
+
+class AgentStats:
+    """Per-agent activity over the last ``window_seconds``.
+
+    Time is cut into ``bucket_seconds`` slices held in a ring buffer per
+    agent; recording touches one bucket, and a snapshot merges the buckets
+    still inside the window.
+    """
+
+    def __init__(self, window_seconds: float = 300, bucket_seconds: float = 10):
+        self.window_seconds = window_seconds
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = max(1, int(round(window_seconds / bucket_seconds)))
+        self._agents: Dict[str, _AgentWindow] = {}
+        self._lock = threading.Lock()
+
+    def _slot(self, now: float) -> int:
+        return int(now // self.bucket_seconds)
+
+    def record(self, agent: str, latency_seconds: float, error: bool = False, now: Optional[float] = None) -> None:
+        slot = self._slot(time.time() if now is None else now)
+        with self._lock:
+            window = self._agents.get(agent)
+            if window is None:
+                window = self._agents[agent] = _AgentWindow(self.num_buckets)
+            window.record(slot, latency_seconds * 1000, error)
+
+    def snapshot(self, now: Optional[float] = None) -> Dict[str, Any]:
+        now = time.time() if now is None else now
+        oldest_slot = self._slot(now) - self.num_buckets + 1
+        agents = {}
+        with self._lock:
+            for name, window in self._agents.items():
+                buckets = window.live(oldest_slot)
+                calls = sum(b.calls for b in buckets)
+                if not calls:
+                    continue
+                errors = sum(b.errors for b in buckets)
+                max_ms = max(b.max_ms for b in buckets)
+                bins = [sum(column) for column in zip(*(b.bins for b in buckets))]
+                agents[name] = {
+                    "calls": calls,
+                    "errors": errors,
+                    "error_rate": round(errors / calls, 4),
+                    "calls_per_second": round(calls / self.window_seconds, 3),
+                    "mean_ms": round(sum(b.total_ms for b in buckets) / calls, 3),
+                    "p50_ms": round(_percentile(bins, calls, 0.5, max_ms), 3),
+                    "p95_ms": round(_percentile(bins, calls, 0.95, max_ms), 3),
+                    "p99_ms": round(_percentile(bins, calls, 0.99, max_ms), 3),
+                    "max_ms": round(max_ms, 3)
+                }
+        return {"window_seconds": self.window_seconds, "agents": agents}
@@ -0,0 +1,89 @@
+"""Thin wrapper around a persistent ChromaDB collection"""
+
+from typing import Any, Dict, List, Optional
+from ..exception import ChromaDBException
+
+
+class ChromaClient:
+    """Vector search over the document collection"""
+
+    def __init__(self, persist_directory: str = "db/chroma", collection_name: str = "org_docs_v1"):
+        try:
+            import chromadb
+            self.client = chromadb.PersistentClient(path=persist_directory)
+            self.collection = self.client.get_or_create_collection(
+                name=collection_name,
+                metadata={"hnsw:space": "cosine"}
+            )
+        except Exception as e:
+            raise ChromaDBException(f"Failed to open collection '{collection_name}': {e}") from e
+
+    def search(self, query_vec: List[float], top_k: int = 5) -> Dict[str, Any]:
+        return self.search_batch([query_vec], top_k=top_k)[0]
+
+    def search_batch(self, query_vecs: List[List[float]], top_k: int = 5) -> List[Dict[str, Any]]:
+        """Run all query vectors through a single collection query"""
+        empty = {"ids": [], "documents": [], "distances": [], "metadatas": []}
+        if not query_vecs or not any(query_vecs) or self.collection.count() == 0:
+            return [dict(empty) for _ in query_vecs]
+
+        try:
+            results = self.collection.query(
+                query_embeddings=query_vecs,
+                n_results=top_k,
+                include=["documents", "distances", "metadatas"]
+            )
+        except Exception as e:
+            raise ChromaDBException(f"Chroma query failed: {e}") from e
+
+        return [
+            {
+                "ids": results["ids"][i],
+                "documents": results["documents"][i],
+                "distances": results["distances"][i],
+                "metadatas": results["metadatas"][i]
+            }
+            for i in range(len(query_vecs))
+        ]
+
+    def _max_batch_size(self) -> int:
+        # Chroma rejects single calls larger than its SQLite parameter limit allows
+        return getattr(self.client, "max_batch_size", 0) or 5000
+
+    def upsert(self, ids: List[str], documents: List[str], embeddings: List[List[float]],
+               metadatas: Optional[List[Dict[str, Any]]] = None) -> None:
+        """Insert or replace documents, in as few calls as Chroma accepts"""
+        step = self._max_batch_size()
+        try:
+            for start in range(0, len(ids), step):
+                end = start + step
+                self.collection.upsert(
+                    ids=ids[start:end],
+                    documents=documents[start:end],
+                    embeddings=embeddings[start:end],
+                    metadatas=metadatas[start:end] if metadatas is not None else None
+                )
+        except Exception as e:
+            raise ChromaDBException(f"Chroma upsert failed: {e}") from e
+
+    def update_metadata(self, ids: List[str], metadatas: List[Dict[str, Any]]) -> None:
+        """Update the metadata of existing documents without re-sending their embeddings.
+
+        Chroma merges the given keys into the stored metadata, so a key that
+        should no longer apply has to be sent with a neutral value; omitting
+        it keeps the old one.
+        """
+        step = self._max_batch_size()
+        try:
+            for start in range(0, len(ids), step):
+                self.collection.update(ids=ids[start:start + step], metadatas=metadatas[start:start + step])
+        except Exception as e:
+            raise ChromaDBException(f"Chroma update failed: {e}") from e
+
+    def delete(self, ids: List[str]) -> None:
+        step = self._max_batch_size()
+        try:
+            for start in range(0, len(ids), step):
+                self.collection.delete(ids=ids[start:start + step])
+        except Exception as e:
+            raise ChromaDBException(f"Chroma delete failed: {e}") from e
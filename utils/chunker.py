@@ -0,0 +1,147 @@
+"""Text extraction and chunking for document ingestion
+
+Chunks are packed from whole paragraphs up to ``chunk_size`` characters, so
+an edit only changes the chunks around it; the ones before it, and usually
+most of the ones after it, keep their exact text and therefore their hash.
+"""
+
+import hashlib
+import io
+import re
+from dataclasses import dataclass
+from html.parser import HTMLParser
+from pathlib import Path
+from typing import Iterator, List, Optional, Union
+
+from ..exception import IngestionException
+
+SUPPORTED_SUFFIXES = frozenset({".md", ".markdown", ".txt", ".html", ".htm", ".pdf"})
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SPACES = re.compile(r"[ \t\r\f\v]+")
+
+
+@dataclass(frozen=True)
+class Chunk:
+    text: str
+    content_hash: str
+
+
+def content_hash(data: Union[str, bytes]) -> str:
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+
+class _HTMLText(HTMLParser):
+    """Visible text of an HTML page, one paragraph per block element"""
+
+    _BLOCKS = {"p", "div", "section", "article", "li", "tr", "br", "h1", "h2", "h3", "h4", "h5", "h6",
+               "pre", "blockquote", "table", "ul", "ol", "header", "footer"}
+    _SKIP = {"script", "style", "noscript", "template", "head"}
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts: List[str] = []
+        self._skipping = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self._SKIP:
+            self._skipping += 1
+        elif tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_endtag(self, tag):
+        if tag in self._SKIP:
+            self._skipping = max(0, self._skipping - 1)
+        elif tag in self._BLOCKS:
+            self.parts.append("\n\n")
+
+    def handle_data(self, data):
+        if not self._skipping:
+            self.parts.append(data)
+
+
+def extract_text(path: Path, data: Optional[bytes] = None) -> str:
+    """Plain text of a supported file; ``data`` is its content if already read"""
+    data = path.read_bytes() if data is None else data
+    suffix = path.suffix.lower()
+    if suffix == ".pdf":
+        try:
+            from pypdf import PdfReader
+        except ImportError as e:
+            raise IngestionException("Reading PDF files needs the pypdf package") from e
+        try:
+            return "\n\n".join(page.extract_text() or "" for page in PdfReader(io.BytesIO(data)).pages)
+        except Exception as e:
+            raise IngestionException(f"Failed to read {path}: {e}") from e
+
+    text = data.decode("utf-8", errors="replace")
+    if suffix in (".html", ".htm"):
+        parser = _HTMLText()
+        parser.feed(text)
+        parser.close()
+        text = "".join(parser.parts)
+    return text
+
+
+def _paragraphs(text: str) -> Iterator[str]:
+    for paragraph in _PARAGRAPH_BREAK.split(text.replace("\r\n", "\n")):
+        paragraph = "\n".join(_SPACES.sub(" ", line).strip() for line in paragraph.splitlines()).strip()
+        if paragraph:
+            yield paragraph
+
+
+def _split_long(paragraph: str, chunk_size: int, overlap: int) -> Iterator[str]:
+    """Windows over a paragraph longer than a chunk, cut at whitespace"""
+    start = 0
+    while start < len(paragraph):
+        end = start + chunk_size
+        if end < len(paragraph):
+            cut = paragraph.rfind(" ", start + chunk_size // 2, end)
+            end = cut if cut > 0 else end
+        yield paragraph[start:end].strip()
+        if end >= len(paragraph):
+            return
+        next_start = end - overlap
+        if overlap:
+            space = paragraph.find(" ", next_start, end)
+            next_start = space + 1 if space >= 0 else next_start
+        start = max(next_start, start + 1)
+
+
+def _tail(text: str, overlap: int) -> str:
+    if not overlap or len(text) <= overlap:
+        return ""
+    tail = text[-overlap:]
+    space = tail.find(" ")
+    return tail[space + 1:] if space >= 0 else tail
+
+
+def chunk_text(text: str, chunk_size: int = 1000, overlap: int = 150) -> List[Chunk]:
+    """Paragraph-packed chunks of at most about ``chunk_size`` characters.
+
+    Each chunk after the first starts with the last ``overlap`` characters of
+    the previous one, so a sentence cut at a boundary is still retrievable.
+    """
+    if overlap >= chunk_size:
+        raise IngestionException(f"chunk_overlap ({overlap}) must be smaller than chunk_size ({chunk_size})")
+
+    pieces: List[str] = []
+    for paragraph in _paragraphs(text):
+        if len(paragraph) > chunk_size:
+            pieces.extend(_split_long(paragraph, chunk_size, overlap))
+        else:
+            pieces.append(paragraph)
+
+    chunks: List[str] = []
+    current = ""
+    for piece in pieces:
+        if current and len(current) + 2 + len(piece) > chunk_size:
+            chunks.append(current)
+            carried = _tail(current, overlap)
+            current = f"{carried}\n\n{piece}" if carried and len(carried) + 2 + len(piece) <= chunk_size else piece
+        else:
+            current = f"{current}\n\n{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return [Chunk(text=chunk, content_hash=content_hash(chunk)) for chunk in chunks]
@@ -0,0 +1,121 @@
+"""Per-model circuit breaker driven by rolling error rate and latency"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Tuple
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops sending traffic to a model once it looks unhealthy.
+
+    The breaker keeps the outcome of the last ``window`` calls. While
+    closed, it opens when at least ``min_calls`` have been seen and either
+    the failure rate or the share of calls slower than
+    ``slow_call_seconds`` crosses its threshold. After ``open_seconds`` it
+    goes half-open and lets up to ``half_open_probes`` calls through: if
+    they all succeed it closes again, and any failure re-opens it.
+    Every ``allow_request()`` that returns True must be paired with one of
+    ``record_success``, ``record_failure`` or ``release``.
+    """
+
+    def __init__(self, name: str, window: int = 50, min_calls: int = 10, failure_rate_threshold: float = 0.5,
+                 slow_call_seconds: float = 10.0, slow_call_rate_threshold: float = 0.8,
+                 open_seconds: float = 30.0, half_open_probes: int = 2):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate_threshold = failure_rate_threshold
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate_threshold = slow_call_rate_threshold
+        self.open_seconds = open_seconds
+        self.half_open_probes = half_open_probes
+
+        self.state = CLOSED
+        # (succeeded, slow) per call, newest last
+        self._outcomes: Deque[Tuple[bool, bool]] = deque(maxlen=window)
+        self._opened_at = 0.0
+        self._probes_in_flight = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.stats = {"rejected": 0, "opened": 0}
+
+    def allow_request(self) -> bool:
+        with self._lock:
+            if self.state == OPEN:
+                if time.monotonic() - self._opened_at < self.open_seconds:
+                    self.stats["rejected"] += 1
+                    return False
+                self.state = HALF_OPEN
+                self._probes_in_flight = 0
+                self._probe_successes = 0
+
+            if self.state == HALF_OPEN:
+                if self._probes_in_flight >= self.half_open_probes:
+                    self.stats["rejected"] += 1
+                    return False
+                self._probes_in_flight += 1
+            return True
+
+    def record_success(self, latency_seconds: float) -> None:
+        slow = latency_seconds >= self.slow_call_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                if slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.half_open_probes:
+                    self.state = CLOSED
+                    self._outcomes.clear()
+                return
+            self._outcomes.append((True, slow))
+            self._evaluate()
+
+    def record_failure(self) -> None:
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+                self._open()
+                return
+            self._outcomes.append((False, False))
+            self._evaluate()
+
+    def release(self) -> None:
+        """Give back a permit without an outcome (e.g. the call was cancelled)"""
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._probes_in_flight = max(0, self._probes_in_flight - 1)
+
+    def _evaluate(self) -> None:
+        if self.state != CLOSED or len(self._outcomes) < self.min_calls:
+            return
+        calls = len(self._outcomes)
+        failures = sum(1 for ok, _ in self._outcomes if not ok)
+        slow = sum(1 for _, is_slow in self._outcomes if is_slow)
+        if failures / calls >= self.failure_rate_threshold or slow / calls >= self.slow_call_rate_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._outcomes.clear()
+        self.stats["opened"] += 1
+
+    def get_state(self) -> Dict[str, Any]:
+        with self._lock:
+            calls = len(self._outcomes)
+            failures = sum(1 for ok, _ in self._outcomes if not ok)
+            state = {
+                "state": self.state,
+                "calls": calls,
+                "failure_rate": round(failures / calls, 4) if calls else 0.0,
+                **self.stats
+            }
+            if self.state == OPEN:
+                state["retry_in_seconds"] = round(max(0.0, self._opened_at + self.open_seconds - time.monotonic()), 2)
+            return state
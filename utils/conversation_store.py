@@ -0,0 +1,294 @@
+"""Server-side conversation history on append-only, sharded log files
+
+Every turn is one length-prefixed record appended to the shard that owns its
+conversation. Records of the same conversation are chained backwards through
+``prev_offset``, and the index only keeps the offset of each conversation's
+newest record, so loading the last N turns is N positioned reads.
+
+The index itself lives on disk next to each log (``shard-NNN.idx``, SQLite)
+together with how many log bytes it covers; only the most recently used
+conversations are held in memory, so RAM stays bounded however many
+conversations accumulate. On open, records past the covered size (turns
+written just before a crash) are replayed into the index.
+
+Record layout (little endian)::
+
+    u32 payload_len | u32 crc32(id + payload) | i64 prev_offset | u16 id_len | id | payload
+
+The payload is the turn as compact JSON.
+"""
+
+import json
+import os
+import re
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from ..exception import ConversationStoreException
+
+HEADER = struct.Struct("<IIqH")
+NO_RECORD = -1
+# Ids are client-supplied; the header's u16 id_len caps them anyway
+CONVERSATION_ID_MAX_LENGTH = 128
+CONVERSATION_ID_PATTERN = r"^[A-Za-z0-9_.:-]+$"
+_CONVERSATION_ID = re.compile(CONVERSATION_ID_PATTERN)
+
+
+class _Shard:
+    """One log file plus the on-disk index of the conversations it holds"""
+
+    def __init__(self, path: Path, cache_entries: int = 1024):
+        self.path = path
+        self.index_path = path.with_suffix(".idx")
+        self.lock = threading.Lock()
+        self.cache_entries = cache_entries
+        # conversation_id -> (offset of newest record, number of turns), most recent last
+        self._cache: "OrderedDict[str, Tuple[int, int]]" = OrderedDict()
+        self.size = 0
+        self.records = 0
+        self.conversations = 0
+        self._db = self._open_index()
+        self._recover()
+        self._file = open(self.path, "ab")
+
+    def _open_index(self) -> sqlite3.Connection:
+        try:
+            return self._connect()
+        except sqlite3.DatabaseError:
+            # The index is derived from the log; a corrupt one is rebuilt
+            for suffix in ("", "-wal", "-shm"):
+                Path(f"{self.index_path}{suffix}").unlink(missing_ok=True)
+            return self._connect()
+
+    def _connect(self) -> sqlite3.Connection:
+        # Every use is under self.lock, from whichever executor thread holds it
+        db = sqlite3.connect(self.index_path, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("CREATE TABLE IF NOT EXISTS conversations "
+                   "(id TEXT PRIMARY KEY, offset INTEGER NOT NULL, turns INTEGER NOT NULL) WITHOUT ROWID")
+        db.execute("CREATE TABLE IF NOT EXISTS meta "
+                   "(id INTEGER PRIMARY KEY CHECK (id = 0), size INTEGER NOT NULL, records INTEGER NOT NULL)")
+        db.execute("DROP TABLE IF EXISTS compacted")
+        db.commit()
+        return db
+
+    def _recover(self) -> None:
+        """Index the records past the covered size; drop a torn tail"""
+        self.path.touch(exist_ok=True)
+        row = self._db.execute("SELECT size, records FROM meta").fetchone()
+        offset, self.records = row or (0, 0)
+        if offset == 0 or offset > self.path.stat().st_size:
+            # New index, or one that does not match this log: rebuild it from scratch
+            self._db.execute("DELETE FROM conversations")
+            offset, self.records = 0, 0
+
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            while True:
+                header = f.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                payload_len, crc, prev_offset, id_len = HEADER.unpack(header)
+                body = f.read(id_len + payload_len)
+                if len(body) < id_len + payload_len or zlib.crc32(body) != crc:
+                    break
+                self._db.execute(
+                    "INSERT INTO conversations VALUES (?, ?, 1) "
+                    "ON CONFLICT(id) DO UPDATE SET offset = excluded.offset, turns = turns + 1",
+                    (body[:id_len].decode("utf-8"), offset)
+                )
+                self.records += 1
+                offset += HEADER.size + id_len + payload_len
+
+        if offset != self.path.stat().st_size:
+            with open(self.path, "r+b") as f:
+                f.truncate(offset)
+        self.size = offset
+        self._save_meta()
+        self._db.commit()
+        self.conversations = self._db.execute("SELECT COUNT(*) FROM conversations").fetchone()[0]
+
+    def _save_meta(self) -> None:
+        self._db.execute("INSERT OR REPLACE INTO meta VALUES (0, ?, ?)", (self.size, self.records))
+
+    def _lookup(self, conversation_id: str) -> Tuple[int, int]:
+        entry = self._cache.get(conversation_id)
+        if entry is not None:
+            self._cache.move_to_end(conversation_id)
+            return entry
+        row = self._db.execute("SELECT offset, turns FROM conversations WHERE id = ?",
+                               (conversation_id,)).fetchone()
+        if row is None:
+            return NO_RECORD, 0
+        self._remember(conversation_id, row)
+        return row
+
+    def _remember(self, conversation_id: str, entry: Tuple[int, int]) -> None:
+        self._cache[conversation_id] = entry
+        self._cache.move_to_end(conversation_id)
+        if len(self._cache) > self.cache_entries:
+            self._cache.popitem(last=False)
+
+    def append(self, conversation_id: str, turn: Dict[str, Any]) -> None:
+        id_bytes = conversation_id.encode("utf-8")
+        payload = json.dumps(turn, separators=(",", ":"), default=str).encode("utf-8")
+        with self.lock:
+            prev_offset, turns = self._lookup(conversation_id)
+            body = id_bytes + payload
+            record = HEADER.pack(len(payload), zlib.crc32(body), prev_offset, len(id_bytes)) + body
+            self._file.write(record)
+            self._file.flush()
+            # Log first, index second: a crash in between is repaired by _recover
+            entry = (self.size, turns + 1)
+            self.size += len(record)
+            self.records += 1
+            self._db.execute("INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)", (conversation_id, *entry))
+            self._save_meta()
+            self._db.commit()
+            self._remember(conversation_id, entry)
+            if not turns:
+                self.conversations += 1
+
+    def read_last(self, conversation_id: str, limit: int) -> List[Dict[str, Any]]:
+        with self.lock:
+            offset, _ = self._lookup(conversation_id)
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                turns = [turn for _, turn in self._walk_back(fd, offset, limit)]
+            finally:
+                os.close(fd)
+        turns.reverse()
+        return turns
+
+    def _walk_back(self, fd: int, offset: int, limit: int) -> Iterator[Tuple[bytes, Dict[str, Any]]]:
+        """Yield (raw record, turn) pairs newest first, following prev_offset"""
+        while offset != NO_RECORD and limit > 0:
+            header = os.pread(fd, HEADER.size, offset)
+            payload_len, _, prev_offset, id_len = HEADER.unpack(header)
+            body = os.pread(fd, id_len + payload_len, offset + HEADER.size)
+            yield header + body, json.loads(body[id_len:].decode("utf-8"))
+            offset = prev_offset
+            limit -= 1
+
+    def garbage_ratio(self, keep_turns: int) -> float:
+        with self.lock:
+            if not self.records:
+                return 0.0
+            live = self._db.execute("SELECT COALESCE(SUM(MIN(turns, ?)), 0) FROM conversations",
+                                    (keep_turns,)).fetchone()[0]
+            return 1 - live / self.records
+
+    def compact(self, keep_turns: int) -> int:
+        """Rewrite the shard keeping only each conversation's last turns"""
+        tmp_path = self.path.with_suffix(".compact")
+        with self.lock:
+            before = self.size
+            offset = 0
+            records = 0
+            # The new offsets go to a side table that replaces the index once the log is swapped
+            self._db.execute("CREATE TABLE compacted "
+                             "(id TEXT PRIMARY KEY, offset INTEGER NOT NULL, turns INTEGER NOT NULL) WITHOUT ROWID")
+            fd = os.open(self.path, os.O_RDONLY)
+            try:
+                with open(tmp_path, "wb") as out:
+                    for conversation_id, last_offset in self._db.execute("SELECT id, offset FROM conversations"):
+                        kept = [raw for raw, _ in self._walk_back(fd, last_offset, keep_turns)]
+                        prev_offset = NO_RECORD
+                        for raw in reversed(kept):
+                            payload_len, crc, _, id_len = HEADER.unpack(raw[:HEADER.size])
+                            out.write(HEADER.pack(payload_len, crc, prev_offset, id_len) + raw[HEADER.size:])
+                            prev_offset = offset
+                            offset += len(raw)
+                        self._db.execute("INSERT INTO compacted VALUES (?, ?, ?)",
+                                         (conversation_id, prev_offset, len(kept)))
+                        records += len(kept)
+                    out.flush()
+                    os.fsync(out.fileno())
+            except BaseException:
+                self._db.rollback()
+                self._db.execute("DROP TABLE IF EXISTS compacted")
+                self._db.commit()
+                raise
+            finally:
+                os.close(fd)
+
+            # Until the swap is committed the index matches neither log, so a crash
+            # in between makes the next open rebuild it
+            self._db.execute("INSERT OR REPLACE INTO meta VALUES (0, 0, 0)")
+            self._db.commit()
+            self._file.close()
+            os.replace(tmp_path, self.path)
+            self._file = open(self.path, "ab")
+            self._db.execute("DROP TABLE conversations")
+            self._db.execute("ALTER TABLE compacted RENAME TO conversations")
+            self.size = offset
+            self.records = records
+            self._save_meta()
+            self._db.commit()
+            self._cache.clear()
+            return before - offset
+
+    def close(self) -> None:
+        with self.lock:
+            self._file.close()
+            self._db.close()
+
+
+class ConversationStore:
+    """Append-only conversation history, sharded by conversation id"""
+
+    def __init__(self, directory: str = "data/conversations", num_shards: int = 16,
+                 max_turns_per_conversation: int = 200, index_cache_entries: int = 10000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.max_turns_per_conversation = max_turns_per_conversation
+        cache_entries = max(1, index_cache_entries // num_shards)
+        try:
+            self.shards = [_Shard(self.directory / f"shard-{i:03d}.log", cache_entries) for i in range(num_shards)]
+        except (OSError, UnicodeDecodeError, sqlite3.Error) as e:
+            raise ConversationStoreException(f"Failed to open conversation store at {directory}: {e}") from e
+
+    def _shard(self, conversation_id: str) -> _Shard:
+        if len(conversation_id) > CONVERSATION_ID_MAX_LENGTH or not _CONVERSATION_ID.match(conversation_id):
+            raise ConversationStoreException(f"Invalid conversation id: {conversation_id[:32]!r}")
+        return self.shards[zlib.crc32(conversation_id.encode("utf-8")) % len(self.shards)]
+
+    def append(self, conversation_id: str, role: str, content: str,
+               metadata: Optional[Dict[str, Any]] = None) -> None:
+        self._shard(conversation_id).append(conversation_id, {
+            "role": role,
+            "content": content,
+            "timestamp": time.time(),
+            "metadata": metadata or {}
+        })
+
+    def get_history(self, conversation_id: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Last ``limit`` turns, oldest first"""
+        return self._shard(conversation_id).read_last(conversation_id, limit)
+
+    def compact(self, min_garbage_ratio: float = 0.5) -> Dict[str, int]:
+        """Compact every shard whose share of trimmable records is high enough"""
+        reclaimed = {}
+        for shard in self.shards:
+            if shard.garbage_ratio(self.max_turns_per_conversation) >= min_garbage_ratio:
+                reclaimed[shard.path.name] = shard.compact(self.max_turns_per_conversation)
+        return reclaimed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "conversations": sum(shard.conversations for shard in self.shards),
+            "records": sum(shard.records for shard in self.shards),
+            "bytes": sum(shard.size for shard in self.shards),
+            "shards": len(self.shards)
+        }
+
+    def close(self) -> None:
+        for shard in self.shards:
+            shard.close()
@@ -0,0 +1,96 @@
+"""Async DAG executor for the agent pipeline"""
+
+import asyncio
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence
+
+from ..exception import AgentException, IntelliSupportException
+from .agent_stats import AgentStats
+from .tracing import tracer
+
+StageFunc = Callable[[Any], Awaitable[Any]]
+StageCallback = Callable[[str, Any], Awaitable[None]]
+
+
+class Stage:
+    """A named pipeline step and the stages it has to wait for"""
+
+    def __init__(self, name: str, func: StageFunc, depends_on: Sequence[str] = ()):
+        self.name = name
+        self.func = func
+        self.depends_on = tuple(depends_on)
+
+
+class DAGExecutor:
+    """Starts every stage as soon as all of its dependencies have finished.
+
+    Independent stages run concurrently, so the latency of a run is the
+    longest dependency chain rather than the sum of all stages.
+    """
+
+    def __init__(self, stages: List[Stage], stats: Optional[AgentStats] = None):
+        self.stages = {stage.name: stage for stage in stages}
+        self.order = self._topological_order()
+        # Optional per-stage activity aggregator (calls, errors, latency)
+        self.stats = stats
+
+    def _topological_order(self) -> List[str]:
+        pending = {name: set(stage.depends_on) for name, stage in self.stages.items()}
+        for name, deps in pending.items():
+            unknown = deps - self.stages.keys()
+            if unknown:
+                raise AgentException(f"Stage '{name}' depends on unknown stages: {sorted(unknown)}")
+
+        order = []
+        while pending:
+            ready = [name for name, deps in pending.items() if not deps]
+            if not ready:
+                raise AgentException(f"Pipeline has a dependency cycle between: {sorted(pending)}")
+            for name in ready:
+                order.append(name)
+                del pending[name]
+            for deps in pending.values():
+                deps.difference_update(ready)
+        return order
+
+    async def run(self, state: Any, on_stage_complete: Optional[StageCallback] = None) -> Dict[str, float]:
+        """Run all stages against ``state`` and return per-stage timings in ms"""
+        timings: Dict[str, float] = {}
+        tasks: Dict[str, asyncio.Future] = {}
+        started = time.perf_counter()
+
+        async def _run_stage(stage: Stage) -> Any:
+            if stage.depends_on:
+                await asyncio.gather(*(tasks[dep] for dep in stage.depends_on))
+            stage_start = time.perf_counter()
+            try:
+                with tracer.span(f"stage.{stage.name}"):
+                    result = await stage.func(state)
+            except Exception:
+                if self.stats is not None:
+                    self.stats.record(stage.name, time.perf_counter() - stage_start, error=True)
+                raise
+            elapsed = time.perf_counter() - stage_start
+            timings[stage.name] = round(elapsed * 1000, 2)
+            if self.stats is not None:
+                self.stats.record(stage.name, elapsed)
+            if on_stage_complete is not None:
+                await on_stage_complete(stage.name, result)
+            return result
+
+        for name in self.order:
+            tasks[name] = asyncio.ensure_future(_run_stage(self.stages[name]))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except Exception as e:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            # Our own errors (e.g. admission rejections) keep their type
+            if isinstance(e, IntelliSupportException):
+                raise
+            raise AgentException(f"Pipeline stage failed: {e}") from e
+
+        timings["total"] = round((time.perf_counter() - started) * 1000, 2)
+        return timings
@@ -0,0 +1,116 @@
+"""MinHash signatures and an LSH index for near-duplicate chunk detection
+
+A chunk's signature is the minimum, under ``num_perm`` random hash functions,
+over its word shingles; the fraction of equal positions between two
+signatures estimates the Jaccard similarity of their shingle sets. The LSH
+index splits signatures into ``bands`` and only compares chunks that collide
+in at least one band, so a lookup touches a handful of candidates instead of
+the whole collection.
+"""
+
+import hashlib
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Set
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_WORD = re.compile(r"\w+", re.UNICODE)
+
+
+class MinHasher:
+    """Fixed-size MinHash signatures of texts; deterministic across processes"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 5, seed: int = 1):
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        # 32-bit coefficients keep a * h + b within uint64 for 32-bit h
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def _shingles(self, text: str) -> np.ndarray:
+        words = _WORD.findall(text.lower())
+        k = min(self.shingle_size, len(words)) or 1
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        return np.array(
+            [int.from_bytes(hashlib.blake2b(s.encode("utf-8"), digest_size=4).digest(), "little") for s in shingles],
+            dtype=np.uint64
+        )
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = self._shingles(text)
+        permuted = (hashes[:, None] * self._a + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+
+def similarity(a: np.ndarray, b: np.ndarray) -> float:
+    """Estimated Jaccard similarity of two signatures"""
+    return float(np.mean(a == b))
+
+
+class LSHIndex:
+    """Banded LSH over MinHash signatures, persisted as a single .npz file"""
+
+    def __init__(self, num_perm: int = 128, bands: int = 16, threshold: float = 0.8):
+        if num_perm % bands:
+            raise ValueError(f"num_perm ({num_perm}) must be a multiple of bands ({bands})")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.signatures: Dict[str, np.ndarray] = {}
+        self._buckets: List[Dict[bytes, Set[str]]] = [{} for _ in range(bands)]
+
+    def __len__(self) -> int:
+        return len(self.signatures)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        self.signatures[key] = signature
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            buckets.setdefault(band_key, set()).add(key)
+
+    def remove(self, key: str) -> None:
+        signature = self.signatures.pop(key, None)
+        if signature is None:
+            return
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            bucket = buckets.get(band_key)
+            if bucket is not None:
+                bucket.discard(key)
+                if not bucket:
+                    del buckets[band_key]
+
+    def query(self, signature: np.ndarray) -> Optional[str]:
+        """Most similar indexed key at or above the threshold, if any"""
+        candidates: Set[str] = set()
+        for buckets, band_key in zip(self._buckets, self._band_keys(signature)):
+            candidates |= buckets.get(band_key, set())
+        best, best_score = None, self.threshold
+        for key in candidates:
+            score = similarity(signature, self.signatures[key])
+            if score >= best_score:
+                best, best_score = key, score
+        return best
+
+    def save(self, path: Path) -> None:
+        keys = list(self.signatures)
+        matrix = np.stack([self.signatures[key] for key in keys]) if keys else np.zeros((0, self.num_perm), np.uint32)
+        tmp_path = path.with_name(path.name + ".tmp")
+        with open(tmp_path, "wb") as f:
+            np.savez(f, keys=np.array(keys, dtype=str), signatures=matrix)
+        tmp_path.replace(path)
+
+    def load(self, path: Path) -> None:
+        if not path.exists():
+            return
+        with np.load(path) as data:
+            if data["signatures"].shape[1:] != (self.num_perm,):
+                return  # written with other MinHash settings; start over
+            for key, signature in zip(data["keys"].tolist(), data["signatures"]):
+                self.add(key, signature)
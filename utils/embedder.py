@@ -0,0 +1,138 @@
+"""Embedding backends: sentence-transformers on PyTorch, or an exported ONNX graph"""
+
+from pathlib import Path
+from typing import List
+import numpy as np
+from ..config_service import EmbeddingConfig
+from ..exception import EmbeddingException
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+BACKENDS = ("sentence-transformers", "onnx")
+
+
+def embedding_fingerprint(config: EmbeddingConfig) -> str:
+    """``fingerprint`` of the embedder ``create_embedder(config)`` returns, without loading it"""
+    model_name = config.model_name or DEFAULT_MODEL
+    if config.backend == "onnx":
+        return f"{model_name}:onnx" + ("-int8" if config.onnx_quantized else "")
+    return model_name
+
+
+class Embedder:
+    """Turns text into normalised embedding vectors"""
+
+    def __init__(self, model_name: str = DEFAULT_MODEL, batch_size: int = 16):
+        self.model_name = model_name or DEFAULT_MODEL
+        self.batch_size = batch_size
+        # Identifies the vectors this backend produces (e.g. for the embedding cache)
+        self.fingerprint = self.model_name
+        try:
+            from sentence_transformers import SentenceTransformer
+            self.model = SentenceTransformer(self.model_name)
+        except Exception as e:
+            raise EmbeddingException(f"Failed to load embedding model '{self.model_name}': {e}") from e
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Embed one text; returns an array of shape (1, dim)"""
+        return self.embed_texts([text])
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts in a single batched forward pass"""
+        try:
+            return self.model.encode(
+                list(texts),
+                batch_size=self.batch_size,
+                convert_to_numpy=True,
+                normalize_embeddings=True,
+                show_progress_bar=False
+            )
+        except Exception as e:
+            raise EmbeddingException(f"Embedding failed: {e}") from e
+
+
+class OnnxEmbedder:
+    """Mean-pooled, normalised embeddings from an ONNX export of a sentence-transformers model.
+
+    Produces the same vectors as ``Embedder`` (up to quantisation error) for
+    models whose pipeline is transformer -> mean pooling -> normalize, such
+    as all-MiniLM-L6-v2. Create the export with
+    ``python -m intellisupport.utils.onnx_export``.
+    """
+
+    def __init__(self, model_directory: str, model_name: str = DEFAULT_MODEL, batch_size: int = 16,
+                 quantized: bool = True, max_seq_length: int = 256, num_threads: int = 0):
+        self.model_name = model_name or DEFAULT_MODEL
+        self.batch_size = batch_size
+        self.fingerprint = f"{self.model_name}:onnx" + ("-int8" if quantized else "")
+        directory = Path(model_directory)
+        model_path = directory / ("model.int8.onnx" if quantized else "model.onnx")
+        if not model_path.exists():
+            raise EmbeddingException(
+                f"ONNX model not found at {model_path}; export it with "
+                f"python -m intellisupport.utils.onnx_export --model {self.model_name} --output {directory}"
+            )
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if num_threads:
+                options.intra_op_num_threads = num_threads
+            self.session = ort.InferenceSession(str(model_path), options, providers=["CPUExecutionProvider"])
+            self.tokenizer = Tokenizer.from_file(str(directory / "tokenizer.json"))
+        except Exception as e:
+            raise EmbeddingException(f"Failed to load ONNX embedding model from {directory}: {e}") from e
+        self.tokenizer.enable_truncation(max_length=max_seq_length)
+        self.tokenizer.enable_padding()
+        self.input_names = {model_input.name for model_input in self.session.get_inputs()}
+
+    def embed_text(self, text: str) -> np.ndarray:
+        """Embed one text; returns an array of shape (1, dim)"""
+        return self.embed_texts([text])
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        """Embed many texts; similar lengths are batched together to minimise padding"""
+        texts = list(texts)
+        if not texts:
+            return np.zeros((0, 0), dtype=np.float32)
+        try:
+            order = np.argsort([len(text) for text in texts], kind="stable")
+            pooled = [None] * len(texts)
+            for start in range(0, len(texts), self.batch_size):
+                indices = order[start:start + self.batch_size]
+                for i, vector in zip(indices, self._encode([texts[i] for i in indices])):
+                    pooled[i] = vector
+            return np.stack(pooled)
+        except Exception as e:
+            raise EmbeddingException(f"Embedding failed: {e}") from e
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([encoding.ids for encoding in encodings], dtype=np.int64)
+        attention_mask = np.array([encoding.attention_mask for encoding in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.zeros_like(input_ids)
+
+        hidden = self.session.run(None, feeds)[0]
+        mask = attention_mask[..., None].astype(np.float32)
+        vectors = (hidden * mask).sum(axis=1) / np.clip(mask.sum(axis=1), 1e-9, None)
+        vectors /= np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+        return vectors.astype(np.float32)
+
+
+def create_embedder(config: EmbeddingConfig):
+    """The embedding backend selected by ``embedding.backend``"""
+    if config.backend == "onnx":
+        return OnnxEmbedder(
+            config.onnx_directory,
+            model_name=config.model_name,
+            batch_size=config.batch_size,
+            quantized=config.onnx_quantized,
+            max_seq_length=config.max_seq_length,
+            num_threads=config.num_threads
+        )
+    if config.backend != "sentence-transformers":
+        raise EmbeddingException(f"Unknown embedding backend '{config.backend}', expected one of {BACKENDS}")
+    return Embedder(config.model_name, batch_size=config.batch_size)
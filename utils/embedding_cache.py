@@ -0,0 +1,336 @@
+"""Persistent, content-addressed embedding cache on memory-mapped files
+
+Layout, one directory per embedding model and backend (so changing
+``embedding.model_name`` or ``embedding.backend`` starts from an empty cache;
+the old one is left alone, since another process may still be using it)::
+
+    <directory>/<model-slug>-<model-hash>/
+        meta.json       model name, dimension, dtype
+        vectors.bin     row-major matrix, grown by doubling, memory-mapped
+        index.bin       append-only (u64 text hash, u32 row) records
+        .lock           held exclusively while appending
+        .inuse          held shared by every process that has the cache open
+
+Caches of other models are removed explicitly, and only once no process
+holds them open::
+
+    python -m intellisupport.utils.embedding_cache
+
+Rows are written and flushed before their index records are appended, so a
+reader never finds a key whose vector is not there yet. Readers map the
+files read-only and share the pages with every other process through the
+OS page cache; they pick up other processes' writes by reading the index
+tail when a lookup misses.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import re
+import shutil
+import struct
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from ..config_service import get_config
+from ..exception import EmbeddingException
+from .embedder import embedding_fingerprint
+
+try:
+    import fcntl
+except ImportError:  # Windows: only one writing process is supported
+    fcntl = None
+
+INDEX_RECORD = struct.Struct("<QI")
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", text)).strip()
+
+
+def text_key(text: str) -> int:
+    """64-bit hash of the normalised text"""
+    digest = hashlib.blake2b(normalize_text(text).encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+
+def _model_dir(model_name: str) -> str:
+    slug = re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name)[-64:]
+    return f"{slug}-{hashlib.sha1(model_name.encode('utf-8')).hexdigest()[:10]}"
+
+
+class EmbeddingCache:
+    """hash(normalised text) -> embedding row, for a single model"""
+
+    def __init__(self, directory: str, model_name: str, dtype: str = "float16", readonly: bool = False,
+                 initial_rows: int = 4096):
+        self.root = Path(directory)
+        self.path = self.root / _model_dir(model_name)
+        self.model_name = model_name
+        self.dtype = np.dtype(dtype)
+        self.readonly = readonly
+        self.initial_rows = initial_rows
+        self.dim: Optional[int] = None
+        self.rows = 0
+        self.hits = 0
+        self.misses = 0
+        self._index: Dict[int, int] = {}
+        self._index_offset = 0
+        self._vectors: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+
+        self._in_use = self._hold()
+        self._refresh()
+
+    def _hold(self):
+        """Shared lock on .inuse for as long as the cache is open, so pruning skips it"""
+        in_use_path = self.path / ".inuse"
+        if self.readonly:
+            if fcntl is None or not in_use_path.exists():
+                return None
+            in_use = open(in_use_path, "rb")
+            fcntl.flock(in_use, fcntl.LOCK_SH)
+            return in_use
+        while True:
+            self.path.mkdir(parents=True, exist_ok=True)
+            in_use = open(in_use_path, "ab")
+            if fcntl is None:
+                return in_use
+            fcntl.flock(in_use, fcntl.LOCK_SH)
+            # A prune that held the lock meanwhile has deleted the directory; start over
+            if in_use_path.exists() and os.path.samestat(os.fstat(in_use.fileno()), in_use_path.stat()):
+                return in_use
+            in_use.close()
+
+    def close(self) -> None:
+        if self._in_use is not None:
+            self._in_use.close()
+            self._in_use = None
+
+    def _load_meta(self) -> bool:
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            return False
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        if meta["model_name"] != self.model_name:
+            raise EmbeddingException(f"Embedding cache at {self.path} belongs to {meta['model_name']}")
+        self.dim = meta["dim"]
+        self.dtype = np.dtype(meta["dtype"])
+        return True
+
+    def _map(self, min_rows: int) -> None:
+        """(Re)map the vector file once it holds rows beyond the current mapping"""
+        if self._vectors is not None and len(self._vectors) >= min_rows:
+            return
+        path = self.path / "vectors.bin"
+        capacity = os.path.getsize(path) // (self.dim * self.dtype.itemsize)
+        self._vectors = np.memmap(path, dtype=self.dtype, mode="r" if self.readonly else "r+",
+                                  shape=(capacity, self.dim))
+
+    def _refresh(self) -> None:
+        """Read index records appended since the last refresh (possibly by other processes)"""
+        if self.dim is None and not self._load_meta():
+            return
+        index_path = self.path / "index.bin"
+        size = os.path.getsize(index_path) if index_path.exists() else 0
+        size -= size % INDEX_RECORD.size  # ignore a record still being appended
+        if size <= self._index_offset:
+            return
+        with open(index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read(size - self._index_offset)
+        for key, row in INDEX_RECORD.iter_unpack(data):
+            self._index[key] = row
+            self.rows = max(self.rows, row + 1)
+        self._index_offset = size
+        self._map(self.rows)
+
+    def get_many(self, keys: Sequence[int]) -> List[Optional[np.ndarray]]:
+        """float32 vectors for the keys that are cached, None for the rest"""
+        rows = [self._index.get(key) for key in keys]
+        if None in rows:
+            with self._lock:
+                self._refresh()
+            rows = [self._index.get(key) for key in keys]
+        found: List[Optional[np.ndarray]] = [None] * len(rows)
+        positions = [i for i, row in enumerate(rows) if row is not None]
+        if positions:
+            # One fancy-indexed gather instead of a conversion per row
+            block = self._vectors[[rows[i] for i in positions]].astype(np.float32)
+            for i, vector in zip(positions, block):
+                found[i] = vector
+        self.hits += len(positions)
+        self.misses += len(rows) - len(positions)
+        return found
+
+    def put_many(self, keys: Sequence[int], vectors: np.ndarray) -> None:
+        if self.readonly or not len(keys):
+            return
+        vectors = np.asarray(vectors)
+        with self._lock, open(self.path / ".lock", "a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            self._refresh()
+            if self.dim is None:
+                self._create(vectors.shape[1])
+            new = {key: vector for key, vector in zip(keys, vectors) if key not in self._index}
+            if not new:
+                return
+            start = self.rows
+            self._grow(start + len(new))
+            self._vectors[start:start + len(new)] = np.stack(list(new.values())).astype(self.dtype)
+            self._vectors.flush()
+            with open(self.path / "index.bin", "ab") as f:
+                f.write(b"".join(INDEX_RECORD.pack(key, start + i) for i, key in enumerate(new)))
+            for i, key in enumerate(new):
+                self._index[key] = start + i
+            self.rows = start + len(new)
+            self._index_offset += len(new) * INDEX_RECORD.size
+
+    def _create(self, dim: int) -> None:
+        self.dim = dim
+        with open(self.path / "vectors.bin", "wb") as f:
+            f.truncate(self.initial_rows * dim * self.dtype.itemsize)
+        (self.path / "meta.json").write_text(
+            json.dumps({"model_name": self.model_name, "dim": dim, "dtype": self.dtype.name}), encoding="utf-8"
+        )
+        self._map(0)
+
+    def _grow(self, rows: int) -> None:
+        capacity = len(self._vectors)
+        if rows <= capacity:
+            return
+        while capacity < rows:
+            capacity *= 2
+        self._vectors.flush()
+        with open(self.path / "vectors.bin", "r+b") as f:
+            f.truncate(capacity * self.dim * self.dtype.itemsize)
+        # Concurrent readers keep using the old mapping until the swap
+        self._map(rows)
+
+    def get_stats(self) -> Dict[str, object]:
+        lookups = self.hits + self.misses
+        return {
+            "model_name": self.model_name,
+            "rows": self.rows,
+            "dim": self.dim,
+            "dtype": self.dtype.name,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "path": str(self.path)
+        }
+
+
+def prune(directory: str, keep: str) -> List[Path]:
+    """Delete the caches of models other than ``keep`` that no process has open"""
+    root = Path(directory)
+    if not root.is_dir():
+        return []
+    removed = []
+    for entry in root.iterdir():
+        if not entry.is_dir() or entry.name == _model_dir(keep) or not (entry / "meta.json").exists():
+            continue
+        with open(entry / ".inuse", "ab") as in_use:
+            if fcntl is not None:
+                try:
+                    fcntl.flock(in_use, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except BlockingIOError:
+                    continue
+            # Deleted while locked, so a process opening it meanwhile waits and then recreates it
+            shutil.rmtree(entry, ignore_errors=True)
+        if not entry.exists():
+            removed.append(entry)
+    return removed
+
+
+class CachedEmbedder:
+    """Drop-in for ``Embedder`` that only runs the model for uncached texts.
+
+    With ``memory_entries`` set (the query path), new vectors go to an
+    in-memory LRU of that size instead of the files, which are then only
+    read: ingestion's chunks are persisted, arbitrary user queries are not,
+    so neither the files nor the in-RAM index grow with traffic.
+    """
+
+    def __init__(self, embedder, cache: EmbeddingCache, memory_entries: int = 0):
+        self.embedder = embedder
+        self.cache = cache
+        self.model_name = embedder.model_name
+        self.fingerprint = embedder.fingerprint
+        self.batch_size = embedder.batch_size
+        self.memory_entries = memory_entries
+        self._memory: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._memory_lock = threading.Lock()
+        self._dim: Optional[int] = None
+
+    def embed_text(self, text: str) -> np.ndarray:
+        return self.embed_texts([text])
+
+    def embed_texts(self, texts: List[str]) -> np.ndarray:
+        if not texts:
+            return np.zeros((0, self.cache.dim or self._dim or 0), dtype=np.float32)
+        keys = [text_key(text) for text in texts]
+        vectors = self.cache.get_many(keys)
+        if self.memory_entries:
+            vectors = self._from_memory(keys, vectors)
+        # One forward pass for the distinct misses
+        missing: Dict[int, str] = {}
+        for key, text, vector in zip(keys, texts, vectors):
+            if vector is None:
+                missing.setdefault(key, text)
+        if missing:
+            computed = np.asarray(self.embedder.embed_texts(list(missing.values())), dtype=np.float32)
+            self._dim = computed.shape[1]
+            if self.memory_entries:
+                self._remember(list(missing), computed)
+            else:
+                self.cache.put_many(list(missing), computed)
+            by_key = dict(zip(missing, computed))
+            vectors = [by_key[key] if vector is None else vector for key, vector in zip(keys, vectors)]
+        return np.stack(vectors).astype(np.float32, copy=False)
+
+    def _from_memory(self, keys: List[int], vectors: List[Optional[np.ndarray]]) -> List[Optional[np.ndarray]]:
+        with self._memory_lock:
+            found = []
+            for key, vector in zip(keys, vectors):
+                if vector is None and key in self._memory:
+                    self._memory.move_to_end(key)
+                    vector = self._memory[key]
+                found.append(vector)
+            return found
+
+    def _remember(self, keys: List[int], vectors: np.ndarray) -> None:
+        with self._memory_lock:
+            for key, vector in zip(keys, vectors):
+                self._memory[key] = vector
+                self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_entries:
+                self._memory.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, object]:
+        return {**self.cache.get_stats(), "memory_entries": len(self._memory),
+                "max_memory_entries": self.memory_entries}
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Remove embedding caches of other models that no process has open")
+    parser.add_argument("--directory", help="cache directory (default: embedding.cache_directory)")
+    args = parser.parse_args()
+
+    config = get_config().embedding
+    for path in prune(args.directory or config.cache_directory, embedding_fingerprint(config)):
+        print(f"Removed {path}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,117 @@
+"""Dynamic micro-batching in front of the embedding model
+
+Concurrent ``embed()`` calls are queued and turned into one batched forward
+pass: a batch is dispatched once ``max_batch_size`` texts are waiting or the
+oldest has waited ``max_wait_ms``. While a batch is running new requests keep
+accumulating, so under load batches fill up on their own and the model runs
+a few large passes instead of many single-row ones.
+"""
+
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from .embedder import Embedder
+from .metrics import registry
+
+BATCH_SIZE = registry.histogram(
+    "intellisupport_embedding_batch_size", "Texts per embedding forward pass",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+QUEUE_DELAY = registry.histogram(
+    "intellisupport_embedding_queue_delay_seconds", "Time a text waited before its batch started",
+    buckets=(0.0005, 0.001, 0.002, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+)
+
+_Pending = Tuple[str, asyncio.Future, float]
+
+
+class EmbeddingService:
+    """Collects concurrent single-text embed requests into batches"""
+
+    def __init__(self, embedder: Embedder, max_batch_size: int = 16, max_wait_ms: float = 2.0,
+                 max_concurrent_batches: int = 1):
+        self.embedder = embedder
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait_ms / 1000
+        self.max_concurrent_batches = max(1, max_concurrent_batches)
+        # Dedicated threads: the model already parallelises inside a pass
+        self._executor = ThreadPoolExecutor(max_workers=self.max_concurrent_batches, thread_name_prefix="embedding")
+        self._pending: List[_Pending] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._inflight = 0
+        self.batches = 0
+        self.texts = 0
+        self.queue_delay_total = 0.0
+        self.queue_delay_max = 0.0
+
+    async def embed(self, text: str) -> np.ndarray:
+        """Embedding of one text, shape (dim,)"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((text, future, time.perf_counter()))
+        if len(self._pending) >= self.max_batch_size:
+            self._dispatch()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._dispatch)
+        return await future
+
+    def _dispatch(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up (e.g. timed out) are not worth a forward pass
+        self._pending = [item for item in self._pending if not item[1].done()]
+        # When the model is busy, keep collecting; the running batch re-dispatches on completion
+        while self._pending and self._inflight < self.max_concurrent_batches:
+            batch, self._pending = self._pending[:self.max_batch_size], self._pending[self.max_batch_size:]
+            self._inflight += 1
+            asyncio.ensure_future(self._run_batch(batch))
+
+    async def _run_batch(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        for _, _, enqueued in batch:
+            delay = started - enqueued
+            QUEUE_DELAY.labels().observe(delay)
+            self.queue_delay_total += delay
+            self.queue_delay_max = max(self.queue_delay_max, delay)
+        BATCH_SIZE.labels().observe(len(batch))
+        self.batches += 1
+        self.texts += len(batch)
+
+        try:
+            loop = asyncio.get_running_loop()
+            embeddings = await loop.run_in_executor(
+                self._executor, self.embedder.embed_texts, [text for text, _, _ in batch]
+            )
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+        else:
+            for (_, future, _), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
+        finally:
+            self._inflight -= 1
+            if self._pending:
+                self._dispatch()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "texts": self.texts,
+            "pending": len(self._pending),
+            "inflight_batches": self._inflight,
+            "max_batch_size": self.max_batch_size,
+            "avg_batch_size": round(self.texts / self.batches, 2) if self.batches else 0.0,
+            "fill_ratio": round(self.texts / (self.batches * self.max_batch_size), 3) if self.batches else 0.0,
+            "avg_queue_delay_ms": round(self.queue_delay_total / self.texts * 1000, 3) if self.texts else 0.0,
+            "max_queue_delay_ms": round(self.queue_delay_max * 1000, 3)
+        }
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=False)
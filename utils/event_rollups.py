@@ -0,0 +1,162 @@
+"""Incrementally maintained rollups of interaction events
+
+Every flushed batch of events is folded into per-(bucket, intent, sentiment)
+aggregates at two granularities:
+
+- hourly, one small file per day: ``_rollups/hourly/date=YYYY-MM-DD/rollup.parquet``
+- daily, a single file: ``_rollups/daily/rollup.parquet``
+
+All measures are sums (counts, latency sums, a fixed latency histogram), so
+merging a batch is a read-add-write of a file whose size depends on the
+number of buckets, never on how many events have been recorded. The
+leading underscore keeps the directory out of the raw event dataset.
+"""
+
+import bisect
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from .agent_stats import LATENCY_BOUNDS_MS
+
+ROLLUP_DIR = "_rollups"
+STAGES = ("embed", "intent", "sentiment", "cache", "rag", "domain", "prompt", "response", "safety")
+
+ROLLUP_SCHEMA = pa.schema(
+    [
+        ("bucket", pa.timestamp("ms", tz="UTC")),
+        ("intent", pa.string()),
+        ("sentiment", pa.string()),
+        ("count", pa.int64()),
+        ("cache_hits", pa.int64()),
+        ("confidence_sum", pa.float64()),
+        ("confidence_count", pa.int64()),
+        ("total_ms_sum", pa.float64()),
+        # Counts per LATENCY_BOUNDS_MS bin, so percentiles survive summing
+        ("total_ms_bins", pa.list_(pa.int64()))
+    ]
+    + [(f"{stage}_ms_sum", pa.float64()) for stage in STAGES]
+)
+
+RollupKey = Tuple[datetime, str, str]
+
+
+def _empty_row(key: RollupKey) -> Dict[str, Any]:
+    row = {
+        "bucket": key[0],
+        "intent": key[1],
+        "sentiment": key[2],
+        "count": 0,
+        "cache_hits": 0,
+        "confidence_sum": 0.0,
+        "confidence_count": 0,
+        "total_ms_sum": 0.0,
+        "total_ms_bins": [0] * (len(LATENCY_BOUNDS_MS) + 1)
+    }
+    for stage in STAGES:
+        row[f"{stage}_ms_sum"] = 0.0
+    return row
+
+
+def _add_event(row: Dict[str, Any], event: Dict[str, Any]) -> None:
+    row["count"] += 1
+    row["cache_hits"] += int(bool(event.get("cache_hit")))
+    if event.get("intent_confidence") is not None:
+        row["confidence_sum"] += event["intent_confidence"]
+        row["confidence_count"] += 1
+    total_ms = event.get("total_ms")
+    if total_ms is not None:
+        row["total_ms_sum"] += total_ms
+        row["total_ms_bins"][bisect.bisect_left(LATENCY_BOUNDS_MS, total_ms)] += 1
+    for stage in STAGES:
+        row[f"{stage}_ms_sum"] += event.get(f"{stage}_ms") or 0.0
+
+
+def _add_row(row: Dict[str, Any], other: Dict[str, Any]) -> None:
+    for name in ROLLUP_SCHEMA.names[3:]:
+        if name == "total_ms_bins":
+            row[name] = [a + b for a, b in zip(row[name], other[name])]
+        else:
+            row[name] += other[name]
+
+
+def _hour(ts: datetime) -> datetime:
+    return ts.replace(minute=0, second=0, microsecond=0)
+
+
+def _day(ts: datetime) -> datetime:
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def aggregate(events: Iterable[Dict[str, Any]]) -> Dict[RollupKey, Dict[str, Any]]:
+    """Hourly rollup rows for a batch of events"""
+    rows: Dict[RollupKey, Dict[str, Any]] = {}
+    for event in events:
+        ts = event["timestamp"].astimezone(timezone.utc)
+        key = (_hour(ts), event.get("intent") or "unknown", event.get("sentiment") or "unknown")
+        row = rows.get(key)
+        if row is None:
+            row = rows[key] = _empty_row(key)
+        _add_event(row, event)
+    return rows
+
+
+class RollupStore:
+    """Folds event batches into the hourly and daily rollup files"""
+
+    def __init__(self, events_directory: str):
+        self.directory = Path(events_directory) / ROLLUP_DIR
+        self.hourly_directory = self.directory / "hourly"
+        self.daily_path = self.directory / "daily" / "rollup.parquet"
+
+    def exists(self) -> bool:
+        return self.daily_path.exists()
+
+    def add(self, events: List[Dict[str, Any]]) -> None:
+        self._write(aggregate(events))
+
+    def _write(self, hourly: Dict[RollupKey, Dict[str, Any]]) -> None:
+        by_day: Dict[str, Dict[RollupKey, Dict[str, Any]]] = {}
+        daily: Dict[RollupKey, Dict[str, Any]] = {}
+        for key, row in hourly.items():
+            by_day.setdefault(key[0].strftime("%Y-%m-%d"), {})[key] = row
+            day_key = (_day(key[0]), key[1], key[2])
+            day_row = daily.get(day_key)
+            if day_row is None:
+                day_row = daily[day_key] = _empty_row(day_key)
+            _add_row(day_row, row)
+
+        for day, rows in by_day.items():
+            self._merge(self.hourly_directory / f"date={day}" / "rollup.parquet", rows)
+        self._merge(self.daily_path, daily)
+
+    @staticmethod
+    def _merge(path: Path, rows: Dict[RollupKey, Dict[str, Any]]) -> None:
+        if path.exists():
+            for existing in pq.read_table(path, schema=ROLLUP_SCHEMA).to_pylist():
+                key = (existing["bucket"], existing["intent"], existing["sentiment"])
+                if key in rows:
+                    _add_row(existing, rows[key])
+                rows[key] = existing
+        path.parent.mkdir(parents=True, exist_ok=True)
+        table = pa.Table.from_pylist(list(rows.values()), schema=ROLLUP_SCHEMA).sort_by("bucket")
+        tmp = path.with_name(f".{path.name}.tmp")
+        pq.write_table(table, tmp, compression="zstd")
+        os.replace(tmp, path)
+
+    def rebuild(self, event_files: Iterable[Path], schema: pa.Schema) -> None:
+        """Recompute every rollup from raw event files (first start after an upgrade)"""
+        # Rows are bounded by the number of buckets, so the whole history fits in memory
+        hourly: Dict[RollupKey, Dict[str, Any]] = {}
+        for path in event_files:
+            for key, row in aggregate(pq.read_table(path, schema=schema).to_pylist()).items():
+                if key in hourly:
+                    _add_row(hourly[key], row)
+                else:
+                    hourly[key] = row
+        if hourly:
+            self._write(hourly)
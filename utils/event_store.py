@@ -0,0 +1,212 @@
+"""Columnar interaction events, written as day-partitioned Parquet files
+
+Request handlers call ``emit()``, which only appends to a bounded queue; a
+background thread turns batches into Arrow tables and writes them under
+``<directory>/date=YYYY-MM-DD/``. Each flush adds one small file, so once a
+day is over its parts are merged into a single sorted file with large row
+groups, keeping reads over months of traffic to a few files per day.
+Each batch is also folded into the hourly/daily rollups (see event_rollups).
+"""
+
+import os
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from ..config_service import get_config
+from ..logger import logger
+from .event_rollups import STAGES, RollupStore
+from .metrics import registry
+
+PARTITION_KEY = "date"
+
+SCHEMA = pa.schema(
+    [
+        ("timestamp", pa.timestamp("ms", tz="UTC")),
+        ("request_id", pa.string()),
+        ("conversation_id", pa.string()),
+        ("endpoint", pa.string()),
+        ("model", pa.string()),
+        ("intent", pa.string()),
+        ("intent_confidence", pa.float32()),
+        ("sentiment", pa.string()),
+        ("domain", pa.string()),
+        ("cache_hit", pa.bool_()),
+        ("pii_detected", pa.bool_()),
+        ("prompt_tokens", pa.int32()),
+        ("documents_used", pa.int16()),
+        ("response_chars", pa.int32()),
+        ("total_ms", pa.float32())
+    ]
+    + [(f"{stage}_ms", pa.float32()) for stage in STAGES]
+)
+
+EVENTS_WRITTEN = registry.counter("intellisupport_events_written_total", "Interaction events written to Parquet")
+EVENTS_DROPPED = registry.counter(
+    "intellisupport_events_dropped_total", "Interaction events dropped because the queue was full"
+)
+
+
+def interaction_event(metadata: Dict[str, Any], endpoint: str,
+                      conversation_id: Optional[str] = None) -> Dict[str, Any]:
+    """Flatten pipeline metadata into one row of ``SCHEMA``"""
+    context = metadata.get("context") or {}
+    timings = metadata.get("timings") or {}
+    prompt_stats = metadata.get("prompt_stats") or {}
+    response = metadata.get("response") or ""
+    event = {
+        "timestamp": datetime.now(timezone.utc),
+        "request_id": metadata.get("request_id"),
+        "conversation_id": conversation_id,
+        "endpoint": endpoint,
+        "model": context.get("model") or get_config().llm.primary_model,
+        "intent": metadata.get("intent"),
+        "intent_confidence": metadata.get("intent_confidence"),
+        "sentiment": metadata.get("sentiment"),
+        "domain": metadata.get("domain"),
+        "cache_hit": bool(metadata.get("cache_hit")),
+        "pii_detected": bool((metadata.get("safety") or {}).get("pii_detected")),
+        "prompt_tokens": prompt_stats.get("prompt_tokens"),
+        "documents_used": prompt_stats.get("documents_used"),
+        "response_chars": len(response),
+        "total_ms": timings.get("total")
+    }
+    for stage in STAGES:
+        event[f"{stage}_ms"] = timings.get(stage)
+    return event
+
+
+class EventStore:
+    """Non-blocking, batched writer of interaction events"""
+
+    def __init__(self, directory: str, batch_size: int = 1000, flush_interval_seconds: float = 5.0,
+                 max_queue: int = 50000):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self.batch_size = batch_size
+        self.flush_interval_seconds = flush_interval_seconds
+        self._queue: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.files_written = 0
+        self.rollups = RollupStore(directory)
+        self._thread = threading.Thread(target=self._write_loop, name="event-writer", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def from_config(cls) -> Optional["EventStore"]:
+        config = get_config().events
+        if not config.enabled:
+            return None
+        return cls(
+            config.directory,
+            batch_size=config.batch_size,
+            flush_interval_seconds=config.flush_interval_seconds,
+            max_queue=config.max_queue
+        )
+
+    def emit(self, event: Dict[str, Any]) -> None:
+        """Queue one event; never blocks, drops the event if the writer is behind"""
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self.dropped += 1
+            EVENTS_DROPPED.labels().inc()
+
+    def _partition_dir(self, day: str) -> Path:
+        return self.directory / f"{PARTITION_KEY}={day}"
+
+    def _write_loop(self) -> None:
+        if not self.rollups.exists():
+            try:
+                self.rollups.rebuild(sorted(self.directory.glob(f"{PARTITION_KEY}=*/*.parquet")), SCHEMA)
+            except Exception as e:
+                logger.error(f"Failed to rebuild interaction rollups: {e}")
+        self._compact_finished_days()
+        batch: List[Dict[str, Any]] = []
+        deadline = time.monotonic() + self.flush_interval_seconds
+        today = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+        while True:
+            try:
+                event = self._queue.get(timeout=max(0.0, deadline - time.monotonic()))
+                if event is None:
+                    self._flush(batch)
+                    return
+                batch.append(event)
+            except queue.Empty:
+                pass
+            if len(batch) >= self.batch_size or time.monotonic() >= deadline:
+                self._flush(batch)
+                batch = []
+                deadline = time.monotonic() + self.flush_interval_seconds
+                now_day = datetime.now(timezone.utc).strftime("%Y-%m-%d")
+                if now_day != today:
+                    today = now_day
+                    self._compact_finished_days()
+
+    def _flush(self, batch: List[Dict[str, Any]]) -> None:
+        if not batch:
+            return
+        try:
+            by_day: Dict[str, List[Dict[str, Any]]] = {}
+            for event in batch:
+                by_day.setdefault(event["timestamp"].strftime("%Y-%m-%d"), []).append(event)
+            for day, events in by_day.items():
+                self._write_file(self._partition_dir(day), pa.Table.from_pylist(events, schema=SCHEMA))
+            self.written += len(batch)
+            EVENTS_WRITTEN.labels().inc(len(batch))
+        except Exception as e:
+            logger.error(f"Failed to write {len(batch)} interaction events: {e}")
+            return
+        try:
+            self.rollups.add(batch)
+        except Exception as e:
+            logger.error(f"Failed to update interaction rollups: {e}")
+
+    def _write_file(self, partition: Path, table: pa.Table, prefix: str = "part") -> Path:
+        partition.mkdir(parents=True, exist_ok=True)
+        path = partition / f"{prefix}-{time.time_ns()}-{uuid.uuid4().hex[:8]}.parquet"
+        # Dot-prefixed files are ignored by dataset readers until the rename
+        tmp = partition / f".{path.name}.tmp"
+        pq.write_table(table, tmp, compression="zstd", row_group_size=128 * 1024)
+        os.replace(tmp, path)
+        self.files_written += 1
+        return path
+
+    def _compact_finished_days(self) -> None:
+        """Merge the parts of every day before today into one file sorted by time"""
+        today = f"{PARTITION_KEY}={datetime.now(timezone.utc).strftime('%Y-%m-%d')}"
+        for partition in sorted(self.directory.glob(f"{PARTITION_KEY}=*")):
+            if partition.name >= today:
+                continue
+            parts = sorted(partition.glob("*.parquet"))
+            if len(parts) < 2:
+                continue
+            try:
+                table = pa.concat_tables([pq.read_table(part, schema=SCHEMA) for part in parts]).sort_by("timestamp")
+                self._write_file(partition, table, prefix="compacted")
+                for part in parts:
+                    part.unlink()
+            except Exception as e:
+                logger.error(f"Failed to compact interaction events in {partition}: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "files_written": self.files_written,
+            "directory": str(self.directory)
+        }
+
+    def close(self) -> None:
+        """Flush whatever is queued and stop the writer"""
+        self._queue.put(None)
+        self._thread.join(timeout=10)
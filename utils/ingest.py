@@ -0,0 +1,421 @@
+"""Incremental ingestion of a document directory into the Chroma collection
+
+    python -m intellisupport.utils.ingest                    # ingestion.source_directory
+    python -m intellisupport.utils.ingest --source docs/ --workers 8
+    python -m intellisupport.utils.ingest --full             # re-embed and re-cluster everything
+
+A manifest records, per file, its size, mtime, content hash and the ids of
+its chunks. A run only stats unchanged files; new and modified ones are read,
+parsed and chunked in a process pool, and only chunks whose text is new are
+embedded (in large batches, through the embedding cache) and upserted. Chunks
+that disappeared from an edited file, and every chunk of a deleted file, are
+removed from the collection. Chunk ids are derived from the file path and the
+chunk text, so re-running is idempotent and an interrupted run is simply
+redone from the last saved manifest.
+
+Paths are relative to the source directory, which the manifest records: a
+collection mirrors one directory, and an incremental run against another one
+is refused rather than deleting everything the first one indexed. ``--full``
+replaces the collection with the new directory's contents.
+
+With ``ingestion.dedup_enabled`` a new chunk that is a near-duplicate
+(MinHash/LSH, see ``utils/dedup.py``) of an indexed one is not stored again:
+it joins that chunk's cluster, and the canonical copy's metadata lists every
+source it stands for. The canonical copy is removed once all of its cluster's
+chunks are gone.
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+from collections import OrderedDict
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import asdict, dataclass, replace
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from ..config_service import ConfigSnapshot, get_config
+from ..exception import IngestionException
+from ..logger import logger
+from .chroma_client import ChromaClient
+from .chunker import SUPPORTED_SUFFIXES, chunk_text, content_hash, extract_text
+from .dedup import LSHIndex, MinHasher
+from .embedder import create_embedder
+from .embedding_cache import CachedEmbedder, EmbeddingCache
+
+MANIFEST_VERSION = 1
+# Sources listed in a canonical chunk's metadata; the manifest keeps them all
+MAX_METADATA_SOURCES = 20
+
+# (path, source, chunk_size, overlap, num_perm, shingle_size)
+#   -> (source, file hash, [(chunk hash, text, MinHash signature or None)], error)
+_Job = Tuple[str, str, int, int, int, int]
+_Parsed = Tuple[str, str, List[Tuple[str, str, Optional[np.ndarray]]], Optional[str]]
+
+
+@dataclass
+class IngestReport:
+    files_scanned: int = 0
+    files_unchanged: int = 0
+    files_updated: int = 0
+    files_removed: int = 0
+    files_failed: int = 0
+    chunks_added: int = 0
+    chunks_removed: int = 0
+    chunks_kept: int = 0
+    chunks_deduplicated: int = 0
+    chars_deduplicated: int = 0
+    chunks_total: int = 0
+    duplicate_chunks_total: int = 0
+    seconds: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def chunk_id(source: str, chunk_hash: str) -> str:
+    return f"{content_hash(source)[:12]}-{chunk_hash[:20]}"
+
+
+@lru_cache(maxsize=4)
+def _hasher(num_perm: int, shingle_size: int) -> MinHasher:
+    return MinHasher(num_perm, shingle_size)
+
+
+def _parse(job: _Job) -> _Parsed:
+    """Read, extract, chunk and sign one file; runs in a worker process"""
+    path, source, chunk_size, overlap, num_perm, shingle_size = job
+    try:
+        data = Path(path).read_bytes()
+        chunks = chunk_text(extract_text(Path(path), data), chunk_size, overlap)
+        hasher = _hasher(num_perm, shingle_size) if num_perm else None
+        return source, content_hash(data), [
+            (chunk.content_hash, chunk.text, hasher.signature(chunk.text) if hasher else None) for chunk in chunks
+        ], None
+    except Exception as e:
+        return source, "", [], f"{type(e).__name__}: {e}"
+
+
+class Manifest:
+    """What is currently indexed, per source file, and which chunks share a canonical copy"""
+
+    def __init__(self, path: Path, collection: str):
+        self.path = path
+        self.collection = collection
+        # Absolute path of the directory the file paths are relative to
+        self.source_root: Optional[str] = None
+        self.files: Dict[str, Dict[str, Any]] = {}
+        # canonical chunk id -> {member chunk id: source}, for clusters of two or more
+        self.clusters: Dict[str, Dict[str, str]] = {}
+        if path.exists():
+            data = json.loads(path.read_text(encoding="utf-8"))
+            if data.get("version") == MANIFEST_VERSION and data.get("collection") == collection:
+                self.source_root = data.get("source_root")
+                self.files = data["files"]
+                self.clusters = data.get("clusters", {})
+
+    @property
+    def signatures_path(self) -> Path:
+        return self.path.with_suffix(".minhash.npz")
+
+    def save(self) -> None:
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.path.parent, prefix=".manifest-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": MANIFEST_VERSION, "collection": self.collection,
+                           "source_root": self.source_root, "files": self.files, "clusters": self.clusters}, f)
+            os.replace(tmp_path, self.path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class Ingestor:
+    """Brings a collection in line with a directory of documents"""
+
+    def __init__(self, config: Optional[ConfigSnapshot] = None, client: Optional[ChromaClient] = None,
+                 embedder=None):
+        config = config or get_config()
+        self.settings = config.ingestion
+        self.client = client or ChromaClient(config.retrieval.persist_directory, config.retrieval.chroma_collection)
+        if embedder is None:
+            embedder = create_embedder(replace(config.embedding, batch_size=self.settings.embed_batch_size))
+            if config.embedding.cache_enabled:
+                cache = EmbeddingCache(config.embedding.cache_directory, embedder.fingerprint,
+                                       dtype=config.embedding.cache_dtype)
+                embedder = CachedEmbedder(embedder, cache)
+        self.embedder = embedder
+        manifest_path = self.settings.manifest_path or str(
+            Path(config.retrieval.persist_directory) / f"{config.retrieval.chroma_collection}.manifest.json"
+        )
+        self.manifest = Manifest(Path(manifest_path), config.retrieval.chroma_collection)
+
+        self.lsh: Optional[LSHIndex] = None
+        if self.settings.dedup_enabled:
+            self.lsh = LSHIndex(self.settings.minhash_permutations, self.settings.lsh_bands,
+                                self.settings.dedup_threshold)
+            self.lsh.load(self.manifest.signatures_path)
+        self._index_state()
+        if self.lsh is not None:
+            # Signatures of chunks the manifest no longer stores (e.g. a reset manifest)
+            canonical = self._canonical_ids()
+            for key in [key for key in self.lsh.signatures if key not in canonical]:
+                self.lsh.remove(key)
+
+        # Parsed files wait here until their chunks are embedded and upserted
+        self._upserts: Dict[str, Tuple[str, str]] = {}
+        self._deletes: List[str] = []
+        self._dirty: Set[str] = set()
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._removed: List[str] = []
+        self._seen: Set[str] = set()
+
+    def _index_state(self) -> None:
+        """Reverse lookups over the manifest: chunk -> source, duplicate -> canonical"""
+        self._sources = {cid: source for source, entry in self.manifest.files.items() for cid in entry["chunks"]}
+        self._canonical_of = {
+            member: canonical
+            for canonical, members in self.manifest.clusters.items()
+            for member in members if member != canonical
+        }
+
+    def _canonical_ids(self) -> Set[str]:
+        """Ids of the chunks stored in the collection"""
+        return {cid for cid in self._sources if cid not in self._canonical_of} | set(self.manifest.clusters)
+
+    def _scan(self, root: Path, full: bool, report: IngestReport) -> Iterator[Tuple[Path, str, os.stat_result]]:
+        """Files that are new or changed since the manifest was written"""
+        for directory, subdirectories, filenames in os.walk(root):
+            subdirectories[:] = sorted(d for d in subdirectories if not d.startswith("."))
+            for filename in sorted(filenames):
+                path = Path(directory) / filename
+                if path.suffix.lower() not in SUPPORTED_SUFFIXES:
+                    continue
+                source = path.relative_to(root).as_posix()
+                stat = path.stat()
+                report.files_scanned += 1
+                self._seen.add(source)
+                entry = self.manifest.files.get(source)
+                if (not full and entry and entry["size"] == stat.st_size
+                        and entry["mtime_ns"] == stat.st_mtime_ns):
+                    report.files_unchanged += 1
+                    report.chunks_kept += len(entry["chunks"])
+                    continue
+                yield path, source, stat
+
+    def _parsed(self, jobs: Iterator[_Job], workers: int) -> Iterator[_Parsed]:
+        """Parse in a process pool, keeping only a bounded number of files in flight"""
+        if workers == 1:
+            yield from map(_parse, jobs)
+            return
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            inflight: Set[Future] = set()
+            for job in jobs:
+                inflight.add(pool.submit(_parse, job))
+                if len(inflight) >= workers * 4:
+                    done, inflight = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+            for future in inflight:
+                yield future.result()
+
+    def run(self, source_directory: Optional[str] = None, full: bool = False,
+            workers: Optional[int] = None) -> IngestReport:
+        started = time.perf_counter()
+        root = Path(source_directory or self.settings.source_directory)
+        if not root.is_dir():
+            raise IngestionException(f"Source directory not found: {root}")
+        source_root = str(root.resolve())
+        if not full and self.manifest.files and self.manifest.source_root not in (None, source_root):
+            raise IngestionException(
+                f"Collection '{self.manifest.collection}' mirrors {self.manifest.source_root}, not {source_root}; "
+                f"use another collection (or manifest_path) for it, or --full to replace the collection"
+            )
+        workers = workers if workers is not None else self.settings.workers
+        workers = workers or os.cpu_count() or 1
+        num_perm = self.settings.minhash_permutations if self.lsh is not None else 0
+
+        report = IngestReport()
+        self._seen = set()
+        stats: Dict[str, os.stat_result] = {}
+        stale: Set[str] = set()
+        previous_files: Dict[str, Dict[str, Any]] = {}
+        if full:
+            # Rebuild from nothing; whatever is not stored again is deleted at the end
+            stale = self._canonical_ids()
+            previous_files, self.manifest.files, self.manifest.clusters = self.manifest.files, {}, {}
+            if self.lsh is not None:
+                self.lsh = LSHIndex(self.lsh.num_perm, self.lsh.bands, self.lsh.threshold)
+            self._index_state()
+
+        def jobs() -> Iterator[_Job]:
+            for path, source, stat in self._scan(root, full, report):
+                stats[source] = stat
+                yield (str(path), source, self.settings.chunk_size, self.settings.chunk_overlap,
+                       num_perm, self.settings.shingle_size)
+
+        for source, file_hash, chunks, error in self._parsed(jobs(), workers):
+            stat = stats.pop(source)
+            if error:
+                # Keep serving the previous version of the file
+                logger.warning(f"Skipping {source}: {error}")
+                report.files_failed += 1
+                if source in previous_files:
+                    self._entries[source] = previous_files[source]
+                    self._sources.update((cid, source) for cid in previous_files[source]["chunks"])
+                continue
+            self._add_file(source, file_hash, chunks, stat, report)
+            if len(self._upserts) >= self.settings.flush_size:
+                self._flush()
+
+        if full:
+            report.files_removed = sum(1 for source in previous_files if source not in self._seen)
+            self._deletes.extend(stale - self._canonical_ids())
+            report.chunks_removed = len(self._deletes)
+        else:
+            for source in [s for s in self.manifest.files if s not in self._seen]:
+                entry = self.manifest.files[source]
+                for identifier in entry["chunks"]:
+                    self._detach(identifier)
+                self._removed.append(source)
+                report.files_removed += 1
+                report.chunks_removed += len(entry["chunks"])
+        self._flush()
+
+        self.manifest.source_root = source_root
+        self.manifest.save()
+        if self.lsh is not None:
+            self.lsh.save(self.manifest.signatures_path)
+
+        report.chunks_total = len(self._sources)
+        report.duplicate_chunks_total = len(self._canonical_of)
+        report.seconds = round(time.perf_counter() - started, 3)
+        return report
+
+    def _add_file(self, source: str, file_hash: str, chunks: List[Tuple[str, str, Optional[np.ndarray]]],
+                  stat: os.stat_result, report: IngestReport) -> None:
+        previous = self.manifest.files.get(source) or {"hash": None, "chunks": []}
+        ids = OrderedDict((chunk_id(source, chunk_hash), (text, signature)) for chunk_hash, text, signature in chunks)
+        entry = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": file_hash, "chunks": list(ids)}
+
+        if previous["hash"] == file_hash:
+            # Touched but not modified: nothing to embed
+            report.files_unchanged += 1
+            report.chunks_kept += len(ids)
+            self.manifest.files[source] = entry
+            return
+
+        # Drop first, so an edited chunk does not cluster with the version it replaces
+        removed = [identifier for identifier in previous["chunks"] if identifier not in ids]
+        for identifier in removed:
+            self._detach(identifier)
+
+        old = set(previous["chunks"])
+        for identifier, (text, signature) in ids.items():
+            if identifier in old:
+                report.chunks_kept += 1
+                continue
+            self._sources[identifier] = source
+            report.chunks_added += 1
+            canonical = self.lsh.query(signature) if self.lsh is not None else None
+            if canonical is not None:
+                self._attach(identifier, source, canonical)
+                report.chunks_deduplicated += 1
+                report.chars_deduplicated += len(text)
+                continue
+            if self.lsh is not None:
+                self.lsh.add(identifier, signature)
+            self._upserts[identifier] = (text, source)
+
+        self._entries[source] = entry
+        report.files_updated += 1
+        report.chunks_removed += len(removed)
+
+    def _attach(self, member: str, source: str, canonical: str) -> None:
+        cluster = self.manifest.clusters.get(canonical)
+        if cluster is None:
+            cluster = self.manifest.clusters[canonical] = {canonical: self._sources.get(canonical, "")}
+        cluster[member] = source
+        self._canonical_of[member] = canonical
+        self._dirty.add(canonical)
+
+    def _detach(self, member: str) -> None:
+        """Forget a chunk; its canonical copy goes once nothing refers to it"""
+        self._sources.pop(member, None)
+        canonical = self._canonical_of.pop(member, member)
+        cluster = self.manifest.clusters.get(canonical)
+        if cluster is not None:
+            cluster.pop(member, None)
+            if cluster and set(cluster) != {canonical}:
+                self._dirty.add(canonical)
+                return
+            del self.manifest.clusters[canonical]
+            if cluster:
+                # Only the canonical chunk itself is left
+                self._dirty.add(canonical)
+                return
+        if self.lsh is not None:
+            self.lsh.remove(canonical)
+        self._upserts.pop(canonical, None)
+        self._deletes.append(canonical)
+
+    def _metadata(self, canonical: str, source: str) -> Dict[str, Any]:
+        cluster = self.manifest.clusters.get(canonical)
+        if not cluster:
+            # Every key is always sent: updates merge, and a dissolved cluster must not keep its old values
+            return {"source": source, "duplicates": 0, "duplicate_sources": ""}
+        sources = list(dict.fromkeys(cluster.values()))
+        return {
+            "source": sources[0],
+            "duplicates": len(cluster) - 1,
+            "duplicate_sources": ",".join(sources[1:MAX_METADATA_SOURCES + 1])
+        }
+
+    def _flush(self) -> None:
+        """Embed and upsert the buffered chunks, then apply deletions and commit the manifest entries"""
+        if self._upserts:
+            ids = list(self._upserts)
+            texts = [text for text, _ in self._upserts.values()]
+            metadatas = [self._metadata(cid, source) for cid, (_, source) in self._upserts.items()]
+            embeddings = self.embedder.embed_texts(texts)
+            self.client.upsert(ids, texts, embeddings.tolist(), metadatas)
+        deleted = set(self._deletes)
+        # Canonical chunks whose set of sources changed but whose text did not
+        dirty = [cid for cid in self._dirty if cid not in self._upserts and cid not in deleted]
+        if dirty:
+            self.client.update_metadata(dirty, [self._metadata(cid, self._sources.get(cid, "")) for cid in dirty])
+        if self._deletes:
+            self.client.delete(self._deletes)
+        self.manifest.files.update(self._entries)
+        for source in self._removed:
+            self.manifest.files.pop(source, None)
+        self._upserts, self._deletes, self._dirty = {}, [], set()
+        self._entries, self._removed = {}, []
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Index a directory of documents into Chroma")
+    parser.add_argument("--source", help="directory to ingest (default: ingestion.source_directory)")
+    parser.add_argument("--workers", type=int, help="parser processes (default: ingestion.workers)")
+    parser.add_argument("--full", action="store_true", help="ignore the manifest; re-embed and re-cluster everything")
+    args = parser.parse_args()
+
+    report = Ingestor().run(args.source, full=args.full, workers=args.workers)
+    print(json.dumps(report.as_dict(), indent=2))
+    if report.duplicate_chunks_total:
+        share = report.duplicate_chunks_total / report.chunks_total
+        print(f"{report.duplicate_chunks_total} of {report.chunks_total} chunks ({share:.1%}) are near-duplicates "
+              f"stored once; {report.chars_deduplicated} characters were not embedded again in this run")
+    return 1 if report.files_failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
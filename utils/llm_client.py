@@ -0,0 +1,386 @@
+"""Shared async client for OpenAI-compatible chat-completion providers"""
+
+import asyncio
+import importlib.util
+import json
+import os
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple
+
+import httpx
+
+from ..config_service import get_config
+from ..exception import LLMException
+from .circuit_breaker import CircuitBreaker
+from .metrics import registry
+from .tracing import tracer
+
+LLM_REQUESTS = registry.counter(
+    "intellisupport_llm_requests_total", "LLM requests by model and outcome", labels=("model", "outcome")
+)
+
+# Client errors that say nothing about the provider's health
+_NEUTRAL_STATUS_CODES = frozenset(range(400, 500)) - {408, 429}
+
+
+class LatencyTracker:
+    """Rolling window of request latencies for one model.
+
+    A primary request cancelled because its hedge won is recorded with the
+    time it had run so far, so the slow tail stays in the window.
+    """
+
+    def __init__(self, window: int = 200):
+        self.samples: Deque[float] = deque(maxlen=window)
+
+    def observe(self, seconds: float) -> None:
+        self.samples.append(seconds)
+
+    def percentile(self, p: float) -> Optional[float]:
+        if not self.samples:
+            return None
+        ordered = sorted(self.samples)
+        return ordered[min(len(ordered) - 1, int(p * len(ordered)))]
+
+
+class LLMClient:
+    """Keep-alive connection pools per provider, with hedged requests.
+
+    Models are addressed as ``<provider>/<model>`` (e.g.
+    ``groq/llama-3.1-70b-versatile``). When the primary model has not
+    answered within the configured latency percentile of its recent
+    requests, the same request is sent to the fallback model and whichever
+    answers first wins; the other request is cancelled. Hedges draw on a
+    budget (``hedge_budget_ratio``), so a degrading primary cannot double
+    the load on the providers. A model whose
+    circuit breaker is open is skipped without waiting for it to time out.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, httpx.AsyncClient] = {}
+        self._latency: Dict[str, LatencyTracker] = {}
+        # Whole-stream durations; kept apart so they do not inflate the hedge delay
+        self._stream_latency: Dict[str, LatencyTracker] = {}
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._http2 = importlib.util.find_spec("h2") is not None
+        # Token bucket bounding the share of requests that are hedged
+        self._hedge_tokens = 0.0
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "hedges_throttled": 0, "fallbacks": 0,
+                      "rerouted": 0, "errors": 0}
+
+    @staticmethod
+    def split_model(model: str) -> Tuple[str, str]:
+        provider, _, name = model.partition("/")
+        return provider, name
+
+    def available(self, model: str) -> bool:
+        """True if the provider is configured and its API key (if any) is set"""
+        provider, _ = self.split_model(model)
+        settings = get_config().llm.providers.get(provider)
+        if settings is None:
+            return False
+        key_env = settings.get("api_key_env")
+        return not key_env or bool(os.getenv(key_env))
+
+    def _client(self, provider: str) -> httpx.AsyncClient:
+        client = self._clients.get(provider)
+        if client is not None:
+            return client
+
+        config = get_config().llm
+        settings = config.providers.get(provider)
+        if settings is None:
+            raise LLMException(f"Unknown LLM provider '{provider}'")
+
+        headers = {}
+        key_env = settings.get("api_key_env")
+        if key_env and os.getenv(key_env):
+            headers["Authorization"] = f"Bearer {os.getenv(key_env)}"
+
+        client = httpx.AsyncClient(
+            base_url=settings["base_url"],
+            headers=headers,
+            http2=self._http2,
+            timeout=httpx.Timeout(config.timeout_seconds),
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections
+            )
+        )
+        self._clients[provider] = client
+        return client
+
+    def _tracker(self, model: str, stream: bool = False) -> LatencyTracker:
+        trackers = self._stream_latency if stream else self._latency
+        tracker = trackers.get(model)
+        if tracker is None:
+            tracker = trackers[model] = LatencyTracker(get_config().llm.latency_window)
+        return tracker
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        breaker = self._breakers.get(model)
+        if breaker is None:
+            config = get_config().circuit_breaker
+            breaker = self._breakers[model] = CircuitBreaker(
+                model,
+                window=config.window,
+                min_calls=config.min_calls,
+                failure_rate_threshold=config.failure_rate_threshold,
+                slow_call_seconds=config.slow_call_seconds,
+                slow_call_rate_threshold=config.slow_call_rate_threshold,
+                open_seconds=config.open_seconds,
+                half_open_probes=config.half_open_probes
+            )
+        return breaker
+
+    def _admit(self, model: str) -> bool:
+        """Take a breaker permit for ``model``; always granted when breakers are off"""
+        return not get_config().circuit_breaker.enabled or self.breaker(model).allow_request()
+
+    def _record(self, model: str, error: Optional[Exception] = None, latency: float = 0.0) -> None:
+        if not get_config().circuit_breaker.enabled:
+            return
+        breaker = self.breaker(model)
+        if error is None:
+            breaker.record_success(latency)
+        elif isinstance(error, httpx.HTTPStatusError) and error.response.status_code in _NEUTRAL_STATUS_CODES:
+            # A bad request is our fault, not the provider's
+            breaker.release()
+        else:
+            breaker.record_failure()
+
+    def _release(self, model: str) -> None:
+        if get_config().circuit_breaker.enabled:
+            self.breaker(model).release()
+
+    def _payload(self, model: str, messages: List[Dict[str, str]], stream: bool, **params: Any) -> Dict[str, Any]:
+        config = get_config().llm
+        return {
+            "model": self.split_model(model)[1],
+            "messages": messages,
+            "max_tokens": params.get("max_tokens", config.max_tokens),
+            "temperature": params.get("temperature", config.temperature),
+            "top_p": params.get("top_p", config.top_p),
+            "stream": stream
+        }
+
+    async def _complete_once(self, model: str, messages: List[Dict[str, str]], **params: Any) -> Dict[str, Any]:
+        """One request; the caller must already hold a breaker permit"""
+        provider, _ = self.split_model(model)
+        started = time.perf_counter()
+        try:
+            with tracer.span("llm.request", model=model):
+                response = await self._client(provider).post(
+                    "/chat/completions",
+                    json=self._payload(model, messages, stream=False, **params)
+                )
+                response.raise_for_status()
+                body = response.json()
+                content = body["choices"][0]["message"]["content"]
+        except asyncio.CancelledError:
+            self._release(model)
+            LLM_REQUESTS.labels(model=model, outcome="cancelled").inc()
+            raise
+        except Exception as e:
+            self.stats["errors"] += 1
+            self._record(model, error=e)
+            LLM_REQUESTS.labels(model=model, outcome="error").inc()
+            raise LLMException(f"{model} request failed: {e}") from e
+
+        latency = time.perf_counter() - started
+        self._tracker(model).observe(latency)
+        self._record(model, latency=latency)
+        LLM_REQUESTS.labels(model=model, outcome="ok").inc()
+        return {
+            "content": content,
+            "model": model,
+            "latency_ms": round(latency * 1000, 2),
+            "usage": body.get("usage", {})
+        }
+
+    def hedge_delay(self, model: str) -> Optional[float]:
+        """Seconds to wait before hedging, or None while there is too little data"""
+        config = get_config().llm
+        tracker = self._tracker(model)
+        if not config.hedge_enabled or len(tracker.samples) < config.hedge_min_samples:
+            return None
+        return max(tracker.percentile(config.hedge_percentile), config.hedge_min_delay_ms / 1000)
+
+    async def complete(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                       fallback_model: Optional[str] = None, **params: Any) -> Dict[str, Any]:
+        config = get_config().llm
+        primary = model or config.primary_model
+        fallback = fallback_model or config.fallback_model
+        self.stats["requests"] += 1
+
+        has_fallback = bool(fallback) and fallback != primary and self.available(fallback)
+
+        if not self._admit(primary):
+            # Primary's breaker is open: route straight to the fallback
+            if has_fallback and self._admit(fallback):
+                self.stats["rerouted"] += 1
+                result = await self._complete_once(fallback, messages, **params)
+                return {**result, "hedged": False}
+            raise LLMException(f"No healthy model available: circuit open for {primary}")
+
+        if not has_fallback:
+            result = await self._complete_once(primary, messages, **params)
+            return {**result, "hedged": False}
+
+        self._hedge_tokens = min(self._hedge_tokens + config.hedge_budget_ratio, config.hedge_budget_burst)
+        started = time.perf_counter()
+        primary_task = asyncio.ensure_future(self._complete_once(primary, messages, **params))
+        fallback_task: Optional[asyncio.Future] = None
+        try:
+            done, _ = await asyncio.wait({primary_task}, timeout=self.hedge_delay(primary))
+            if done:
+                if primary_task.exception() is None:
+                    return {**primary_task.result(), "hedged": False}
+                # Primary failed outright: go straight to the fallback
+                if not self._admit(fallback):
+                    raise primary_task.exception()
+                self.stats["fallbacks"] += 1
+                result = await self._complete_once(fallback, messages, **params)
+                return {**result, "hedged": False}
+
+            if self._hedge_tokens < 1:
+                self.stats["hedges_throttled"] += 1
+                return {**await primary_task, "hedged": False}
+            if not self._admit(fallback):
+                return {**await primary_task, "hedged": False}
+
+            # Primary is slower than usual: race it against the fallback
+            self._hedge_tokens -= 1
+            self.stats["hedged"] += 1
+            fallback_task = asyncio.ensure_future(self._complete_once(fallback, messages, **params))
+            pending = {primary_task, fallback_task}
+            error: Optional[BaseException] = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is fallback_task:
+                            self.stats["hedge_wins"] += 1
+                            if not primary_task.done():
+                                # At least this slow; leaving it out would shrink the hedge delay
+                                self._tracker(primary).observe(time.perf_counter() - started)
+                        return {**task.result(), "hedged": True}
+                    error = task.exception()
+            raise LLMException(f"Primary and fallback models both failed: {error}")
+        finally:
+            # Also reached when the caller is cancelled, which asyncio.wait does not pass on
+            for task in (primary_task, fallback_task):
+                if task is not None and not task.done():
+                    task.cancel()
+
+    async def stream(self, messages: List[Dict[str, str]], model: Optional[str] = None,
+                     fallback_model: Optional[str] = None, **params: Any) -> AsyncIterator[str]:
+        """Yield content deltas; falls back only if nothing was streamed yet"""
+        config = get_config().llm
+        candidates = [model or config.primary_model]
+        fallback = fallback_model or config.fallback_model
+        if fallback and fallback not in candidates and self.available(fallback):
+            candidates.append(fallback)
+        self.stats["requests"] += 1
+
+        error: Optional[Exception] = None
+        for attempt, candidate in enumerate(candidates):
+            if not self._admit(candidate):
+                error = LLMException(f"circuit open for {candidate}")
+                continue
+            if attempt:
+                self.stats["fallbacks"] += 1
+            streamed = False
+            try:
+                async for token in self._stream_once(candidate, messages, **params):
+                    streamed = True
+                    yield token
+                return
+            except LLMException as e:
+                if streamed:
+                    raise
+                error = e
+        raise LLMException(f"All models failed to stream: {error}")
+
+    async def _stream_once(self, model: str, messages: List[Dict[str, str]], **params: Any) -> AsyncIterator[str]:
+        """Stream one request; the caller must already hold a breaker permit"""
+        provider, _ = self.split_model(model)
+        started = time.perf_counter()
+        ttft: Optional[float] = None
+        recorded = False
+        span = tracer.start_span("llm.stream", model=model)
+        error: Optional[BaseException] = None
+        try:
+            async with self._client(provider).stream(
+                "POST",
+                "/chat/completions",
+                json=self._payload(model, messages, stream=True, **params)
+            ) as response:
+                response.raise_for_status()
+                async for line in response.aiter_lines():
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+                    delta = json.loads(data)["choices"][0].get("delta", {}).get("content")
+                    if delta:
+                        if ttft is None:
+                            ttft = time.perf_counter() - started
+                            span.set_attribute("ttft_ms", round(ttft * 1000, 2))
+                        yield delta
+        except (asyncio.CancelledError, GeneratorExit) as e:
+            error = e
+            raise
+        except Exception as e:
+            error = e
+            self.stats["errors"] += 1
+            # A stream that breaks after its first token is still a failed request
+            recorded = True
+            self._record(model, error=e)
+            raise LLMException(f"{model} stream failed: {e}") from e
+        else:
+            # Judged once complete, by time to first token (or to the end, if nothing was streamed)
+            recorded = True
+            self._record(model, latency=ttft if ttft is not None else time.perf_counter() - started)
+        finally:
+            if not recorded:
+                self._release(model)
+            tracer.end_span(span, error)
+            if error is None:
+                outcome = "ok"
+            else:
+                outcome = "cancelled" if isinstance(error, (asyncio.CancelledError, GeneratorExit)) else "error"
+            LLM_REQUESTS.labels(model=model, outcome=outcome).inc()
+        self._tracker(model, stream=True).observe(time.perf_counter() - started)
+
+    def get_stats(self) -> Dict[str, Any]:
+        config = get_config().llm
+        return {
+            **self.stats,
+            "http2": self._http2,
+            "circuit_breakers": self.breaker_states(),
+            "latency_p50_ms": {
+                model: round((tracker.percentile(0.5) or 0) * 1000, 2) for model, tracker in self._latency.items()
+            },
+            "latency_hedge_ms": {
+                model: round((tracker.percentile(config.hedge_percentile) or 0) * 1000, 2)
+                for model, tracker in self._latency.items()
+            },
+            "stream_duration_p50_ms": {
+                model: round((tracker.percentile(0.5) or 0) * 1000, 2)
+                for model, tracker in self._stream_latency.items()
+            }
+        }
+
+    def breaker_states(self) -> Dict[str, Dict[str, Any]]:
+        """Breaker state for the configured models and any model used so far"""
+        config = get_config().llm
+        models = dict.fromkeys([config.primary_model, config.fallback_model, *self._breakers])
+        return {model: self.breaker(model).get_state() for model in models if model}
+
+    async def aclose(self) -> None:
+        for client in self._clients.values():
+            await client.aclose()
+        self._clients.clear()
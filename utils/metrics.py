@@ -0,0 +1,165 @@
+"""Minimal in-process metric types and a Prometheus text exporter"""
+
+import bisect
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Histogram:
+    """Fixed-bucket histogram with cumulative counts, Prometheus style"""
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = []
+        running = 0
+        for upper, count in zip(list(self.buckets) + [float("inf")], self.counts):
+            running += count
+            cumulative.append(("+Inf" if upper == float("inf") else upper, running))
+        return {
+            "buckets": dict(cumulative),
+            "sum": round(self.sum, 6),
+            "count": self.count
+        }
+
+
+class Counter:
+    """Monotonically increasing value"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.value += amount
+
+
+class Gauge:
+    """Value that can go up and down"""
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+def _escape(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[Any], extra: str = "") -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+class MetricFamily:
+    """One named metric with a child per combination of label values"""
+
+    def __init__(self, name: str, help_text: str, kind: str, label_names: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.kind = kind
+        self.label_names = tuple(label_names)
+        self.buckets = tuple(buckets)
+        self._children: Dict[Tuple[str, ...], Any] = {}
+        self._lock = threading.Lock()
+
+    def labels(self, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.label_names)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.get(key)
+                if child is None:
+                    child = self._children[key] = self._new_child()
+        return child
+
+    def _new_child(self):
+        if self.kind == "histogram":
+            return Histogram(self.buckets)
+        return Counter() if self.kind == "counter" else Gauge()
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in list(self._children.items()):
+            if self.kind != "histogram":
+                lines.append(f"{self.name}{_labels(self.label_names, key)} {_number(child.value)}")
+                continue
+            running = 0
+            for upper, count in zip(list(child.buckets) + [float("inf")], child.counts):
+                running += count
+                le = f'le="{_number(upper)}"'
+                lines.append(f"{self.name}_bucket{_labels(self.label_names, key, le)} {running}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {_number(child.sum)}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {child.count}")
+        return lines
+
+
+# A collector returns (name, kind, help, [(labels, value), ...]) tuples at scrape time
+Collector = Callable[[], Iterable[Tuple[str, str, str, List[Tuple[Dict[str, Any], float]]]]]
+
+
+class MetricsRegistry:
+    """Holds metric families and renders them in Prometheus text format"""
+
+    def __init__(self):
+        self._families: Dict[str, MetricFamily] = {}
+        self._collectors: Dict[str, Collector] = {}
+        self._lock = threading.Lock()
+
+    def _family(self, name: str, help_text: str, kind: str, labels: Sequence[str],
+                buckets: Sequence[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        with self._lock:
+            family = self._families.get(name)
+            if family is None:
+                family = self._families[name] = MetricFamily(name, help_text, kind, labels, buckets)
+            return family
+
+    def counter(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._family(name, help_text, "counter", labels)
+
+    def gauge(self, name: str, help_text: str, labels: Sequence[str] = ()) -> MetricFamily:
+        return self._family(name, help_text, "gauge", labels)
+
+    def histogram(self, name: str, help_text: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> MetricFamily:
+        return self._family(name, help_text, "histogram", labels, buckets)
+
+    def register_collector(self, name: str, collector: Collector) -> None:
+        """Add (or replace) a callback that reports values computed at scrape time"""
+        self._collectors[name] = collector
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in list(self._families.values()):
+            lines.extend(family.render())
+        for collector in list(self._collectors.values()):
+            for name, kind, help_text, samples in collector():
+                lines.append(f"# HELP {name} {help_text}")
+                lines.append(f"# TYPE {name} {kind}")
+                for labels, value in samples:
+                    lines.append(f"{name}{_labels(list(labels), list(labels.values()))} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
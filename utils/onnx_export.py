@@ -0,0 +1,77 @@
+"""Export a sentence-transformers model for the ONNX embedding backend
+
+    python -m intellisupport.utils.onnx_export \\
+        --model sentence-transformers/all-MiniLM-L6-v2 --output models/all-MiniLM-L6-v2-onnx
+
+Writes ``model.onnx`` (float32), ``model.int8.onnx`` (dynamically quantised
+weights, unless ``--no-quantize``) and the fast tokenizer's
+``tokenizer.json``. Needs torch and transformers, which sentence-transformers
+already installs; serving the export needs only onnxruntime and tokenizers.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+
+from ..exception import EmbeddingException
+
+
+def export(model_name: str, output: str, quantize: bool = True, opset: int = 14) -> Path:
+    try:
+        import torch
+        from transformers import AutoModel, AutoTokenizer
+    except ImportError as e:
+        raise EmbeddingException(f"Exporting needs torch and transformers: {e}") from e
+
+    directory = Path(output)
+    directory.mkdir(parents=True, exist_ok=True)
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name, use_fast=True)
+    tokenizer.save_pretrained(str(directory))
+    if not (directory / "tokenizer.json").exists():
+        raise EmbeddingException(f"{model_name} has no fast tokenizer; the ONNX backend needs tokenizer.json")
+
+    model = AutoModel.from_pretrained(model_name)
+    model.config.return_dict = False
+    model.eval()
+
+    sample = tokenizer(["An example sentence", "Another, somewhat longer example sentence"],
+                       padding=True, return_tensors="pt")
+    input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+    dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+    dynamic_axes["last_hidden_state"] = {0: "batch", 1: "sequence"}
+
+    model_path = directory / "model.onnx"
+    with torch.no_grad():
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            str(model_path),
+            input_names=input_names,
+            output_names=["last_hidden_state"],
+            dynamic_axes=dynamic_axes,
+            opset_version=opset,
+            do_constant_folding=True
+        )
+
+    if quantize:
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        quantize_dynamic(str(model_path), str(directory / "model.int8.onnx"), weight_type=QuantType.QInt8)
+    return directory
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Export an embedding model to ONNX")
+    parser.add_argument("--model", default="sentence-transformers/all-MiniLM-L6-v2")
+    parser.add_argument("--output", default="models/all-MiniLM-L6-v2-onnx")
+    parser.add_argument("--no-quantize", action="store_true", help="skip the int8 model")
+    parser.add_argument("--opset", type=int, default=14)
+    args = parser.parse_args()
+
+    directory = export(args.model, args.output, quantize=not args.no_quantize, opset=args.opset)
+    print(f"Exported {args.model} to {directory}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""Token-budgeted prompt assembly"""
+
+from functools import lru_cache
+from typing import Any, Dict, List, Mapping, Sequence
+
+# Rough chat-format overhead per message (role markers, separators)
+MESSAGE_OVERHEAD_TOKENS = 4
+# Snippets are listed as "- <text>" separated by blank lines
+DOCUMENTS_HEADER = "\n\nRelevant documentation:\n"
+SNIPPET_OVERHEAD_TOKENS = 2
+# Below this many tokens a truncated snippet is not worth including
+MIN_SNIPPET_TOKENS = 32
+
+
+class TokenCounter:
+    """Counts tokens with tiktoken, caching the result per distinct text"""
+
+    def __init__(self, encoding_name: str = "cl100k_base", cache_size: int = 65536):
+        try:
+            import tiktoken
+            self._encoding = tiktoken.get_encoding(encoding_name)
+        except Exception:
+            # tiktoken missing or its encoding file unavailable offline
+            self._encoding = None
+        self.count = lru_cache(maxsize=cache_size)(self.measure)
+
+    def measure(self, text: str) -> int:
+        """Uncached count, for text that is not going to be seen again"""
+        if not text:
+            return 0
+        if self._encoding is None:
+            return max(1, len(text) // 4)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens * 4]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        return self._encoding.decode(tokens[:max_tokens])
+
+
+class AssembledPrompt:
+    """Chat messages that fit the budget, plus how they were fitted"""
+
+    __slots__ = ("messages", "prompt_tokens", "tokens_saved", "documents_used", "documents_dropped",
+                 "history_used", "history_dropped", "query_tokens_dropped")
+
+    def __init__(self, messages: List[Dict[str, str]], prompt_tokens: int, tokens_saved: int,
+                 documents_used: int, documents_dropped: int, history_used: int, history_dropped: int,
+                 query_tokens_dropped: int = 0):
+        self.messages = messages
+        self.prompt_tokens = prompt_tokens
+        self.tokens_saved = tokens_saved
+        self.documents_used = documents_used
+        self.documents_dropped = documents_dropped
+        self.history_used = history_used
+        self.history_dropped = history_dropped
+        self.query_tokens_dropped = query_tokens_dropped
+
+    def summary(self) -> Dict[str, int]:
+        return {name: getattr(self, name) for name in self.__slots__ if name != "messages"}
+
+
+class PromptAssembler:
+    """Fits system prompt, retrieved snippets and history into a context budget.
+
+    Priority, highest first: the system prompt and the user query are always
+    kept (a query that alone overflows the budget is cut to fit); then
+    retrieved documents in rank order (the last one that does not fit is
+    truncated); then conversation history, newest turn first.
+    """
+
+    def __init__(self, static_prompts: Sequence[str] = (), encoding_name: str = "cl100k_base"):
+        self.counter = TokenCounter(encoding_name)
+        # Static prompts never change, so count them once up front
+        for prompt in static_prompts:
+            self.counter.count(prompt)
+
+    def _message_tokens(self, text: str) -> int:
+        return self.counter.count(text) + MESSAGE_OVERHEAD_TOKENS
+
+    def assemble(self, system_prompt: str, query: str, documents: Sequence[str] = (),
+                 history: Sequence[Dict[str, Any]] = (), budget: int = 8192) -> AssembledPrompt:
+        doc_tokens = [self.counter.count(doc) + SNIPPET_OVERHEAD_TOKENS for doc in documents]
+        history_tokens = [self._message_tokens(turn.get("content", "")) for turn in history]
+        query_tokens = self.counter.count(query)
+        system_tokens = self._message_tokens(system_prompt)
+        header_tokens = self.counter.count(DOCUMENTS_HEADER) if documents else 0
+        requested = (system_tokens + query_tokens + MESSAGE_OVERHEAD_TOKENS + header_tokens
+                     + sum(doc_tokens) + sum(history_tokens))
+
+        query_budget = max(0, budget - system_tokens - MESSAGE_OVERHEAD_TOKENS)
+        query_tokens_dropped = max(0, query_tokens - query_budget)
+        if query_tokens_dropped:
+            query = self.counter.truncate(query, query_budget)
+            query_tokens = self.counter.measure(query)
+
+        remaining = query_budget - query_tokens - header_tokens
+        kept_docs: List[str] = []
+        for doc, tokens in zip(documents, doc_tokens):
+            if tokens <= remaining:
+                kept_docs.append(doc)
+                remaining -= tokens
+                continue
+            if remaining - SNIPPET_OVERHEAD_TOKENS >= MIN_SNIPPET_TOKENS:
+                kept_docs.append(self.counter.truncate(doc, remaining - SNIPPET_OVERHEAD_TOKENS))
+                remaining = 0
+            break
+        if not kept_docs:
+            remaining += header_tokens
+
+        kept_history: List[Dict[str, Any]] = []
+        for turn, tokens in zip(reversed(history), reversed(history_tokens)):
+            if tokens > remaining:
+                break
+            kept_history.append(turn)
+            remaining -= tokens
+        kept_history.reverse()
+
+        system = system_prompt
+        if kept_docs:
+            system += DOCUMENTS_HEADER + "\n\n".join(f"- {doc}" for doc in kept_docs)
+
+        messages = [{"role": "system", "content": system}]
+        messages.extend({"role": turn.get("role", "user"), "content": turn.get("content", "")} for turn in kept_history)
+        messages.append({"role": "user", "content": query})
+
+        # Measured on what is sent; the assembled system message is unique per
+        # request, so it is counted without going through the cache
+        used = (self.counter.measure(system) + query_tokens + MESSAGE_OVERHEAD_TOKENS * 2
+                + sum(tokens for tokens in history_tokens[len(history) - len(kept_history):]))
+        # Savings compare like with like: the per-part estimates the fitting used
+        fitted = system_tokens + MESSAGE_OVERHEAD_TOKENS + query_budget - remaining
+        return AssembledPrompt(
+            messages=messages,
+            prompt_tokens=used,
+            tokens_saved=max(0, requested - fitted),
+            documents_used=len(kept_docs),
+            documents_dropped=len(documents) - len(kept_docs),
+            history_used=len(kept_history),
+            history_dropped=len(history) - len(kept_history),
+            query_tokens_dropped=query_tokens_dropped
+        )
+
+
+def context_budget(model: str, budgets: Mapping[str, int], default_budget: int, reserved_for_completion: int) -> int:
+    """Tokens available for the prompt once the completion is reserved"""
+    return max(0, budgets.get(model, default_budget) - reserved_for_completion)
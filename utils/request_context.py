@@ -0,0 +1,81 @@
+"""Per-request pipeline state"""
+
+import asyncio
+import uuid
+from typing import Any, Dict, List, Optional
+
+
+# Working data that is not useful (or too large) to return as metadata
+_INTERNAL_SLOTS = ("event_queue", "query_embedding", "use_cache", "prompt", "cache_checked")
+# Caller-supplied context that is echoed back otherwise; history can be long
+_INTERNAL_CONTEXT_KEYS = ("history",)
+
+
+def public_context(context: Dict[str, Any]) -> Dict[str, Any]:
+    """The caller-supplied context as returned in metadata"""
+    return {key: value for key, value in context.items() if key not in _INTERNAL_CONTEXT_KEYS}
+
+
+class RequestContext:
+    """Everything one pipeline run reads and writes.
+
+    A fresh context is created per request and handed to every stage, so a
+    single ManagerAgent (and the agents it owns) can serve any number of
+    overlapping requests without sharing mutable state. ``__slots__`` keeps
+    the object small and catches typos in stage code.
+    """
+
+    __slots__ = (
+        "request_id",
+        "query",
+        "context",
+        "query_embedding",
+        "use_cache",
+        "cache_hit",
+        "cache_checked",
+        "intent",
+        "intent_confidence",
+        "sentiment",
+        "domain",
+        "domain_response",
+        "retrieved_docs",
+        "prompt",
+        "prompt_stats",
+        "response",
+        "safety",
+        "timings",
+        "event_queue"
+    )
+
+    def __init__(self, query: str, context: Optional[Dict[str, Any]] = None, request_id: Optional[str] = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self.query = query
+        self.context = context or {}
+        self.query_embedding: Optional[List[float]] = None
+        self.use_cache = True
+        self.cache_hit = False
+        # Set once the cache stage has decided, so retrieval can stop early on a hit
+        self.cache_checked = asyncio.Event()
+        self.intent: Optional[str] = None
+        self.intent_confidence: Optional[float] = None
+        self.sentiment: Optional[str] = None
+        self.domain: Optional[str] = None
+        self.domain_response: Optional[str] = None
+        self.retrieved_docs: List[str] = []
+        # Assembled chat messages and how they were fitted into the budget
+        self.prompt: Optional[List[Dict[str, str]]] = None
+        self.prompt_stats: Optional[Dict[str, int]] = None
+        self.response: Optional[str] = None
+        self.safety: Optional[Dict[str, Any]] = None
+        self.timings: Dict[str, float] = {}
+        # Set only for streaming runs; stages push progress events onto it
+        self.event_queue: Optional[asyncio.Queue] = None
+
+    def get(self, key: str, default: Any = None) -> Any:
+        """Dict-style read so agents written against plain dicts keep working"""
+        return getattr(self, key, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = {name: getattr(self, name) for name in self.__slots__ if name not in _INTERNAL_SLOTS}
+        result["context"] = public_context(self.context)
+        return result
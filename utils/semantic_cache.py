@@ -0,0 +1,198 @@
+"""Semantic response cache keyed on query embeddings"""
+
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+
+class CacheEntry:
+    """A previously answered query and the guards it was answered under"""
+
+    __slots__ = ("key", "row", "query", "response", "intent", "sentiment", "model", "plan", "created_at")
+
+    def __init__(self, key: str, row: int, query: str, response: str, intent: Optional[str],
+                 sentiment: Optional[str], model: Optional[str] = None, plan: Optional[str] = None):
+        self.key = key
+        self.row = row
+        self.query = query
+        self.response = response
+        self.intent = intent
+        self.sentiment = sentiment
+        self.model = model
+        self.plan = plan
+        self.created_at = time.monotonic()
+
+
+class SemanticCache:
+    """Returns a stored response when a new query is close enough to an old one.
+
+    Vectors live in one preallocated matrix, so a lookup is a single
+    matrix-vector product over the occupied rows. Entries are evicted in
+    LRU order once ``max_entries`` is reached and expire after
+    ``ttl_seconds``; expired rows are dropped before scoring, so a stale
+    best match never hides a live one behind it. A hit also requires the new query's intent, sentiment,
+    model and plan to match the cached entry's exactly (``None`` only
+    matches ``None``); rows that fail those guards are masked out before
+    picking the best match, so an ineligible near-twin never hides an
+    eligible entry just below it.
+    """
+
+    GUARDS = ("intent", "sentiment", "model", "plan")
+
+    def __init__(self, similarity_threshold: float = 0.92, max_entries: int = 5000, ttl_seconds: float = 3600):
+        self.similarity_threshold = similarity_threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._entries: "OrderedDict[str, CacheEntry]" = OrderedDict()
+        self._vectors: Optional[np.ndarray] = None
+        self._occupied = np.zeros(max_entries, dtype=bool)
+        self._row_keys: List[Optional[str]] = [None] * max_entries
+        self._free_rows: List[int] = list(range(max_entries - 1, -1, -1))
+        self._created = np.zeros(max_entries, dtype=np.float64)
+        # Per guard: an interned code per row, so eligibility is one vector comparison.
+        # A value's code is forgotten with the last entry that uses it.
+        self._guard_codes: Dict[str, Dict[Any, int]] = {guard: {} for guard in self.GUARDS}
+        self._guard_refs: Dict[str, Dict[Any, int]] = {guard: {} for guard in self.GUARDS}
+        self._guard_rows = {guard: np.full(max_entries, -1, dtype=np.int64) for guard in self.GUARDS}
+        self._next_code = 0
+
+        self.stats = {"hits": 0, "misses": 0, "guard_rejections": 0, "expired": 0, "evictions": 0, "bypassed": 0}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    @staticmethod
+    def _normalise(vector) -> np.ndarray:
+        vec = np.asarray(vector, dtype=np.float32).reshape(-1)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, vector, intent: Optional[str] = None, sentiment: Optional[str] = None,
+               model: Optional[str] = None, plan: Optional[str] = None,
+               threshold: Optional[float] = None) -> Optional[CacheEntry]:
+        self._expire()
+        if not self._entries or self._vectors is None:
+            self.stats["misses"] += 1
+            return None
+
+        query = self._normalise(vector)
+        if query.shape[0] != self._vectors.shape[1]:
+            self.stats["misses"] += 1
+            return None
+
+        threshold = threshold if threshold is not None else self.similarity_threshold
+        scores = self._vectors @ query
+        scores[~self._occupied] = -np.inf
+        eligible = self._occupied.copy()
+        for guard, value in zip(self.GUARDS, (intent, sentiment, model, plan)):
+            eligible &= self._guard_rows[guard] == self._guard_codes[guard].get(value, -2)
+
+        row = int(np.argmax(np.where(eligible, scores, -np.inf)))
+        entry = self._entry_for_row(row) if eligible[row] else None
+
+        if entry is None or scores[row] < threshold:
+            if float(scores.max()) >= threshold:
+                # Something was close enough, but only under other guards
+                self.stats["guard_rejections"] += 1
+            self.stats["misses"] += 1
+            return None
+
+        self._entries.move_to_end(entry.key)
+        self.stats["hits"] += 1
+        return entry
+
+    def put(self, vector, query: str, response: str, intent: Optional[str] = None,
+            sentiment: Optional[str] = None, model: Optional[str] = None,
+            plan: Optional[str] = None) -> CacheEntry:
+        vec = self._normalise(vector)
+        if self._vectors is None or self._vectors.shape[1] != vec.shape[0]:
+            self.clear()
+            self._vectors = np.zeros((self.max_entries, vec.shape[0]), dtype=np.float32)
+
+        if not self._free_rows:
+            self._expire()
+        if not self._free_rows:
+            oldest_key = next(iter(self._entries))
+            self._remove(oldest_key)
+            self.stats["evictions"] += 1
+
+        row = self._free_rows.pop()
+        entry = CacheEntry(uuid.uuid4().hex, row, query, response, intent, sentiment, model, plan)
+        self._vectors[row] = vec
+        self._occupied[row] = True
+        self._row_keys[row] = entry.key
+        self._created[row] = entry.created_at
+        for guard in self.GUARDS:
+            self._guard_rows[guard][row] = self._intern(guard, getattr(entry, guard))
+        self._entries[entry.key] = entry
+        return entry
+
+    def record_bypass(self) -> None:
+        self.stats["bypassed"] += 1
+
+    def invalidate_intent(self, intent: str) -> int:
+        """Drop every entry cached under ``intent``; returns how many were removed"""
+        keys = [key for key, entry in self._entries.items() if entry.intent == intent]
+        for key in keys:
+            self._remove(key)
+        return len(keys)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._occupied[:] = False
+        self._row_keys = [None] * self.max_entries
+        self._free_rows = list(range(self.max_entries - 1, -1, -1))
+        for guard in self.GUARDS:
+            self._guard_codes[guard].clear()
+            self._guard_refs[guard].clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        lookups = self.stats["hits"] + self.stats["misses"]
+        return {
+            **self.stats,
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hit_rate": round(self.stats["hits"] / lookups, 4) if lookups else 0.0
+        }
+
+    def _expire(self) -> None:
+        """Drop every entry older than the TTL"""
+        if not self._entries:
+            return
+        expired = np.flatnonzero(self._occupied & (self._created < time.monotonic() - self.ttl_seconds))
+        for row in expired:
+            self._remove(self._row_keys[row])
+        self.stats["expired"] += len(expired)
+
+    def _intern(self, guard: str, value: Any) -> int:
+        codes = self._guard_codes[guard]
+        if value not in codes:
+            codes[value] = self._next_code
+            self._next_code += 1
+        refs = self._guard_refs[guard]
+        refs[value] = refs.get(value, 0) + 1
+        return codes[value]
+
+    def _release(self, guard: str, value: Any) -> None:
+        refs = self._guard_refs[guard]
+        refs[value] -= 1
+        if not refs[value]:
+            del refs[value]
+            del self._guard_codes[guard][value]
+
+    def _entry_for_row(self, row: int) -> Optional[CacheEntry]:
+        key = self._row_keys[row]
+        return self._entries.get(key) if key is not None else None
+
+    def _remove(self, key: str) -> None:
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._occupied[entry.row] = False
+            self._row_keys[entry.row] = None
+            self._free_rows.append(entry.row)
+            for guard in self.GUARDS:
+                self._release(guard, getattr(entry, guard))
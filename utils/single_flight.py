@@ -0,0 +1,59 @@
+"""Coalescing of identical in-flight requests"""
+
+import asyncio
+import copy
+import re
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+# Context keys that can change the answer, so they have to match before two
+# requests are allowed to share one pipeline run
+COALESCE_CONTEXT_KEYS = ("model", "user_plan", "history", "debug")
+
+
+def coalesce_key(query: str, context: Optional[Dict[str, Any]] = None) -> Tuple[Hashable, ...]:
+    """Normalised query text plus the answer-relevant context"""
+    context = context or {}
+    normalised = re.sub(r"\s+", " ", query).strip().casefold()
+    return (normalised,) + tuple(str(context.get(key)) for key in COALESCE_CONTEXT_KEYS)
+
+
+class SingleFlight:
+    """Runs one call per key at a time and hands each waiter a copy of its result"""
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        self.stats = {"executions": 0, "collapsed": 0}
+
+    @property
+    def inflight(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        future = self._inflight.get(key)
+        if future is not None:
+            self.stats["collapsed"] += 1
+        else:
+            future = asyncio.ensure_future(func())
+            self._inflight[key] = future
+            self.stats["executions"] += 1
+            future.add_done_callback(lambda done: self._forget(key, done))
+
+        # Shielded so one caller disconnecting does not cancel the others
+        result = await asyncio.shield(future)
+        # A private copy, so no caller can change what the others receive
+        return copy.deepcopy(result)
+
+    def get_stats(self) -> Dict[str, Any]:
+        total = self.stats["executions"] + self.stats["collapsed"]
+        return {
+            **self.stats,
+            "inflight": self.inflight,
+            "collapse_ratio": round(self.stats["collapsed"] / total, 4) if total else 0.0
+        }
+
+    def _forget(self, key: Hashable, future: asyncio.Future) -> None:
+        if self._inflight.get(key) is future:
+            del self._inflight[key]
+        if not future.cancelled():
+            # Mark the exception retrieved; every waiter re-raises it anyway
+            future.exception()
@@ -0,0 +1,275 @@
+"""Lightweight tracing spans with an OTLP-compatible JSON file exporter
+
+A trace is started per request with ``tracer.trace()``; anything inside it
+can open child spans with ``tracer.span()``. The current span travels in a
+contextvar, so spans opened in concurrently running pipeline stages attach
+to the right parent. Outside a recorded trace ``span()`` only feeds the
+duration histogram, which keeps the disabled path to two clock reads.
+"""
+
+import json
+import os
+import queue
+import random
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional
+
+from ..config_service import get_config
+from .metrics import registry
+
+SPAN_DURATION = registry.histogram(
+    "intellisupport_span_duration_seconds", "Duration of instrumented operations", labels=("span",)
+)
+SPAN_ERRORS = registry.counter(
+    "intellisupport_span_errors_total", "Instrumented operations that raised", labels=("span",)
+)
+
+STATUS_UNSET = 0
+STATUS_OK = 1
+STATUS_ERROR = 2
+
+
+class Span:
+    """One timed operation and the spans opened inside it"""
+
+    __slots__ = ("name", "trace_id", "span_id", "parent_id", "start_unix_ns", "started_ns", "duration_ns",
+                 "attributes", "status", "status_message", "children")
+
+    def __init__(self, name: str, trace_id: str, parent_id: Optional[str] = None,
+                 attributes: Optional[Dict[str, Any]] = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent_id
+        self.start_unix_ns = time.time_ns()
+        self.started_ns = time.perf_counter_ns()
+        self.duration_ns = 0
+        self.attributes = dict(attributes or {})
+        self.status = STATUS_UNSET
+        self.status_message = ""
+        self.children: List["Span"] = []
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def to_tree(self) -> Dict[str, Any]:
+        """Nested, human-readable view for response metadata"""
+        tree = {
+            "name": self.name,
+            "duration_ms": round(self.duration_ns / 1e6, 3),
+            "status": "error" if self.status == STATUS_ERROR else "ok"
+        }
+        if self.attributes:
+            tree["attributes"] = self.attributes
+        if self.status_message:
+            tree["error"] = self.status_message
+        if self.children:
+            tree["children"] = [child.to_tree() for child in self.children]
+        return tree
+
+    def walk(self) -> Iterator["Span"]:
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("intellisupport_current_span", default=None)
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def _otlp_span(span: Span) -> Dict[str, Any]:
+    otlp = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": 1,  # SPAN_KIND_INTERNAL
+        "startTimeUnixNano": str(span.start_unix_ns),
+        "endTimeUnixNano": str(span.start_unix_ns + span.duration_ns),
+        "attributes": [{"key": k, "value": _otlp_value(v)} for k, v in span.attributes.items()],
+        "status": {"code": span.status, "message": span.status_message} if span.status_message
+        else {"code": span.status}
+    }
+    if span.parent_id:
+        otlp["parentSpanId"] = span.parent_id
+    return otlp
+
+
+class OTLPFileExporter:
+    """Appends finished traces as OTLP/JSON ``ExportTraceServiceRequest`` lines.
+
+    Writing happens on a background thread so the event loop never waits
+    on the disk; traces are dropped if the queue is full.
+    """
+
+    def __init__(self, path: str, service_name: str = "intellisupport", max_queue: int = 10000):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.service_name = service_name
+        self._queue: "queue.Queue[Optional[Span]]" = queue.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self._thread = threading.Thread(target=self._write_loop, name="trace-exporter", daemon=True)
+        self._thread.start()
+
+    def export(self, root: Span) -> None:
+        try:
+            self._queue.put_nowait(root)
+        except queue.Full:
+            self.dropped += 1
+
+    def _encode(self, root: Span) -> str:
+        return json.dumps({
+            "resourceSpans": [{
+                "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": self.service_name}}]},
+                "scopeSpans": [{
+                    "scope": {"name": "intellisupport.tracing"},
+                    "spans": [_otlp_span(span) for span in root.walk()]
+                }]
+            }]
+        }, default=str, separators=(",", ":"))
+
+    def _write_loop(self) -> None:
+        while True:
+            root = self._queue.get()
+            if root is None:
+                return
+            lines = [self._encode(root)]
+            # Drain whatever else is ready so bursts become one write
+            while True:
+                try:
+                    root = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if root is None:
+                    self._queue.put(None)
+                    break
+                lines.append(self._encode(root))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+
+    def close(self) -> None:
+        self._queue.put(None)
+        self._thread.join(timeout=5)
+
+
+class Tracer:
+    """Creates spans and hands finished traces to the exporter"""
+
+    def __init__(self):
+        self._exporter: Optional[OTLPFileExporter] = None
+        self._exporter_path: Optional[str] = None
+        self._lock = threading.Lock()
+
+    def _get_exporter(self) -> Optional[OTLPFileExporter]:
+        path = get_config().tracing.export_path
+        if path != self._exporter_path:
+            with self._lock:
+                if path != self._exporter_path:
+                    if self._exporter is not None:
+                        self._exporter.close()
+                    self._exporter = OTLPFileExporter(path) if path else None
+                    self._exporter_path = path
+        return self._exporter
+
+    @staticmethod
+    def current_span() -> Optional[Span]:
+        return _current_span.get()
+
+    @contextmanager
+    def trace(self, name: str, force: bool = False, **attributes: Any) -> Iterator[Optional[Span]]:
+        """Start a root span if tracing is enabled (and sampled) or ``force`` is set"""
+        config = get_config().tracing
+        record = force or (config.enabled and random.random() < config.sample_rate)
+        if not record:
+            with self.span(name):
+                yield None
+            return
+
+        root = Span(name, os.urandom(16).hex(), attributes=attributes)
+        try:
+            with self._activate(root):
+                yield root
+        finally:
+            # Failed requests are exported too; they are the interesting ones
+            exporter = self._get_exporter()
+            if exporter is not None:
+                exporter.export(root)
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[Optional[Span]]:
+        parent = _current_span.get()
+        if parent is None:
+            started = time.perf_counter()
+            try:
+                yield None
+            except BaseException:
+                SPAN_ERRORS.labels(span=name).inc()
+                raise
+            finally:
+                SPAN_DURATION.labels(span=name).observe(time.perf_counter() - started)
+            return
+
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        parent.children.append(span)
+        with self._activate(span):
+            yield span
+
+    def start_span(self, name: str, **attributes: Any) -> Span:
+        """Child span that is *not* made current; finish it with ``end_span``.
+
+        For async generators, where setting the contextvar would leak into
+        the consumer between yields.
+        """
+        parent = _current_span.get()
+        if parent is None:
+            # Unattached: only its duration reaches the metrics
+            return Span(name, "", attributes=attributes)
+        span = Span(name, parent.trace_id, parent.span_id, attributes)
+        parent.children.append(span)
+        return span
+
+    @staticmethod
+    def end_span(span: Span, error: Optional[BaseException] = None) -> None:
+        span.duration_ns = time.perf_counter_ns() - span.started_ns
+        if error is None:
+            span.status = STATUS_OK
+        else:
+            span.status = STATUS_ERROR
+            span.status_message = f"{type(error).__name__}: {error}"
+            SPAN_ERRORS.labels(span=span.name).inc()
+        SPAN_DURATION.labels(span=span.name).observe(span.duration_ns / 1e9)
+
+    @contextmanager
+    def _activate(self, span: Span) -> Iterator[None]:
+        token = _current_span.set(span)
+        try:
+            yield
+        except BaseException as e:
+            self.end_span(span, e)
+            raise
+        else:
+            self.end_span(span)
+        finally:
+            _current_span.reset(token)
+
+    def close(self) -> None:
+        with self._lock:
+            if self._exporter is not None:
+                self._exporter.close()
+                self._exporter = None
+                self._exporter_path = None
+
+
+tracer = Tracer()